@@ -0,0 +1,186 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+
+from .extraction import load_encoding
+from .logger import logger
+from .metrics import execution_context, metrics_callback
+from .multiagent import build_input, get_graph
+from .routing import PIPELINES
+from .scheduler import DONE, FAILED
+from .state import SUMMARY_NAME
+from .validators import ValidationError, clean_prompt
+
+# Prompts que se ejecutan a la vez dentro de un lote
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Concurrencia máxima que puede pedir un lote enviado por HTTP
+BATCH_CONCURRENCY_MAX = int(os.getenv("BATCH_CONCURRENCY_MAX", "16"))
+
+# Directorio de entradas y resultados de los lotes enviados por HTTP
+BATCH_DIR = os.getenv("BATCH_DIR", os.path.join("data", "batches"))
+
+
+def prompt_id(prompt: str, pipeline: Optional[str] = None) -> str:
+    """Id estable de un prompt, para reconocerlo al reanudar un lote."""
+    data = f"{pipeline or 'auto'}\n{prompt}".encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def read_prompts(lines: Iterable[str], pipeline: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Lee prompts de texto plano (uno por línea) o de JSONL.
+
+    Cada línea JSON admite ``prompt`` y, opcionalmente, ``id`` y ``pipeline``.
+    Las líneas vacías y las que empiezan por ``#`` se ignoran, y los prompts
+    se normalizan y validan como en ``/execute``.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                logger.warning(f"Línea {number} ignorada, JSON inválido: {str(e)}")
+                continue
+        else:
+            item = {"prompt": line}
+
+        if not item.get("prompt"):
+            logger.warning(f"Línea {number} ignorada: falta el prompt")
+            continue
+        try:
+            item["prompt"] = clean_prompt(item["prompt"])
+        except ValidationError as e:
+            logger.warning(f"Línea {number} ignorada: {str(e)}")
+            continue
+        item.setdefault("pipeline", pipeline)
+        item.setdefault("id", prompt_id(item["prompt"], item["pipeline"]))
+        yield item
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """Ids ya completados según el fichero de resultados de un lote anterior."""
+    completed: Set[str] = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as output:
+        for line in output:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Una línea a medio escribir si el proceso se interrumpió
+                continue
+            if record.get("status") == DONE:
+                completed.add(record["id"])
+    return completed
+
+
+def summarize_state(state: Dict[str, Any]) -> Dict[str, str]:
+    """Último informe de cada worker en el estado final del grafo."""
+    outputs = {}
+    for message in state.get("messages", []):
+        if message.name and message.name != SUMMARY_NAME:
+            outputs[message.name] = message.content
+    return outputs
+
+
+async def arun_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Ejecuta un prompt del lote y retorna su registro de resultado."""
+    record = {"id": item["id"], "prompt": item["prompt"], "pipeline": item.get("pipeline")}
+    with execution_context(item["id"]) as timings:
+        try:
+            state = await get_graph(use_async=True).ainvoke(
+                build_input(item["prompt"], PIPELINES.get(item.get("pipeline"))),
+                {"recursion_limit": 150, "callbacks": [metrics_callback]}
+            )
+            record.update(status=DONE, outputs=summarize_state(state),
+                          prompt_tokens=state.get("prompt_tokens", {}))
+        except Exception as e:
+            logger.error(f"Error en el prompt {item['id']} del lote: {str(e)}")
+            record.update(status=FAILED, error=str(e))
+    record["timings"] = timings.to_dict()
+    record["seconds"] = record["timings"]["seconds"]
+    return record
+
+
+async def arun_batch(items: Iterable[Dict[str, Any]], output_path: str,
+                     concurrency: int = BATCH_CONCURRENCY) -> Dict[str, int]:
+    """Ejecuta un lote de prompts escribiendo cada resultado en JSONL.
+
+    Los prompts se consumen de ``items`` a medida que quedan workers libres,
+    así que la entrada puede ser un flujo. Los ids que ya figuran como
+    completados en ``output_path`` se saltan: un lote interrumpido se reanuda
+    relanzándolo con el mismo fichero de salida. Los fallidos se reintentan.
+    Todas las ejecuciones comparten en el proceso los cachés de descargas y
+    del LLM y los rate limiters.
+    """
+    completed = load_checkpoint(output_path)
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+    pending = iter(items)
+    reading = asyncio.Lock()
+    directory = os.path.dirname(output_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        async def next_item() -> Optional[Dict[str, Any]]:
+            # Leer la entrada (p. ej. stdin) puede bloquear: se hace en un hilo,
+            # y de uno en uno porque el iterador se comparte entre workers
+            async with reading:
+                return await asyncio.to_thread(next, pending, None)
+
+        async def worker():
+            while (item := await next_item()) is not None:
+                if item["id"] in completed:
+                    counts["skipped"] += 1
+                    continue
+                completed.add(item["id"])
+                record = await arun_item(item)
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                counts[record["status"]] += 1
+
+        await asyncio.gather(*(worker() for _ in range(max(concurrency, 1))))
+
+    logger.info(f"Lote terminado en {output_path}: {counts}")
+    return counts
+
+
+async def arun_batch_file(input_path: str, output_path: str,
+                          concurrency: int = BATCH_CONCURRENCY,
+                          pipeline: Optional[str] = None) -> Dict[str, int]:
+    """Ejecuta el lote de un fichero de prompts."""
+    with open(input_path, encoding="utf-8") as source:
+        return await arun_batch(read_prompts(source, pipeline), output_path, concurrency)
+
+
+def main(argv=None):
+    """Ejecuta un lote desde la terminal: python -m app.batch prompts.txt -o resultados.jsonl"""
+    parser = argparse.ArgumentParser(description="Ejecuta un lote de prompts del sistema multi-agente.")
+    parser.add_argument("input", help="Fichero de prompts (texto o JSONL); '-' lee de la entrada estándar")
+    parser.add_argument("-o", "--output", required=True,
+                        help="Fichero JSONL de resultados; si existe, el lote se reanuda")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="Prompts ejecutados a la vez")
+    parser.add_argument("--pipeline", choices=["auto"] + sorted(PIPELINES), default="auto",
+                        help="Plan de ejecución de cada prompt")
+    args = parser.parse_args(argv)
+
+    pipeline = None if args.pipeline == "auto" else args.pipeline
+    load_encoding()
+    if args.input == "-":
+        counts = asyncio.run(arun_batch(read_prompts(sys.stdin, pipeline),
+                                        args.output, args.concurrency))
+    else:
+        counts = asyncio.run(arun_batch_file(args.input, args.output,
+                                             args.concurrency, pipeline))
+    print(json.dumps(counts))
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,572 @@
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
 import time
-from typing import Any, Dict, Optional
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 from functools import wraps
 from .logger import logger
+from .sqlite_utils import SQLiteConnectionMixin
+
+# Marca de ausencia en caché, distinta de un resultado None almacenado
+_MISSING = object()
+
+# Resultado con el que un líder cancelado despierta a los seguidores de SingleFlight
+_LEADER_CANCELLED = object()
+
+
+def estimate_size(value: Any) -> int:
+    """Estima el tamaño en bytes de un valor almacenado en caché."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return sys.getsizeof(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class CacheBackend:
+    """Interfaz común de los backends de caché.
+
+    Las entradas expiran tras ``ttl_seconds`` (o el TTL indicado en ``set``)
+    y los backends llevan contadores de aciertos, fallos, expulsiones y
+    expiraciones que se consultan con ``stats``.
+    """
 
-class Cache:
     def __init__(self, ttl_seconds: int = 3600):
-        self.cache: Dict[str, Dict[str, Any]] = {}
         self.ttl_seconds = ttl_seconds
-    
-    def _is_expired(self, timestamp: float) -> bool:
-        """Verifica si un elemento del caché ha expirado."""
-        return time.time() - timestamp > self.ttl_seconds
-    
-    def get(self, key: str) -> Optional[Any]:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._stats_lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_lock = threading.Lock()
+        self._stop_sweeper = threading.Event()
+        self._sweep_interval = 0.0
+
+    def get(self, key: str, default: Any = None) -> Any:
         """Obtiene un valor del caché si existe y no ha expirado."""
-        if key not in self.cache:
-            return None
-        
-        item = self.cache[key]
-        if self._is_expired(item['timestamp']):
-            logger.debug(f"Elemento expirado en caché: {key}")
-            del self.cache[key]
-            return None
-        
-        logger.debug(f"Cache hit para: {key}")
-        return item['value']
-    
-    def set(self, key: str, value: Any):
+        entry = self.get_entry(key)
+        if entry is None:
+            return default
+        return entry[0]
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Retorna ``(valor, expira_en)`` o None si la clave no está vigente."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
         """Almacena un valor en el caché."""
-        self.cache[key] = {
-            'value': value,
-            'timestamp': time.time()
-        }
-        logger.debug(f"Elemento almacenado en caché: {key}")
-    
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Elimina una clave del caché."""
+        raise NotImplementedError
+
     def clear(self):
         """Limpia todo el caché."""
-        self.cache.clear()
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """Elimina las entradas expiradas y retorna cuántas se eliminaron."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso del caché."""
+        with self._stats_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _count(self, counter: str, amount: int = 1):
+        """Incrementa un contador; los hilos del servidor comparten el caché."""
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _expires_at(self, ttl_seconds: Optional[float]) -> float:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        return time.time() + ttl
+
+    def schedule_sweeper(self, interval_seconds: float = 60):
+        """Programa el barrido: el hilo arranca con el primer uso del caché.
+
+        Así importar el módulo no crea hilos, y un proceso creado con fork
+        arranca el suyo propio en lugar de heredar uno que no existe.
+        """
+        self._sweep_interval = interval_seconds
+
+    def _ensure_sweeper(self):
+        if self._sweep_interval > 0 and (self._sweeper is None or not self._sweeper.is_alive()):
+            self.start_sweeper(self._sweep_interval)
+
+    def start_sweeper(self, interval_seconds: float = 60):
+        """Inicia un hilo en segundo plano que elimina entradas expiradas."""
+        with self._sweeper_lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._stop_sweeper.clear()
+
+            def run():
+                while not self._stop_sweeper.wait(interval_seconds):
+                    try:
+                        removed = self.sweep()
+                        if removed:
+                            logger.debug("Barrido de caché: %d entradas expiradas", removed)
+                    except Exception as e:
+                        logger.error(f"Error en el barrido de caché: {str(e)}")
+
+            self._sweeper = threading.Thread(target=run, name="cache-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        """Detiene el hilo de barrido si está activo."""
+        self._sweep_interval = 0.0
+        self._stop_sweeper.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=1)
+            self._sweeper = None
+
+
+class MemoryLRUCache(CacheBackend):
+    """Caché en memoria acotada por número de entradas y bytes, con expulsión LRU."""
+
+    def __init__(self, ttl_seconds: int = 3600, max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._lock = threading.RLock()
+        # clave -> (valor, expira_en, tamaño)
+        self.cache: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        self._ensure_sweeper()
+        with self._lock:
+            item = self.cache.get(key)
+            if item is None:
+                self._count("misses")
+                return None
+
+            value, expires_at, _ = item
+            if time.time() > expires_at:
+                logger.debug("Elemento expirado en caché: %s", key)
+                self._remove(key)
+                self._count("expirations")
+                self._count("misses")
+                return None
+
+            self.cache.move_to_end(key)
+            self._count("hits")
+            logger.debug("Cache hit para: %s", key)
+            return value, expires_at
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        self._ensure_sweeper()
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            logger.debug("Elemento demasiado grande para el caché: %s", key)
+            return
+
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+            self.cache[key] = (value, self._expires_at(ttl_seconds), size)
+            self.current_bytes += size
+            while len(self.cache) > self.max_entries or self.current_bytes > self.max_bytes:
+                oldest = next(iter(self.cache))
+                self._remove(oldest)
+                self._count("evictions")
+        logger.debug("Elemento almacenado en caché: %s", key)
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self.cache:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.cache.clear()
+            self.current_bytes = 0
         logger.info("Caché limpiado")
 
+    def sweep(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, expires_at, _) in self.cache.items() if now > expires_at]
+            for key in expired:
+                self._remove(key)
+            self._count("expirations", len(expired))
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = super().stats()
+            data.update({
+                "entries": len(self.cache),
+                "bytes": self.current_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            })
+            return data
+
+    def _remove(self, key: str):
+        _, _, size = self.cache.pop(key)
+        self.current_bytes -= size
+
+
+class SQLiteCache(SQLiteConnectionMixin, CacheBackend):
+    """Caché persistente en SQLite (modo WAL) compartible entre procesos del host."""
+
+    def __init__(self, path: str, ttl_seconds: int = 3600, max_entries: int = 100000):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self._init_sqlite(path)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        self._ensure_sweeper()
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+
+        if time.time() > row[1]:
+            self.delete(key)
+            self._count("expirations")
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        self._ensure_sweeper()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, size) VALUES (?, ?, ?, ?)",
+                (key, data, self._expires_at(ttl_seconds), len(data))
+            )
+            self._evict_excess(conn)
+
+    def delete(self, key: str):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache")
+        logger.info("Caché persistente limpiado")
+
+    def sweep(self) -> int:
+        with self._connection() as conn:
+            removed = conn.execute(
+                "DELETE FROM cache WHERE expires_at < ?", (time.time(),)
+            ).rowcount
+            self._evict_excess(conn)
+        self._count("expirations", removed)
+        return removed
+
+    def _evict_excess(self, conn):
+        """Expulsa las entradas más próximas a expirar por encima de ``max_entries``."""
+        excess = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN"
+                " (SELECT key FROM cache ORDER BY expires_at LIMIT ?)", (excess,)
+            )
+            self._count("evictions", excess)
+
+    def stats(self) -> Dict[str, Any]:
+        data = super().stats()
+        entries, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+        data.update({"entries": entries, "bytes": size, "max_entries": self.max_entries})
+        return data
+
+
+class TieredCache(CacheBackend):
+    """Caché en dos niveles: memoria LRU delante de un backend persistente."""
+
+    def __init__(self, memory: CacheBackend, persistent: CacheBackend):
+        super().__init__(memory.ttl_seconds)
+        self.memory = memory
+        self.persistent = persistent
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        self._ensure_sweeper()
+        entry = self.memory.get_entry(key)
+        if entry is None:
+            entry = self.persistent.get_entry(key)
+            if entry is not None:
+                # Promover al nivel en memoria con el TTL restante
+                self.memory.set(key, entry[0], ttl_seconds=entry[1] - time.time())
+        self._count("misses" if entry is None else "hits")
+        return entry
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        self._ensure_sweeper()
+        self.memory.set(key, value, ttl_seconds)
+        self.persistent.set(key, value, ttl_seconds)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        self.persistent.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        self.persistent.clear()
+
+    def sweep(self) -> int:
+        return self.memory.sweep() + self.persistent.sweep()
+
+    def stats(self) -> Dict[str, Any]:
+        data = super().stats()
+        data["memory"] = self.memory.stats()
+        data["persistent"] = self.persistent.stats()
+        return data
+
+
+# Compatibilidad con el nombre anterior
+Cache = MemoryLRUCache
+
+
+def create_cache() -> CacheBackend:
+    """Crea el caché global con la configuración de las variables de entorno."""
+    ttl_seconds = int(os.getenv("CACHE_TTL_SECONDS", "3600"))
+    backend: CacheBackend = MemoryLRUCache(
+        ttl_seconds=ttl_seconds,
+        max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    )
+    sqlite_path = os.getenv("CACHE_SQLITE_PATH")
+    if sqlite_path:
+        backend = TieredCache(backend, SQLiteCache(sqlite_path, ttl_seconds=ttl_seconds))
+
+    backend.schedule_sweeper(float(os.getenv("CACHE_SWEEP_INTERVAL", "60")))
+    return backend
+
 # Instancia global del caché
-cache = Cache()
+cache = create_cache()
+
+
+class SingleFlight:
+    """Agrupa llamadas concurrentes con la misma clave en una sola ejecución.
+
+    El primer llamador ejecuta la función y el resto espera su resultado (o
+    su excepción). Funciona entre hilos con ``do`` y dentro de un event loop
+    con ``ado``; si el líder de ``ado`` se cancela, uno de los que esperaban
+    repite la llamada en su lugar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Tuple[threading.Event, list]] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Future] = {}
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = (threading.Event(), [None, None])
+                self._calls[key] = call
+
+        event, outcome = call
+        if not leader:
+            event.wait()
+            if outcome[1] is not None:
+                raise outcome[1]
+            return outcome[0]
+
+        try:
+            outcome[0] = func()
+            return outcome[0]
+        except BaseException as e:
+            outcome[1] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            event.set()
+
+    async def ado(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        while True:
+            with self._lock:
+                future = self._async_calls.get(flight_key)
+                leader = future is None
+                if leader:
+                    future = loop.create_future()
+                    self._async_calls[flight_key] = future
+            if leader:
+                break
+            # shield: cancelar a un seguidor no cancela el cálculo compartido
+            result = await asyncio.shield(future)
+            if result is not _LEADER_CANCELLED:
+                return result
+
+        try:
+            result = await func()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            # Los seguidores vienen de otras ejecuciones que nadie canceló:
+            # se despiertan para que uno de ellos repita la llamada
+            future.set_result(_LEADER_CANCELLED)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Evitar el aviso de excepción no recuperada si nadie más espera
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._async_calls[flight_key]
+
+
+# SingleFlight de cada espacio de nombres de ``cached``: las funciones que
+# comparten claves (p. ej. las versiones síncrona y asíncrona) comparten vuelos
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(namespace: str) -> SingleFlight:
+    """Retorna el SingleFlight del espacio de nombres, creándolo si no existe."""
+    with _flights_lock:
+        flight = _flights.get(namespace)
+        if flight is None:
+            flight = _flights[namespace] = SingleFlight()
+        return flight
+
+
+class _CachedError:
+    """Excepción almacenada en caché (caché negativo)."""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def make_cache_key(namespace: str, value: Any) -> str:
+    """Clave estable: espacio de nombres más el hash SHA-256 del valor canónico."""
+    payload = json.dumps(value, sort_keys=True, default=repr, separators=(",", ":"))
+    return f"{namespace}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def cached(ttl_seconds: int = 3600, key_func: Optional[Callable[..., Any]] = None,
+           error_ttl_seconds: Optional[float] = None,
+           is_error: Optional[Callable[[Any], bool]] = None,
+           namespace: Optional[str] = None,
+           backend: Optional[CacheBackend] = None):
+    """Decorador para cachear resultados de funciones (síncronas o asíncronas).
+
+    Args:
+        ttl_seconds: vigencia de los resultados correctos.
+        key_func: recibe los mismos argumentos que la función y retorna el
+            valor que identifica la llamada (p. ej. la URL canonicalizada).
+        error_ttl_seconds: vigencia de las excepciones y de los resultados
+            para los que ``is_error`` es verdadero; None (por defecto)
+            desactiva el caché negativo.
+        is_error: detecta resultados de error que no se lanzan como excepción.
+        namespace: prefijo de las claves; por defecto ``módulo.qualname``.
+        backend: caché a utilizar; por defecto el caché global.
 
-def cached(ttl_seconds: int = 3600):
-    """Decorador para cachear resultados de funciones."""
+    Las llamadas concurrentes con la misma clave se agrupan en una sola
+    ejecución, también entre funciones con el mismo ``namespace``.
+    """
     def decorator(func):
+        prefix = namespace or f"{func.__module__}.{func.__qualname__}"
+        flight = get_flight(prefix)
+
+        def build_key(args, kwargs) -> str:
+            value = key_func(*args, **kwargs) if key_func else [args, kwargs]
+            return make_cache_key(prefix, value)
+
+        def lookup(key: str) -> Any:
+            result = (backend or cache).get(key, _MISSING)
+            if isinstance(result, _CachedError):
+                raise result.error
+            return result
+
+        def store(key: str, result: Any):
+            ttl = ttl_seconds
+            if is_error is not None and is_error(result):
+                if error_ttl_seconds is None:
+                    return
+                ttl = error_ttl_seconds
+            try:
+                (backend or cache).set(key, result, ttl)
+            except Exception as e:
+                logger.warning(f"No se pudo almacenar en caché {key}: {str(e)}")
+
+        def store_error(key: str, error: BaseException):
+            if error_ttl_seconds is None:
+                return
+            try:
+                (backend or cache).set(key, _CachedError(error), error_ttl_seconds)
+            except Exception as e:
+                logger.warning(f"No se pudo almacenar el error en caché {key}: {str(e)}")
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key = build_key(args, kwargs)
+                result = lookup(key)
+                if result is not _MISSING:
+                    return result
+
+                async def compute():
+                    try:
+                        value = await func(*args, **kwargs)
+                    except Exception as e:
+                        store_error(key, e)
+                        raise
+                    store(key, value)
+                    return value
+
+                return await flight.ado(key, compute)
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Crear una clave única basada en la función y sus argumentos
-            key = f"{func.__name__}:{args}:{kwargs}"
-            
+            key = build_key(args, kwargs)
+
             # Intentar obtener del caché
-            result = cache.get(key)
-            if result is not None:
+            result = lookup(key)
+            if result is not _MISSING:
                 return result
-            
-            # Si no está en caché, ejecutar la función
-            result = func(*args, **kwargs)
-            cache.set(key, result)
-            return result
+
+            # Si no está en caché, ejecutar la función una sola vez por clave
+            def compute():
+                try:
+                    value = func(*args, **kwargs)
+                except Exception as e:
+                    store_error(key, e)
+                    raise
+                store(key, value)
+                return value
+
+            return flight.do(key, compute)
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
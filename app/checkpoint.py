@@ -0,0 +1,327 @@
+import asyncio
+import functools
+import os
+import random
+import sqlite3
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+from .sqlite_utils import CompactionMixin, SQLiteConnectionMixin
+
+
+def thread_config(thread_id: str, checkpoint_id: Optional[str] = None,
+                  checkpoint_ns: str = "") -> RunnableConfig:
+    """Configuración del grafo para un hilo (una ejecución) y, opcionalmente, un checkpoint."""
+    configurable = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+    if checkpoint_id:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+class SQLiteCheckpointSaver(SQLiteConnectionMixin, CompactionMixin, BaseCheckpointSaver):
+    """Checkpoints del grafo en SQLite (modo WAL), compartidos por los workers del host.
+
+    Tras cada paso se guarda el estado (``AgentState``) de la ejecución; los
+    canales solo se escriben cuando cambia su versión, así que un informe
+    largo no se repite en cada checkpoint. Las escrituras de cada nodo se
+    guardan al terminar el nodo: si un paso con varios workers en paralelo
+    falla a medias, al reanudarlo solo se repiten los que no terminaron.
+
+    Los hilos sin checkpoints nuevos en ``retention_seconds`` se eliminan con
+    ``compact``.
+    """
+
+    compaction_target = "checkpoints"
+
+    def __init__(self, path: str, retention_seconds: float = 7 * 24 * 3600,
+                 compact_interval: float = 300):
+        super().__init__()
+        self._init_sqlite(path)
+        self._init_compaction(retention_seconds, compact_interval)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " parent_id TEXT,"
+                " type TEXT NOT NULL,"
+                " checkpoint BLOB NOT NULL,"
+                " metadata_type TEXT NOT NULL,"
+                " metadata BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " channel TEXT NOT NULL,"
+                " version TEXT NOT NULL,"
+                " type TEXT NOT NULL,"
+                " value BLOB,"
+                " PRIMARY KEY (thread_id, checkpoint_ns, channel, version)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS writes ("
+                " thread_id TEXT NOT NULL,"
+                " checkpoint_ns TEXT NOT NULL,"
+                " checkpoint_id TEXT NOT NULL,"
+                " task_id TEXT NOT NULL,"
+                " idx INTEGER NOT NULL,"
+                " channel TEXT NOT NULL,"
+                " type TEXT NOT NULL,"
+                " value BLOB,"
+                " task_path TEXT NOT NULL DEFAULT '',"
+                " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)) WITHOUT ROWID"
+            )
+
+    def _load_blobs(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str,
+                    versions: ChannelVersions) -> Dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            row = conn.execute(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?"
+                " AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version))
+            ).fetchone()
+            if row is not None and row[0] != "empty":
+                values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _load_tuple(self, conn: sqlite3.Connection, thread_id: str, checkpoint_ns: str,
+                    row: Tuple) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        checkpoint = self.serde.loads_typed((type_, checkpoint))
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            " ORDER BY task_id, idx", (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return CheckpointTuple(
+            config=thread_config(thread_id, checkpoint_id, checkpoint_ns),
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(
+                    conn, thread_id, checkpoint_ns, checkpoint["channel_versions"]
+                ),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=thread_config(thread_id, parent_id, checkpoint_ns) if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, value)))
+                for task_id, channel, type_, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Checkpoint indicado en ``config`` o, si no lo indica, el último del hilo."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = ("SELECT checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+                 " FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?")
+        params: List[Any] = [thread_id, checkpoint_ns]
+        checkpoint_id = get_checkpoint_id(config)
+        if checkpoint_id:
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        conn = self._connection()
+        row = conn.execute(query, params).fetchone()
+        if row is None:
+            return None
+        return self._load_tuple(conn, thread_id, checkpoint_ns, row)
+
+    def list(self, config: Optional[RunnableConfig], *,
+             filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None,
+             limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        """Checkpoints de un hilo, del más reciente al más antiguo."""
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint,"
+                 " metadata_type, metadata FROM checkpoints WHERE 1 = 1")
+        params: List[Any] = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            checkpoint_id = get_checkpoint_id(config)
+            if checkpoint_id:
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        before_id = get_checkpoint_id(before) if before else None
+        if before_id:
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        query += " ORDER BY checkpoint_id DESC"
+
+        conn = self._connection()
+        for row in conn.execute(query, params).fetchall():
+            if limit is not None and limit <= 0:
+                break
+            thread_id, checkpoint_ns = row[0], row[1]
+            item = self._load_tuple(conn, thread_id, checkpoint_ns, row[2:])
+            if filter and not all(item.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint,
+            metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        """Guarda un checkpoint y los canales que han cambiado desde el anterior."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        saved = checkpoint.copy()
+        values = saved.pop("channel_values")
+        type_, data = self.serde.dumps_typed(saved)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        blobs = []
+        for channel, version in new_versions.items():
+            blob = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            blobs.append((thread_id, checkpoint_ns, channel, str(version), *blob))
+
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, type, value)"
+                " VALUES (?, ?, ?, ?, ?, ?)", blobs
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id,"
+                " parent_id, type, checkpoint, metadata_type, metadata, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, data, metadata_type, metadata_data, time.time())
+            )
+        self._maybe_compact()
+        return thread_config(thread_id, checkpoint["id"], checkpoint_ns)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]],
+                   task_id: str, task_path: str = "") -> None:
+        """Guarda las escrituras de un nodo terminado, pendientes del siguiente checkpoint."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._connection() as conn:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                # Las escrituras especiales (errores, interrupciones) sustituyen a las anteriores
+                verb = "INSERT OR REPLACE" if idx < 0 else "INSERT OR IGNORE"
+                conn.execute(
+                    f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx,"
+                    " channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel,
+                     *self.serde.dumps_typed(value), task_path)
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._connection() as conn:
+            for table in ("writes", "blobs", "checkpoints"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Elimina los hilos cuyo último checkpoint supera la retención."""
+        limit = (now or time.time()) - self.retention_seconds
+        expired = "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?"
+        with self._connection() as conn:
+            threads = [row[0] for row in conn.execute(expired, (limit,)).fetchall()]
+            for thread_id in threads:
+                for table in ("writes", "blobs", "checkpoints"):
+                    conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        return len(threads)
+
+    # Las consultas pueden esperar el lock de escritura de otro worker: las
+    # versiones asíncronas las ejecutan en hilos para no bloquear el event loop
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *,
+                    filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]],
+                          task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Versiones ordenables como texto; el sufijo aleatorio distingue ramas de un fork."""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def fork_checkpoint(saver: BaseCheckpointSaver, source: RunnableConfig,
+                    thread_id: str) -> Optional[RunnableConfig]:
+    """Copia el checkpoint ``source`` como punto de partida del hilo ``thread_id``.
+
+    Se descartan las escrituras pendientes, de modo que al reanudar el hilo
+    nuevo se repiten los nodos que seguían a ese checkpoint y se conserva
+    todo lo anterior (p. ej. se regenera el tweet sin repetir la investigación).
+    """
+    saved = saver.get_tuple(source)
+    if saved is None:
+        return None
+    metadata = {
+        **saved.metadata,
+        "source": "fork",
+        "forked_from": {
+            "thread_id": saved.config["configurable"]["thread_id"],
+            "checkpoint_id": saved.checkpoint["id"],
+        },
+    }
+    return saver.put(thread_config(thread_id), saved.checkpoint, metadata,
+                     saved.checkpoint["channel_versions"])
+
+
+def create_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """Crea el almacén de checkpoints con la configuración de las variables de entorno.
+
+    ``CHECKPOINT_PATH=:memory:`` guarda los checkpoints en memoria del proceso
+    y ``CHECKPOINT_PATH=off`` desactiva el checkpointing.
+    """
+    path = os.getenv("CHECKPOINT_PATH", os.path.join("data", "checkpoints.sqlite3"))
+    retention_seconds = float(os.getenv("CHECKPOINT_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    if path == "off":
+        return None
+    if path == ":memory:":
+        return MemorySaver()
+    return SQLiteCheckpointSaver(path, retention_seconds=retention_seconds)
+
+
+@functools.lru_cache(maxsize=1)
+def get_checkpointer() -> Optional[BaseCheckpointSaver]:
+    """Almacén de checkpoints, creado en el primer uso."""
+    return create_checkpointer()
@@ -0,0 +1,207 @@
+import re
+from typing import Iterator, List, Optional, Union
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+from .logger import logger
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:  # pragma: no cover - depende del entorno
+    HTML_PARSER = "html.parser"
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depende del entorno
+    tiktoken = None
+
+# Etiquetas que nunca aportan contenido legible
+NON_CONTENT_TAGS = [
+    "script", "style", "noscript", "template", "svg", "canvas", "iframe",
+    "nav", "footer", "aside", "form", "button", "select", "input",
+]
+
+# Contenedores cuyo <header> lleva el título y el autor, no la cabecera del sitio
+CONTENT_CONTAINERS = ["article", "main"]
+
+# Clase o id completos que delatan navegación, publicidad u otro ruido
+# (p. ej. "sidebar", "site-footer" o "share-buttons", pero no "shared-content")
+BOILERPLATE_PATTERN = re.compile(
+    r"((site|main|page|global|top)[_-])?"
+    r"(nav|navbar|navigation|menu|breadcrumbs?|footer|sidebar|cookies?|banner|"
+    r"advert|ads|promo|social|share|sharing|related|comments?|newsletter|subscribe)"
+    r"([_-](bar|banner|box|buttons|links|list|posts|section|widget|wrapper))?",
+    re.IGNORECASE
+)
+
+# Bloques que separan párrafos en el texto extraído
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "br", "dd", "dt",
+}
+
+# Cadenas que forman parte del texto (no comentarios, doctype, etc.)
+TEXT_STRING_TYPES = (NavigableString, CData)
+
+WHITESPACE = re.compile(r"[ \t\r\f\v\u00a0]+")
+
+TRUNCATION_MARK = "\n[... contenido truncado]"
+
+# Caracteres por token aproximados cuando tiktoken no está disponible
+CHARS_PER_TOKEN = 4
+
+
+def _is_boilerplate(tag: Tag) -> bool:
+    if tag.get("role") == "navigation":
+        return True
+    tokens = list(tag.get("class") or [])
+    if tag.get("id"):
+        tokens.append(tag["id"])
+    return any(BOILERPLATE_PATTERN.fullmatch(token) for token in tokens)
+
+
+def _remove_boilerplate(soup: BeautifulSoup):
+    for tag in soup(NON_CONTENT_TAGS):
+        tag.decompose()
+    for tag in soup("header"):
+        if not tag.decomposed and tag.find_parent(CONTENT_CONTAINERS) is None:
+            tag.decompose()
+    for tag in soup.find_all(["div", "section", "ul"]):
+        if not tag.decomposed and _is_boilerplate(tag):
+            tag.decompose()
+
+
+def _main_content(soup: BeautifulSoup):
+    """Elige el contenedor principal: <main>, el <article> más largo o el <body>."""
+    main = soup.find("main") or soup.find(attrs={"role": "main"})
+    if main is not None:
+        return main
+    articles = soup.find_all("article")
+    if articles:
+        return max(articles, key=lambda a: len(a.get_text()))
+    return soup.body or soup
+
+
+def _iter_text(root) -> Iterator[str]:
+    """Textos de ``root`` en orden, con un salto de línea al abrir y cerrar cada bloque.
+
+    Se recorre el árbol con una pila, sin modificarlo: insertar nodos en un
+    árbol grande es cuadrático, y la recursión se agotaría en páginas muy anidadas.
+    """
+    stack = [iter(root.contents)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+        elif isinstance(node, Tag):
+            if node.name in BLOCK_TAGS:
+                yield "\n"
+                stack.append(iter(("\n",)))
+            stack.append(iter(node.contents))
+        elif type(node) in TEXT_STRING_TYPES or not isinstance(node, NavigableString):
+            yield node
+
+
+def _join_text(root) -> str:
+    """Une el texto separando los bloques por saltos de línea y normalizando espacios."""
+    lines = (WHITESPACE.sub(" ", line).strip() for line in "".join(_iter_text(root)).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def extract_main_text(html: Union[str, bytes], max_tokens: Optional[int] = None) -> str:
+    """Extrae el texto principal de una página HTML, sin navegación ni scripts.
+
+    Si se indica ``max_tokens``, el resultado se trunca a ese presupuesto.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    _remove_boilerplate(soup)
+    text = _join_text(_main_content(soup))
+    if max_tokens is not None:
+        text = truncate_to_tokens(text, max_tokens)
+    return text
+
+
+def normalize_plain_text(text: str) -> str:
+    """Normaliza espacios de un documento de texto plano."""
+    lines = (WHITESPACE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+# Codificación de tiktoken; se carga al arrancar con ``load_encoding``
+_ENCODING = None
+
+
+def load_encoding() -> bool:
+    """Carga la codificación de tiktoken; se llama al arrancar la aplicación.
+
+    La primera carga descarga la codificación (después queda en la caché de
+    disco de tiktoken). Si falla, o hasta que se llama, los tokens se estiman
+    con ``CHARS_PER_TOKEN``: una ejecución nunca depende de la red para contarlos.
+    """
+    global _ENCODING
+    if _ENCODING is None and tiktoken is not None:
+        try:
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken no disponible, se estimarán los tokens: {str(e)}")
+    return _ENCODING is not None
+
+
+def _encoding():
+    """Codificación cargada por ``load_encoding``, o None si se estiman los tokens."""
+    return _ENCODING
+
+
+def count_tokens(text: str) -> int:
+    """Cuenta tokens con tiktoken o, si no está disponible, los estima."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trunca ``text`` a ``max_tokens`` tokens, marcando el corte."""
+    # Recorte previo barato para no tokenizar documentos enormes
+    text_limit = max_tokens * CHARS_PER_TOKEN * 2
+    clipped = len(text) > text_limit
+    if clipped:
+        text = text[:text_limit]
+
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens and not clipped:
+            return text
+        return encoding.decode(tokens[:max_tokens]).rstrip() + TRUNCATION_MARK
+
+    char_limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= char_limit and not clipped:
+        return text
+    return text[:char_limit].rstrip() + TRUNCATION_MARK
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """Divide ``text`` en fragmentos de hasta ``max_tokens`` respetando líneas."""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in text.split("\n"):
+        line_tokens = count_tokens(line)
+        if line_tokens > max_tokens:
+            # Una línea demasiado larga se corta por caracteres
+            step = max_tokens * CHARS_PER_TOKEN
+            pieces = [line[i:i + step] for i in range(0, len(line), step)]
+        else:
+            pieces = [line]
+        for piece in pieces:
+            piece_tokens = line_tokens if len(pieces) == 1 else count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
@@ -0,0 +1,269 @@
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import CacheBackend, cache as default_cache, make_cache_key
+from .logger import logger
+from .validators import canonicalize_url
+
+# Tipos de contenido que tiene sentido convertir a texto
+TEXT_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+USER_AGENT = "basic-multiagent/0.1 (+https://github.com/arklon1975/basic-multiagent)"
+
+CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+def declared_charset(content_type: str) -> Optional[str]:
+    """Charset declarado en ``Content-Type``, o None si no lo hay.
+
+    No se usa ``response.encoding``: sin charset, requests supone ISO-8859-1
+    y httpx UTF-8, así que la misma página se decodificaría distinto en cada modo.
+    """
+    match = CHARSET.search(content_type)
+    return match.group(1).lower() if match else None
+
+
+class FetchError(Exception):
+    """Error de descarga no cubierto por los errores HTTP (p. ej. tipo de contenido)."""
+    pass
+
+
+class FetchResult:
+    """Resultado de una descarga."""
+
+    def __init__(self, url: str, status: int, content: bytes = b"",
+                 content_type: str = "", encoding: Optional[str] = None,
+                 truncated: bool = False, revalidated: bool = False,
+                 data: Any = None):
+        self.url = url
+        self.status = status
+        self.content = content
+        self.content_type = content_type
+        # Charset declarado por el servidor (None si no lo declara)
+        self.encoding = encoding
+        self.truncated = truncated
+        # True si el servidor respondió 304 y se reutilizó la copia en caché
+        self.revalidated = revalidated
+        # Resultado de ``transform`` (o el contenido si no hay transformación)
+        self.data = data
+
+
+class Fetcher:
+    """Descargador HTTP con pool de conexiones compartido.
+
+    - Reutiliza conexiones (keep-alive) con un límite de conexiones por host.
+    - Descarga en streaming y corta al superar ``max_bytes``.
+    - Rechaza tipos de contenido que no sean texto antes de leer el cuerpo.
+    - Guarda ETag/Last-Modified junto al resultado transformado y revalida
+      con peticiones condicionales; ante un 304 no se vuelve a procesar.
+    """
+
+    def __init__(self, max_bytes: int = 2 * 1024 * 1024, timeout: float = 10,
+                 max_per_host: int = 4, max_hosts: int = 50,
+                 max_connections: int = 100, validator_ttl: int = 24 * 3600,
+                 allowed_types: Tuple[str, ...] = TEXT_CONTENT_TYPES,
+                 cache: Optional[CacheBackend] = None):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_connections = max_connections
+        self.validator_ttl = validator_ttl
+        self.allowed_types = allowed_types
+        self.cache = cache if cache is not None else default_cache
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        # pool_block limita las conexiones simultáneas a max_per_host por host
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_per_host,
+                              pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _validator_key(self, url: str, transform: Optional[Callable]) -> str:
+        name = f"{transform.__module__}.{transform.__qualname__}" if transform else "raw"
+        return make_cache_key("fetch_validators", [canonicalize_url(url), name])
+
+    def _conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _remember(self, key: str, headers, result: FetchResult):
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified) or result.truncated:
+            return
+        self.cache.set(key, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_type": result.content_type,
+            "data": result.data,
+        }, self.validator_ttl)
+
+    def _check_content_type(self, url: str, content_type: str):
+        media_type = content_type.split(";")[0].strip().lower()
+        if media_type and not media_type.startswith(self.allowed_types):
+            raise FetchError(f"Tipo de contenido no soportado en {url}: {media_type}")
+
+    def _finish(self, url: str, status: int, chunks: List[bytes], truncated: bool,
+                content_type: str, encoding: Optional[str]) -> FetchResult:
+        result = FetchResult(url, status, b"".join(chunks), content_type, encoding, truncated)
+        if truncated:
+            logger.warning(f"Contenido de {url} truncado a {self.max_bytes} bytes")
+        result.data = result.content
+        return result
+
+    def fetch(self, url: str, transform: Optional[Callable[[FetchResult], Any]] = None) -> FetchResult:
+        """Descarga una URL; ``transform`` procesa el resultado (p. ej. extraer texto)."""
+        key = self._validator_key(url, transform)
+        entry = self.cache.get(key)
+        with self.session.get(url, headers=self._conditional_headers(entry),
+                              timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and entry:
+                return FetchResult(url, 304, content_type=entry["content_type"],
+                                   revalidated=True, data=entry["data"])
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            self._check_content_type(url, content_type)
+
+            chunks, size, truncated = [], 0, False
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.max_bytes:
+                    truncated = True
+                    chunks[-1] = chunk[:len(chunk) - (size - self.max_bytes)]
+                    break
+
+            result = self._finish(url, response.status_code, chunks, truncated,
+                                  content_type, declared_charset(content_type))
+            headers = response.headers
+
+        # La conexión ya ha vuelto al pool mientras se procesa el contenido
+        if transform:
+            result.data = transform(result)
+        self._remember(key, headers, result)
+        return result
+
+    def fetch_many(self, urls: List[str], func: Optional[Callable[[str], Any]] = None,
+                   max_workers: int = 8) -> List[Any]:
+        """Descarga varias URLs en paralelo, conservando el orden.
+
+        ``func`` sustituye a ``fetch`` para cada URL (p. ej. una versión con
+        caché); las excepciones se retornan en la posición de su URL.
+        """
+        func = func or self.fetch
+
+        def run(url):
+            try:
+                return func(url)
+            except Exception as e:
+                return e
+
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as pool:
+            return list(pool.map(run, urls))
+
+    def close(self):
+        """Cierra el pool de conexiones síncrono."""
+        self.session.close()
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        """Cliente asíncrono compartido del event loop actual."""
+        loop = asyncio.get_running_loop()
+        if (self._async_client is None or self._async_client.is_closed
+                or self._async_loop is not loop):
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=20)
+            )
+            self._async_loop = loop
+            self._host_semaphores = {}
+        return self._async_client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def afetch(self, url: str, transform: Optional[Callable[[FetchResult], Any]] = None) -> FetchResult:
+        """Versión asíncrona de ``fetch``."""
+        key = self._validator_key(url, transform)
+        entry = self.cache.get(key)
+        client = self.get_async_client()
+        async with self._host_semaphore(url):
+            async with client.stream("GET", url, headers=self._conditional_headers(entry)) as response:
+                if response.status_code == 304 and entry:
+                    return FetchResult(url, 304, content_type=entry["content_type"],
+                                       revalidated=True, data=entry["data"])
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                self._check_content_type(url, content_type)
+
+                chunks, size, truncated = [], 0, False
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        truncated = True
+                        chunks[-1] = chunk[:len(chunk) - (size - self.max_bytes)]
+                        break
+
+                result = self._finish(url, response.status_code, chunks, truncated,
+                                      content_type, declared_charset(content_type))
+                headers = response.headers
+
+        # El procesado (parseo HTML, tokenización) es CPU: se hace en un hilo
+        # para no bloquear el event loop, y sin ocupar conexión ni cupo del host
+        if transform:
+            result.data = await asyncio.to_thread(transform, result)
+        self._remember(key, headers, result)
+        return result
+
+    async def afetch_many(self, urls: List[str],
+                          func: Optional[Callable[[str], Any]] = None) -> List[Any]:
+        """Versión asíncrona de ``fetch_many``."""
+        func = func or self.afetch
+        return list(await asyncio.gather(*(func(url) for url in urls), return_exceptions=True))
+
+    async def aclose(self):
+        """Cierra el cliente asíncrono compartido."""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+def create_fetcher() -> Fetcher:
+    """Crea el descargador con la configuración de las variables de entorno."""
+    return Fetcher(
+        max_bytes=int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024))),
+        timeout=float(os.getenv("FETCH_TIMEOUT", "10")),
+        max_per_host=int(os.getenv("FETCH_MAX_PER_HOST", "4")),
+    )
+
+
+# Instancia global del descargador
+fetcher = create_fetcher()
@@ -0,0 +1,141 @@
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+
+from .cache import CacheBackend, MemoryLRUCache, SQLiteCache, TieredCache, make_cache_key
+from .logger import logger
+
+# Modos de caché de las llamadas al LLM
+EXACT = "exact"
+NEAR = "near"
+
+NON_WORD = re.compile(r"[^\w]+")
+
+
+def _message_kwargs(item: Any) -> Dict[str, Any]:
+    """``kwargs`` de un mensaje serializado con ``langchain_core.load.dumps``."""
+    if isinstance(item, dict):
+        return item.get("kwargs", item)
+    return {"content": item}
+
+
+def normalize_messages(prompt: str) -> List[Any]:
+    """Mensajes de un prompt sin los campos que cambian en cada ejecución.
+
+    Se conservan tipo, autor, contenido y las llamadas a herramientas
+    (nombre y argumentos); se descartan ids y metadatos de respuesta, de
+    modo que el mismo prompt repetido en otra ejecución comparte clave.
+    """
+    try:
+        items = json.loads(prompt)
+    except ValueError:
+        return [prompt]
+    if not isinstance(items, list):
+        return [items]
+
+    normalized = []
+    for item in items:
+        kwargs = _message_kwargs(item)
+        message = [kwargs.get("type"), kwargs.get("name"), kwargs.get("content")]
+        tool_calls = kwargs.get("tool_calls")
+        if tool_calls:
+            message.append([[call.get("name"), call.get("args")] for call in tool_calls])
+        normalized.append(message)
+    return normalized
+
+
+def normalize_text(text: Any) -> str:
+    """Texto en minúsculas, sin puntuación y con los espacios colapsados."""
+    return " ".join(NON_WORD.sub(" ", str(text).lower()).split())
+
+
+def near_duplicate_messages(prompt: str) -> List[Any]:
+    """Vista de un prompt del supervisor que ignora diferencias irrelevantes.
+
+    Para decidir la ruta basta con la petición (normalizada) y qué workers han
+    informado y si lo hicieron con error; el texto de sus informes varía en
+    cada ejecución sin cambiar la decisión.
+    """
+    reduced = []
+    for kind, name, content, *_ in normalize_messages(prompt):
+        if name:
+            reduced.append([name, str(content).startswith("Error:")])
+        else:
+            reduced.append([kind, normalize_text(content)])
+    return reduced
+
+
+class LLMResponseCache(BaseCache):
+    """Caché de respuestas del LLM sobre un backend de ``app.cache``.
+
+    La clave combina el modelo y sus parámetros (incluidas las herramientas
+    enlazadas) con los mensajes normalizados. En modo ``NEAR`` se usan los
+    mensajes reducidos de ``near_duplicate_messages``.
+    """
+
+    def __init__(self, backend: CacheBackend, mode: str = EXACT,
+                 ttl_seconds: Optional[float] = None):
+        self.backend = backend
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        if self.mode == NEAR:
+            messages = near_duplicate_messages(prompt)
+        else:
+            messages = normalize_messages(prompt)
+        return make_cache_key(f"llm:{self.mode}", [llm_string, messages])
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.backend.get(self._key(prompt, llm_string))
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        try:
+            self.backend.set(self._key(prompt, llm_string), list(return_val), self.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Error guardando respuesta del LLM en caché: {str(e)}")
+
+    def clear(self, **kwargs: Any) -> None:
+        self.backend.clear()
+
+    # El backend no bloquea el event loop de forma apreciable
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        return self.lookup(prompt, llm_string)
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self.update(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        self.clear()
+
+
+def create_llm_cache_backend() -> CacheBackend:
+    """Backend de las respuestas del LLM según las variables de entorno."""
+    ttl_seconds = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+    backend: CacheBackend = MemoryLRUCache(
+        ttl_seconds=ttl_seconds,
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    )
+    sqlite_path = os.getenv("LLM_CACHE_SQLITE_PATH")
+    if sqlite_path:
+        backend = TieredCache(backend, SQLiteCache(sqlite_path, ttl_seconds=ttl_seconds))
+    return backend
+
+# Backend compartido por las cachés exacta y aproximada
+llm_cache_backend = create_llm_cache_backend()
+
+LLM_CACHES = {
+    EXACT: LLMResponseCache(llm_cache_backend, EXACT),
+    NEAR: LLMResponseCache(llm_cache_backend, NEAR),
+}
+
+
+def get_llm_cache(mode: Optional[str]) -> Optional[LLMResponseCache]:
+    """Caché para un modo (``EXACT``/``NEAR``) o None si el modo la desactiva."""
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    return LLM_CACHES.get(mode) if mode else None
@@ -1,24 +1,149 @@
+import atexit
+import contextlib
+import contextvars
+import copy
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, List
+
+# Campos de contexto que se añaden a cada registro (ver log_context)
+CONTEXT_FIELDS = ("execution_id", "node")
+
+# Longitud máxima de un mensaje; el resto se descarta
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+
+# Listeners en segundo plano de los loggers configurados
+_listeners: List[QueueListener] = []
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Añade campos (p. ej. ``execution_id`` o ``node``) a los logs del bloque."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copia al registro los campos de ``log_context`` del hilo o tarea actual."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Muestreo de eventos de alto volumen.
+
+    Un registro con ``extra={"sample_every": n}`` solo se emite la primera
+    vez y después una de cada ``n`` veces para el mismo mensaje.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._counts: Dict[Any, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, "sample_every", None)
+        if not every or every <= 1:
+            return True
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % every == 0
+
+
+class ContextQueueHandler(QueueHandler):
+    """Encola los registros para que un hilo en segundo plano los escriba.
+
+    El mensaje se formatea (y se trunca a ``max_chars``) en el hilo que
+    registra, porque sus argumentos pueden cambiar después; la escritura en
+    disco y consola la hace el ``QueueListener``.
+    """
+
+    def __init__(self, log_queue, max_chars: int = LOG_MAX_MESSAGE_CHARS):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars:
+            message = f"{message[:self.max_chars]}... [{len(message) - self.max_chars} caracteres omitidos]"
+        record.message = record.msg = message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatea cada registro como una línea JSON con sus campos de contexto."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False)
+
+
+def _stop_listeners():
+    while _listeners:
+        _listeners.pop().stop()
+
+atexit.register(_stop_listeners)
+
+
+def setup_logger(name: str, log_file: str = 'app.log', level=None, json_format=None):
+    """Configura y retorna un logger con rotación de archivos.
+
+    Los registros se encolan y un hilo en segundo plano los escribe, de modo
+    que quien registra no espera a la E/S de disco. Llamar varias veces con
+    el mismo nombre no duplica los handlers. ``LOG_LEVEL`` y ``LOG_FORMAT``
+    (``text`` o ``json``) fijan el nivel y el formato por defecto.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+    if any(isinstance(handler, ContextQueueHandler) for handler in logger.handlers):
+        return logger
 
-def setup_logger(name: str, log_file: str = 'app.log', level=logging.INFO):
-    """Configura y retorna un logger con rotación de archivos."""
-    
     # Crear el directorio de logs si no existe
-    log_dir = 'logs'
+    log_dir = os.getenv("LOG_DIR", "logs")
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    
-    # Configurar el logger
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    
-    # Formato del log
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
+
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+
     # Handler para archivo con rotación (máximo 5 archivos de 5MB cada uno)
     file_handler = RotatingFileHandler(
         os.path.join(log_dir, log_file),
@@ -26,16 +151,23 @@ def setup_logger(name: str, log_file: str = 'app.log', level=logging.INFO):
         backupCount=5
     )
     file_handler.setFormatter(formatter)
-    
+
     # Handler para consola
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    
-    # Agregar handlers al logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter())
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, file_handler, console_handler,
+                             respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+
     return logger
 
 # Crear logger por defecto
-logger = setup_logger('multiagent') 
\ No newline at end of file
+logger = setup_logger('multiagent')
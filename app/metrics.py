@@ -0,0 +1,371 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .logger import log_context
+
+# Límites de los histogramas de latencia, en segundos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monótono con etiquetas."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labelnames, key)), value)
+                    for key, value in sorted(self._values.items())]
+
+
+class Histogram(Counter):
+    """Histograma acumulativo con los límites ``buckets``."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # etiquetas -> (cuentas por bucket, suma, total)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._series[key] = (counts, total + value, count + 1)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[2] if series else 0
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket",
+                                    {**labels, "le": _format_value(float(bound))}, cumulative))
+                samples.append((f"{self.name}_sum", labels, total))
+                samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """Registro de métricas que se exporta en el formato de texto de Prometheus.
+
+    Además de contadores e histogramas admite colectores: funciones que al
+    exportar retornan ``(nombre, ayuda, [(etiquetas, valor), ...])`` con el
+    valor actual de un gauge (p. ej. las estadísticas de un caché).
+    """
+
+    def __init__(self):
+        self._metrics: List[Counter] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, List]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, List]]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collector in self._collectors:
+            for name, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} gauge")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def stats_collector(prefix: str, label: str, sources: Callable[[], Dict[str, Dict[str, Any]]],
+                    documentation: str) -> Callable[[], Iterable[Tuple[str, str, List]]]:
+    """Colector que publica cada estadística numérica de ``sources()`` como un gauge.
+
+    ``sources`` retorna las estadísticas de cada fuente; por ejemplo, con
+    ``prefix="multiagent_cache"`` y ``label="cache"`` el valor ``hits`` de
+    la fuente ``fetch`` se exporta como ``multiagent_cache_hits{cache="fetch"}``.
+    """
+    def collect():
+        series: Dict[str, List] = {}
+        for source, stats in sources().items():
+            for stat, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    series.setdefault(stat, []).append(({label: source}, value))
+        return [(f"{prefix}_{stat}", f"{documentation} ({stat})", samples)
+                for stat, samples in series.items()]
+    return collect
+
+
+# Registro global y métricas del sistema
+registry = MetricsRegistry()
+
+NODE_SECONDS = registry.histogram(
+    "multiagent_node_seconds", "Tiempo de reloj de cada nodo del grafo", ["node"])
+LLM_SECONDS = registry.histogram(
+    "multiagent_llm_seconds", "Latencia de las llamadas al LLM", ["node"])
+LLM_TOKENS = registry.counter(
+    "multiagent_llm_tokens_total", "Tokens de las llamadas al LLM", ["node", "kind"])
+TOOL_SECONDS = registry.histogram(
+    "multiagent_tool_seconds", "Duración de las llamadas a herramientas", ["tool"])
+TOOL_CALLS = registry.counter(
+    "multiagent_tool_calls_total", "Llamadas a herramientas", ["tool", "status"])
+RATE_LIMIT_WAIT_SECONDS = registry.histogram(
+    "multiagent_rate_limit_wait_seconds", "Esperas impuestas por los rate limiters", ["limiter"])
+EXECUTION_SECONDS = registry.histogram(
+    "multiagent_execution_seconds", "Duración total de las ejecuciones", ["status"])
+
+
+class ExecutionTimings:
+    """Desglose de tiempos, tokens y llamadas de una ejecución, por nodo y herramienta."""
+
+    def __init__(self, execution_id: str):
+        self.execution_id = execution_id
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.rate_limit_wait_seconds = 0.0
+        self.nodes: Dict[str, Dict[str, float]] = {}
+        self.tools: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, node: str, **values: float):
+        with self._lock:
+            self._add(self.nodes, node, values)
+
+    def add_tool(self, tool: str, **values: float):
+        with self._lock:
+            self._add(self.tools, tool, values)
+
+    @staticmethod
+    def _add(section: Dict[str, Dict[str, float]], name: str, values: Dict[str, float]):
+        stats = section.setdefault(name, {})
+        for key, value in values.items():
+            stats[key] = stats.get(key, 0) + value
+
+    def add_rate_limit_wait(self, seconds: float):
+        with self._lock:
+            self.rate_limit_wait_seconds += seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "seconds": round(self.seconds or time.perf_counter() - self.started, 3),
+                "rate_limit_wait_seconds": round(self.rate_limit_wait_seconds, 3),
+                "nodes": self._rounded(self.nodes),
+                "tools": self._rounded(self.tools),
+            }
+
+    @staticmethod
+    def _rounded(section: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+        return {name: {key: round(value, 3) for key, value in stats.items()}
+                for name, stats in section.items()}
+
+# Ejecución en curso; se propaga a los hilos y tareas que lanza el grafo
+current_execution: contextvars.ContextVar[Optional[ExecutionTimings]] = contextvars.ContextVar(
+    "current_execution", default=None)
+
+
+@contextlib.contextmanager
+def execution_context(execution_id: str):
+    """Asocia las métricas registradas dentro del bloque a una ejecución."""
+    timings = ExecutionTimings(execution_id)
+    token = current_execution.set(timings)
+    status = "done"
+    try:
+        with log_context(execution_id=execution_id):
+            yield timings
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        current_execution.reset(token)
+        timings.seconds = time.perf_counter() - timings.started
+        EXECUTION_SECONDS.observe(timings.seconds, status=status)
+
+
+def record_node(node: str, seconds: float):
+    NODE_SECONDS.observe(seconds, node=node)
+    timings = current_execution.get()
+    if timings is not None:
+        timings.add(node, calls=1, seconds=seconds)
+
+
+def record_rate_limit_wait(limiter: str, seconds: float):
+    RATE_LIMIT_WAIT_SECONDS.observe(seconds, limiter=limiter)
+    timings = current_execution.get()
+    if timings is not None:
+        timings.add_rate_limit_wait(seconds)
+
+
+def timed_node(name: str, func: Callable) -> Callable:
+    """Envuelve un nodo del grafo (síncrono o asíncrono) para medir su duración."""
+    if asyncio.iscoroutinefunction(func) or asyncio.iscoroutinefunction(getattr(func, "func", None)):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with log_context(node=name):
+                    return await func(*args, **kwargs)
+            finally:
+                record_node(name, time.perf_counter() - started)
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with log_context(node=name):
+                return func(*args, **kwargs)
+        finally:
+            record_node(name, time.perf_counter() - started)
+    return wrapper
+
+
+def _token_usage(response) -> Tuple[int, int]:
+    """Tokens de prompt y de respuesta de un ``LLMResult``."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += metadata.get("input_tokens", 0)
+            completion_tokens += metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Mide latencia y tokens del LLM y llamadas a herramientas por nodo."""
+
+    # Se ejecuta en línea: solo actualiza contadores en memoria
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._starts: Dict[UUID, Tuple[float, str]] = {}
+
+    def _start(self, run_id: UUID, name: str):
+        with self._lock:
+            self._starts[run_id] = (time.perf_counter(), name)
+
+    def _stop(self, run_id: UUID) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            start = self._starts.pop(run_id, None)
+        if start is None:
+            return None
+        return time.perf_counter() - start[0], start[1]
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs):
+        self._start(run_id, (metadata or {}).get("langgraph_node", "unknown"))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs):
+        self._start(run_id, (metadata or {}).get("langgraph_node", "unknown"))
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        stopped = self._stop(run_id)
+        if stopped is None:
+            return
+        seconds, node = stopped
+        prompt_tokens, completion_tokens = _token_usage(response)
+        LLM_SECONDS.observe(seconds, node=node)
+        LLM_TOKENS.inc(prompt_tokens, node=node, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, node=node, kind="completion")
+        timings = current_execution.get()
+        if timings is not None:
+            timings.add(node, llm_calls=1, llm_seconds=seconds,
+                        prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._stop(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, metadata=None, **kwargs):
+        tool = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._start(run_id, tool)
+
+    def _tool_finished(self, run_id: UUID, status: str):
+        stopped = self._stop(run_id)
+        if stopped is None:
+            return
+        seconds, tool = stopped
+        TOOL_SECONDS.observe(seconds, tool=tool)
+        TOOL_CALLS.inc(tool=tool, status=status)
+        timings = current_execution.get()
+        if timings is not None:
+            timings.add_tool(tool, calls=1, seconds=seconds)
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs):
+        self._tool_finished(run_id, "ok")
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs):
+        self._tool_finished(run_id, "error")
+
+# Handler compartido que se pasa en la configuración de cada ejecución
+metrics_callback = MetricsCallbackHandler()
@@ -1,68 +1,187 @@
 import os
 from dotenv import load_dotenv, find_dotenv
 import functools
-import operator
+import httpx
 import requests
 import warnings
-from bs4 import BeautifulSoup
 from langchain.agents import AgentExecutor, create_openai_tools_agent
-from langchain_core.messages import HumanMessage, BaseMessage
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langgraph.graph import StateGraph, END
-from langchain.tools import tool
+from langchain.tools import StructuredTool
 from langchain_openai import ChatOpenAI
-from typing import TypedDict, Annotated, Sequence, Literal
-from langchain_community.tools.tavily_search import TavilySearchResults
+from typing import Dict, List, Optional
 
 from .logger import logger
-from .rate_limiter import rate_limit
+from .routing import (Route, content_marketing_team, options, plan_route,
+                      fallback_route, guard_route, route_key)
+from .rate_limiter import rate_limit, host_key
 from .cache import cached
-from .validators import validate_url, validate_prompt, sanitize_input, validate_api_key
+from .checkpoint import get_checkpointer
+from .llm_cache import EXACT, get_llm_cache
+from .metrics import timed_node
+from .fetcher import fetcher, FetchError, FetchResult
+from .search import make_search_tool
+from .extraction import extract_main_text, load_encoding, normalize_plain_text, truncate_to_tokens
+from .state import (AgentState, ERROR_PREFIX, select_messages, supervisor_messages,
+                    count_message_tokens, count_text_tokens)
+from .validators import validate_url, validate_api_key, canonicalize_url
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, message="invalid escape sequence")
 
 # Cargar variables de entorno
 load_dotenv(find_dotenv())
 
-# Verificar API key
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key or not validate_api_key(api_key):
-    raise ValueError("OPENAI_API_KEY inválida o no definida en las variables de entorno")
-
 # Configuración del modelo
 MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "gpt-4-turbo-preview")
-llm = ChatOpenAI(model=MODEL_NAME)
 
-@tool("process_search_tool", return_direct=False)
-@rate_limit(calls_per_minute=30)
-@cached(ttl_seconds=3600)
-def process_search_tool(url: str) -> str:
-    """Parse web content with BeautifulSoup"""
+# El cliente del modelo, los agentes y el grafo se crean en el primer uso
+# (ver get_llm, get_agents y get_graph): importar este módulo no valida la
+# API key ni hace llamadas al LLM.
+
+def llm_cache_mode(node: str) -> Optional[str]:
+    """Modo de caché de las respuestas del LLM para un nodo (None la desactiva).
+
+    Todos los nodos usan por defecto la caché exacta. El supervisor puede
+    optar por la aproximada (``LLM_CACHE_SUPERVISOR_MODE=near``), que reutiliza
+    decisiones para peticiones parecidas con los mismos workers informados.
+    """
+    skipped = {name.strip() for name in os.getenv("LLM_CACHE_SKIP_NODES", "").split(",")}
+    if node in skipped:
+        return None
+    if node == "content_marketing_manager":
+        return os.getenv("LLM_CACHE_SUPERVISOR_MODE", EXACT)
+    return EXACT
+
+@functools.lru_cache(maxsize=None)
+def get_llm(model_name: str = MODEL_NAME, cache_mode: Optional[str] = EXACT) -> ChatOpenAI:
+    """Cliente del modelo, creado una vez por nombre de modelo y modo de caché."""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key or not validate_api_key(api_key):
+        raise ValueError("OPENAI_API_KEY inválida o no definida en las variables de entorno")
+    return ChatOpenAI(model=model_name, cache=get_llm_cache(cache_mode) or False)
+
+# Límite de cortesía por sitio web para las descargas
+FETCH_HOST_CALLS_PER_MINUTE = int(os.getenv("FETCH_HOST_CALLS_PER_MINUTE", "10"))
+
+# Presupuesto de tokens del texto de cada página que llega a los agentes
+FETCH_MAX_TOKENS = int(os.getenv("FETCH_MAX_TOKENS", "2000"))
+
+# Prefijos de los mensajes de error que retornan las herramientas de descarga
+FETCH_ERROR_PREFIXES = ("Error al acceder", "Error inesperado")
+
+def decode_plain_text(result: FetchResult) -> str:
+    """Decodifica un documento de texto plano; sin charset válido se asume UTF-8."""
+    try:
+        return result.content.decode(result.encoding or "utf-8", "replace")
+    except LookupError:
+        return result.content.decode("utf-8", "replace")
+
+def extract_page_text(result: FetchResult) -> str:
+    """Extrae el texto principal de una página descargada, acotado a FETCH_MAX_TOKENS."""
+    if result.content_type.startswith("text/plain"):
+        text = normalize_plain_text(decode_plain_text(result))
+        text = truncate_to_tokens(text, FETCH_MAX_TOKENS)
+    else:
+        text = extract_main_text(result.content, max_tokens=FETCH_MAX_TOKENS)
+
+    if not text:
+        logger.warning(f"No se pudo extraer contenido de {result.url}")
+        return "No se pudo extraer contenido del sitio web."
+
+    return text
+
+def is_fetch_error(text: str) -> bool:
+    """Indica si el resultado de una descarga es un mensaje de error."""
+    return text.startswith(FETCH_ERROR_PREFIXES)
+
+@cached(ttl_seconds=3600, key_func=canonicalize_url, is_error=is_fetch_error,
+        error_ttl_seconds=120, namespace="fetch_page")
+@rate_limit(calls_per_minute=30, namespace="fetch_page")
+@rate_limit(calls_per_minute=FETCH_HOST_CALLS_PER_MINUTE, burst=2,
+            key_func=host_key, namespace="fetch_page_host")
+def fetch_page(url: str) -> str:
+    """Extract the main readable text of a web page"""
     try:
         if not validate_url(url):
             raise ValueError("URL inválida: debe comenzar con http:// o https://")
             
-        response = requests.get(url=url, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, "html.parser")
-        text = soup.get_text(strip=True)
-        
-        if not text:
-            logger.warning(f"No se pudo extraer contenido de {url}")
-            return "No se pudo extraer contenido del sitio web."
-            
-        return text
+        return fetcher.fetch(url, transform=extract_page_text).data
         
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, FetchError) as e:
+        logger.error(f"Error al acceder a la URL {url}: {str(e)}")
+        return f"Error al acceder a la URL: {str(e)}"
+    except Exception as e:
+        logger.error(f"Error inesperado procesando {url}: {str(e)}")
+        return f"Error inesperado: {str(e)}"
+
+@cached(ttl_seconds=3600, key_func=canonicalize_url, is_error=is_fetch_error,
+        error_ttl_seconds=120, namespace="fetch_page")
+@rate_limit(calls_per_minute=30, namespace="fetch_page")
+@rate_limit(calls_per_minute=FETCH_HOST_CALLS_PER_MINUTE, burst=2,
+            key_func=host_key, namespace="fetch_page_host")
+async def afetch_page(url: str) -> str:
+    """Versión asíncrona de ``fetch_page`` sobre el cliente HTTP compartido."""
+    try:
+        if not validate_url(url):
+            raise ValueError("URL inválida: debe comenzar con http:// o https://")
+
+        return (await fetcher.afetch(url, transform=extract_page_text)).data
+
+    except (httpx.HTTPError, FetchError) as e:
         logger.error(f"Error al acceder a la URL {url}: {str(e)}")
         return f"Error al acceder a la URL: {str(e)}"
     except Exception as e:
         logger.error(f"Error inesperado procesando {url}: {str(e)}")
         return f"Error inesperado: {str(e)}"
 
-tools = [TavilySearchResults(max_results=1), process_search_tool]
+process_search_tool = StructuredTool.from_function(
+    func=fetch_page,
+    coroutine=afetch_page,
+    name="process_search_tool",
+    description="Extract the main readable text of a web page",
+    return_direct=False
+)
+
+# Máximo de URLs por llamada a la herramienta de descarga por lotes
+MAX_BATCH_URLS = 5
+
+def format_pages(urls: List[str], texts: List) -> str:
+    """Une el contenido de varias páginas en una única respuesta."""
+    sections = []
+    for url, text in zip(urls, texts):
+        if isinstance(text, Exception):
+            text = f"Error inesperado: {str(text)}"
+        sections.append(f"### {url}\n{text}")
+    return "\n\n".join(sections)
+
+def fetch_pages(urls: List[str]) -> str:
+    """Parse the web content of several URLs in parallel"""
+    urls = urls[:MAX_BATCH_URLS]
+    return format_pages(urls, fetcher.fetch_many(urls, func=fetch_page))
+
+async def afetch_pages(urls: List[str]) -> str:
+    """Versión asíncrona de ``fetch_pages``."""
+    urls = urls[:MAX_BATCH_URLS]
+    return format_pages(urls, await fetcher.afetch_many(urls, func=afetch_page))
+
+process_search_batch_tool = StructuredTool.from_function(
+    func=fetch_pages,
+    coroutine=afetch_pages,
+    name="process_search_batch_tool",
+    description=f"Parse the web content of up to {MAX_BATCH_URLS} URLs in one call",
+    return_direct=False
+)
+
+@functools.lru_cache(maxsize=None)
+def get_tools() -> list:
+    """Herramientas compartidas por los agentes.
+
+    La búsqueda descarga las primeras páginas a través de ``fetch_page``,
+    así que comparten caché y límites con ``process_search_tool``.
+    """
+    return [make_search_tool(fetch_page, afetch_page, is_fetch_error),
+            process_search_tool, process_search_batch_tool]
 
 def create_new_agent(llm: ChatOpenAI,
                   tools: list,
@@ -78,17 +197,40 @@ def create_new_agent(llm: ChatOpenAI,
 
     agent = create_openai_tools_agent(llm, tools, prompt)
     executor = AgentExecutor(agent=agent, tools=tools)
+    # Los tokens del system prompt se cuentan una sola vez por agente
+    executor.metadata = {"system_prompt_tokens": count_text_tokens(system_prompt)}
     return executor
 
+def agent_input(state, agent, name):
+    """Entrada del agente con solo los mensajes que necesita y su coste en tokens."""
+    messages = select_messages(state["messages"], name, state.get("reports"))
+    tokens = agent.metadata["system_prompt_tokens"] + count_message_tokens(messages)
+    return {"messages": messages}, {name: tokens}
+
 def agent_node(state, agent, name):
+    inputs, tokens = agent_input(state, agent, name)
     try:
-        result = agent.invoke(state)
-        return {"messages": [HumanMessage(content=result["output"], name=name)]}
+        result = agent.invoke(inputs)
+        report = HumanMessage(content=result["output"], name=name)
+        return {"messages": [report], "reports": {name: report},
+                "prompt_tokens": tokens, "completed": [name]}
     except Exception as e:
         logger.error(f"Error en agente {name}: {str(e)}")
-        return {"messages": [HumanMessage(content=f"Error: {str(e)}", name=name)]}
+        return {"messages": [HumanMessage(content=f"{ERROR_PREFIX}{str(e)}", name=name)],
+                "prompt_tokens": tokens}
 
-content_marketing_team = ["online_researcher", "blog_manager", "social_media_manager"]
+async def aagent_node(state, agent, name):
+    """Versión asíncrona de ``agent_node`` basada en ``ainvoke``."""
+    inputs, tokens = agent_input(state, agent, name)
+    try:
+        result = await agent.ainvoke(inputs)
+        report = HumanMessage(content=result["output"], name=name)
+        return {"messages": [report], "reports": {name: report},
+                "prompt_tokens": tokens, "completed": [name]}
+    except Exception as e:
+        logger.error(f"Error en agente {name}: {str(e)}")
+        return {"messages": [HumanMessage(content=f"{ERROR_PREFIX}{str(e)}", name=name)],
+                "prompt_tokens": tokens}
 
 system_prompt = (
     "As a content marketing manager, your role is to oversee the insight between these"
@@ -98,8 +240,6 @@ system_prompt = (
     " Once all tasks are completed, indicate 'FINISH'."
 )
 
-options = ["FINISH"] + content_marketing_team
-
 prompt = ChatPromptTemplate.from_messages([
     ("system", system_prompt),
     MessagesPlaceholder(variable_name="messages"),
@@ -107,35 +247,61 @@ prompt = ChatPromptTemplate.from_messages([
      "Given the conversation above, who should act next? Or should we FINISH? Select one of: {options}"),
 ]).partial(options=str(options), content_marketing_team=", ".join(content_marketing_team))
 
-def content_marketing_manager(state):
-    """Función que maneja la lógica del content marketing manager."""
-    result = prompt | llm | StrOutputParser()
-    response = result.invoke(state)
-    
-    # Extraer el nombre del agente o FINISH de la respuesta
-    for option in options:
-        if option.lower() in response.lower():
-            return {"next": option}
-    
-    # Si no se encuentra una opción válida, por defecto ir al investigador
-    return {"next": "online_researcher"}
-
-online_researcher_agent = create_new_agent(
-    llm,
-    tools,
-    """Your primary role is to function as an intelligent online research assistant, adept at scouring 
+@functools.lru_cache(maxsize=None)
+def get_supervisor_chain(model_name: str = MODEL_NAME):
+    """Cadena del supervisor; la respuesta es una llamada a función validada contra ``Route``."""
+    llm = get_llm(model_name, llm_cache_mode("content_marketing_manager"))
+    return prompt | llm.with_structured_output(Route, method="function_calling")
+
+def supervisor_input(state):
+    """Vista compacta del estado para el supervisor y su coste en tokens."""
+    messages = supervisor_messages(state["messages"])
+    tokens = count_message_tokens(prompt.format_messages(messages=messages))
+    return {"messages": messages}, {"content_marketing_manager": tokens}
+
+def supervisor_update(state, route, tokens: dict) -> dict:
+    """Aplica la detección de bucles y registra la decisión del supervisor.
+
+    ``route`` puede ser una lista de workers, que se ejecutan en paralelo.
+    """
+    route = guard_route(state, route)
+    return {"next": route, "route_history": [route_key(route)], "prompt_tokens": tokens}
+
+def content_marketing_manager(state, chain):
+    """Función que maneja la lógica del content marketing manager.
+
+    Si la ejecución sigue un plan, la ruta se decide sin llamar al LLM.
+    """
+    route = plan_route(state)
+    if route is not None:
+        return supervisor_update(state, route, {})
+    inputs, tokens = supervisor_input(state)
+    try:
+        route = chain.invoke(inputs).next
+    except Exception as e:
+        logger.error(f"Respuesta inválida del supervisor: {str(e)}")
+        route = fallback_route(state)
+    return supervisor_update(state, route, tokens)
+
+async def acontent_marketing_manager(state, chain):
+    """Versión asíncrona del content marketing manager."""
+    route = plan_route(state)
+    if route is not None:
+        return supervisor_update(state, route, {})
+    inputs, tokens = supervisor_input(state)
+    try:
+        route = (await chain.ainvoke(inputs)).next
+    except Exception as e:
+        logger.error(f"Respuesta inválida del supervisor: {str(e)}")
+        route = fallback_route(state)
+    return supervisor_update(state, route, tokens)
+
+ONLINE_RESEARCHER_PROMPT = """Your primary role is to function as an intelligent online research assistant, adept at scouring 
     the internet for the latest and most relevant trending stories across various sectors like politics, technology, 
     health, culture, and global events. You possess the capability to access a wide range of online news sources, 
     blogs, and social media platforms to gather real-time information."""
-)
-
-online_researcher_node = functools.partial(
-    agent_node, agent=online_researcher_agent, name="online_researcher"
-)
 
-blog_manager_agent = create_new_agent(
-    llm, tools,
-    """You are a Blog Manager. The role of a Blog Manager encompasses several critical responsibilities aimed at transforming initial drafts into polished, SEO-optimized blog articles that engage and grow an audience. Starting with drafts provided by online researchers, the Blog Manager must thoroughly understand the content, ensuring it aligns with the blog's tone, target audience, and thematic goals. Key responsibilities include:
+BLOG_MANAGER_PROMPT = """You are a Blog Manager. The role of a Blog Manager encompasses several critical responsibilities aimed at transforming initial drafts into polished, SEO-optimized blog articles that engage and grow an audience. Starting with drafts provided by online researchers, the Blog Manager must thoroughly understand the content, ensuring it aligns with the blog's tone, target audience, and thematic goals. Key responsibilities include:
 
 1. Content Enhancement: Elevate the draft's quality by improving clarity, flow, and engagement. This involves refining the narrative, adding compelling headers, and ensuring the article is reader-friendly and informative.
 
@@ -147,14 +313,9 @@ blog_manager_agent = create_new_agent(
 
 5. Analytics and Feedback Integration: Regularly review performance metrics to understand audience engagement and preferences. Use this data to refine future content and optimize overall blog strategy.
 
-In summary, the Blog Manager plays a pivotal role in bridging initial research and the final publication by enhancing content quality, ensuring SEO compatibility, and aligning with the strategic objectives of the blog. This position requires a blend of creative, technical, and analytical skills to successfully manage and grow the blog's presence online.""")
-
-blog_manager_node = functools.partial(
-    agent_node, agent=blog_manager_agent, name="blog_manager")
+In summary, the Blog Manager plays a pivotal role in bridging initial research and the final publication by enhancing content quality, ensuring SEO compatibility, and aligning with the strategic objectives of the blog. This position requires a blend of creative, technical, and analytical skills to successfully manage and grow the blog's presence online."""
 
-social_media_manager_agent = create_new_agent(
-    llm, tools,
-    """You are a Social Media Manager. The role of a Social Media Manager, particularly for managing Twitter content, involves transforming research drafts into concise, engaging tweets that resonate with the audience and adhere to platform best practices. Upon receiving a draft from an online researcher, the Social Media Manager is tasked with several critical functions:
+SOCIAL_MEDIA_MANAGER_PROMPT = """You are a Social Media Manager. The role of a Social Media Manager, particularly for managing Twitter content, involves transforming research drafts into concise, engaging tweets that resonate with the audience and adhere to platform best practices. Upon receiving a draft from an online researcher, the Social Media Manager is tasked with several critical functions:
 
 1. Content Condensation: Distill the core message of the draft into a tweet, which typically allows for only 280 characters. This requires a sharp focus on brevity while maintaining the essence and impact of the message.
 
@@ -162,45 +323,115 @@ social_media_manager_agent = create_new_agent(
 
 3. Compliance and Best Practices: Ensure that the tweets follow Twitter's guidelines and best practices, including the appropriate use of mentions, hashtags, and links. Also, adhere to ethical standards, avoiding misinformation and respecting copyright norms.
 
-In summary, the Social Media Manager's role is crucial in leveraging Twitter to disseminate information effectively, engage with followers, and build the brand's presence online. This position combines creative communication skills with strategic planning and analysis to optimize social media impact.""")
-
-social_media_manager_node = functools.partial(
-    agent_node, agent=social_media_manager_agent, name="social_media_manager")
-
-class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], operator.add]
-    next: str
-    
-workflow = StateGraph(AgentState)
-
-workflow.add_node("content_marketing_manager", action=content_marketing_manager)
-workflow.add_node("online_researcher", action=online_researcher_node)
-workflow.add_node("blog_manager", action=blog_manager_node)
-workflow.add_node("social_media_manager", action=social_media_manager_node)
-
-for member in content_marketing_team:
-    workflow.add_edge(start_key=member, end_key="content_marketing_manager")
-
-conditional_map = {k: k for k in content_marketing_team}
-conditional_map['FINISH'] = END
-
-workflow.add_conditional_edges(
-    "content_marketing_manager", lambda x: x["next"], conditional_map)
-
-workflow.set_entry_point("content_marketing_manager")
-
-multiagent = workflow.compile()
-
-for s in multiagent.stream(
-    {
+In summary, the Social Media Manager's role is crucial in leveraging Twitter to disseminate information effectively, engage with followers, and build the brand's presence online. This position combines creative communication skills with strategic planning and analysis to optimize social media impact."""
+
+AGENT_PROMPTS = {
+    "online_researcher": ONLINE_RESEARCHER_PROMPT,
+    "blog_manager": BLOG_MANAGER_PROMPT,
+    "social_media_manager": SOCIAL_MEDIA_MANAGER_PROMPT,
+}
+
+@functools.lru_cache(maxsize=None)
+def get_agents(model_name: str = MODEL_NAME) -> Dict[str, AgentExecutor]:
+    """Agentes del equipo, creados una vez por modelo."""
+    tools = get_tools()
+    return {name: create_new_agent(get_llm(model_name, llm_cache_mode(name)),
+                                   tools, AGENT_PROMPTS[name])
+            for name in content_marketing_team}
+
+def build_workflow(use_async: bool = False, model_name: str = MODEL_NAME, checkpointer=None):
+    """Construye y compila el grafo con nodos síncronos o asíncronos.
+
+    Con ``checkpointer`` el estado se guarda tras cada paso y cada
+    ejecución necesita un ``thread_id`` en la configuración.
+    """
+    chain = get_supervisor_chain(model_name)
+    agents = get_agents(model_name)
+    if use_async:
+        supervisor = functools.partial(acontent_marketing_manager, chain=chain)
+        node = aagent_node
+    else:
+        supervisor = functools.partial(content_marketing_manager, chain=chain)
+        node = agent_node
+    nodes = {
+        member: functools.partial(node, agent=agents[member], name=member)
+        for member in content_marketing_team
+    }
+
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("content_marketing_manager",
+                      action=timed_node("content_marketing_manager", supervisor))
+    for member in content_marketing_team:
+        workflow.add_node(member, action=timed_node(member, nodes[member]))
+
+    for member in content_marketing_team:
+        workflow.add_edge(start_key=member, end_key="content_marketing_manager")
+
+    conditional_map = {k: k for k in content_marketing_team}
+    conditional_map['FINISH'] = END
+
+    # Si "next" es una lista, sus workers se ejecutan en el mismo paso y el
+    # supervisor se reanuda una sola vez, con los informes de todos ellos
+    workflow.add_conditional_edges(
+        "content_marketing_manager", lambda x: x["next"], conditional_map)
+
+    workflow.set_entry_point("content_marketing_manager")
+
+    return workflow.compile(checkpointer=checkpointer)
+
+@functools.lru_cache(maxsize=None)
+def get_graph(use_async: bool = False, model_name: str = MODEL_NAME, checkpointed: bool = False):
+    """Grafo compilado, construido en el primer uso y reutilizado.
+
+    Con ``use_async`` los nodos usan ``ainvoke`` (ainvoke/astream de punta a punta).
+    Con ``checkpointed`` guarda el estado en el almacén de checkpoints (ver
+    ``app.checkpoint``), para reanudar o bifurcar ejecuciones.
+    """
+    checkpointer = get_checkpointer() if checkpointed else None
+    return build_workflow(use_async=use_async, model_name=model_name, checkpointer=checkpointer)
+
+def build_input(prompt: str, plan: Optional[List] = None) -> Dict:
+    """Estado inicial del grafo para un prompt y, opcionalmente, un plan fijo."""
+    state = {
         "messages": [
-            HumanMessage(
-                content="""Write me a report on Agentic Behavior. After the research on Agentic Behavior,pass the findings to the blog manager to generate the final blog article. Once done, pass it to the social media manager to write a tweet on the subject."""
-            )
+            HumanMessage(content=prompt)
         ],
-    },
-    # Maximum number of steps to take in the multiagent
-    {"recursion_limit": 150}
-):
-    if not "__end__" in s:
-        print(s, end="\n\n-----------------\n\n")
+    }
+    if plan:
+        state["plan"] = list(plan)
+    return state
+
+# Atributos de compatibilidad que se crean bajo demanda
+LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "tools": get_tools,
+    "supervisor_chain": get_supervisor_chain,
+    "multiagent": get_graph,
+    "amultiagent": functools.partial(get_graph, use_async=True),
+}
+
+def __getattr__(name):
+    if name in LAZY_ATTRIBUTES:
+        return LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def main():
+    """Ejecuta una petición de ejemplo y muestra cada paso: python -m app.multiagent"""
+    load_encoding()
+    for s in get_graph().stream(
+        {
+            "messages": [
+                HumanMessage(
+                    content="""Write me a report on Agentic Behavior. After the research on Agentic Behavior,pass the findings to the blog manager to generate the final blog article. Once done, pass it to the social media manager to write a tweet on the subject."""
+                )
+            ],
+        },
+        # Maximum number of steps to take in the multiagent
+        {"recursion_limit": 150}
+    ):
+        if not "__end__" in s:
+            print(s, end="\n\n-----------------\n\n")
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,255 @@
+import asyncio
+import hashlib
+import os
+import threading
 import time
 from functools import wraps
-from typing import Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
 from .logger import logger
+from .metrics import record_rate_limit_wait
+from .sqlite_utils import SQLiteConnectionMixin
+
+# Solo se registra una de cada N esperas por rate limit (bajo carga hay muchas)
+RATE_LIMIT_LOG_SAMPLE = int(os.getenv("RATE_LIMIT_LOG_SAMPLE", "10"))
+
+
+class BucketStore:
+    """Almacén del estado de los buckets de rate limiting.
+
+    Se usa el algoritmo GCRA (equivalente a un token bucket): cada clave
+    guarda un único número, el instante teórico de la próxima llegada
+    (TAT), por lo que la contabilidad es O(1) por llamada.
+    """
+
+    def reserve(self, key: str, interval: float, burst: int, now: float) -> float:
+        """Reserva un turno para ``key`` y retorna los segundos a esperar."""
+        raise NotImplementedError
+
+    def peek(self, key: str, interval: float, burst: int, now: float) -> float:
+        """Segundos a esperar para ``key`` sin reservar turno."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _gcra(tat: Optional[float], interval: float, burst: int, now: float):
+        """Retorna ``(espera, nuevo_tat)`` para una llamada en ``now``."""
+        tat = max(tat or now, now)
+        allow_at = tat - (burst - 1) * interval
+        return max(0.0, allow_at - now), tat + interval
+
+
+class MemoryBucketStore(BucketStore):
+    """Estado en memoria del proceso, seguro entre hilos."""
+
+    def __init__(self, cleanup_every: int = 1000):
+        self._lock = threading.Lock()
+        self._tats: Dict[str, float] = {}
+        self._calls = 0
+        self.cleanup_every = cleanup_every
+
+    def reserve(self, key: str, interval: float, burst: int, now: float) -> float:
+        with self._lock:
+            wait, self._tats[key] = self._gcra(self._tats.get(key), interval, burst, now)
+            self._calls += 1
+            if self._calls % self.cleanup_every == 0:
+                self._cleanup(now)
+            return wait
+
+    def peek(self, key: str, interval: float, burst: int, now: float) -> float:
+        with self._lock:
+            return self._gcra(self._tats.get(key), interval, burst, now)[0]
+
+    def _cleanup(self, now: float):
+        """Elimina las claves cuyo bucket ya está lleno (sin estado relevante)."""
+        stale = [key for key, tat in self._tats.items() if tat <= now]
+        for key in stale:
+            del self._tats[key]
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class SQLiteBucketStore(SQLiteConnectionMixin, BucketStore):
+    """Estado compartido entre procesos del mismo host mediante SQLite."""
+
+    isolation_level = None
+
+    def __init__(self, path: str, cleanup_every: int = 1000):
+        self.cleanup_every = cleanup_every
+        self._calls = 0
+        self._init_sqlite(path)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tat REAL NOT NULL)"
+            )
+
+    def reserve(self, key: str, interval: float, burst: int, now: float) -> float:
+        conn = self._connection()
+        # BEGIN IMMEDIATE serializa la lectura y escritura entre procesos
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM buckets WHERE key = ?", (key,)).fetchone()
+            wait, tat = self._gcra(row[0] if row else None, interval, burst, now)
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tat) VALUES (?, ?)", (key, tat))
+            self._calls += 1
+            if self._calls % self.cleanup_every == 0:
+                conn.execute("DELETE FROM buckets WHERE tat <= ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def peek(self, key: str, interval: float, burst: int, now: float) -> float:
+        row = self._connection().execute(
+            "SELECT tat FROM buckets WHERE key = ?", (key,)
+        ).fetchone()
+        return self._gcra(row[0] if row else None, interval, burst, now)[0]
+
+
+def create_bucket_store() -> BucketStore:
+    """Crea el almacén por defecto según ``RATE_LIMIT_SQLITE_PATH``."""
+    path = os.getenv("RATE_LIMIT_SQLITE_PATH")
+    if path:
+        return SQLiteBucketStore(path)
+    return MemoryBucketStore()
+
+
+# Almacén compartido por todos los limitadores del proceso
+default_store = create_bucket_store()
+
 
 class RateLimiter:
-    def __init__(self, calls_per_minute: int = 60):
+    """Limitador de ``calls_per_minute`` llamadas por clave con ráfagas de ``burst``.
+
+    ``acquire`` bloquea el hilo y ``aacquire`` cede el event loop mientras se
+    espera. Cada llamada reserva su turno al entrar, de modo que los
+    llamadores concurrentes quedan escalonados en lugar de despertar a la vez.
+    """
+
+    def __init__(self, calls_per_minute: int = 60, burst: Optional[int] = None,
+                 store: Optional[BucketStore] = None, name: str = "default"):
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute debe ser positivo")
+        self.name = name
         self.calls_per_minute = calls_per_minute
-        self.calls: Dict[str, list] = {}
-    
-    def _clean_old_calls(self, key: str):
-        """Elimina llamadas más antiguas que 1 minuto."""
-        current_time = time.time()
-        self.calls[key] = [t for t in self.calls.get(key, []) 
-                          if current_time - t < 60]
-    
+        self.interval = 60.0 / calls_per_minute
+        self.burst = burst or calls_per_minute
+        self.store = store if store is not None else default_store
+        self.wait_seconds_total = 0.0
+        self.throttled_calls = 0
+
+    def reserve(self, key: str) -> float:
+        """Reserva un turno y retorna los segundos que hay que esperar."""
+        wait = self.store.reserve(key, self.interval, self.burst, time.time())
+        if wait > 0:
+            self.throttled_calls += 1
+            self.wait_seconds_total += wait
+            record_rate_limit_wait(self.name, wait)
+        return wait
+
     def is_rate_limited(self, key: str) -> bool:
         """Verifica si una clave está rate limited."""
-        self._clean_old_calls(key)
-        return len(self.calls.get(key, [])) >= self.calls_per_minute
-    
-    def add_call(self, key: str):
-        """Registra una nueva llamada."""
-        if key not in self.calls:
-            self.calls[key] = []
-        self.calls[key].append(time.time())
-    
+        return self.get_wait_time(key) > 0
+
     def get_wait_time(self, key: str) -> float:
-        """Calcula el tiempo de espera necesario."""
-        self._clean_old_calls(key)
-        if not self.calls.get(key):
-            return 0
-        
-        oldest_call = min(self.calls[key])
-        return max(0, 60 - (time.time() - oldest_call))
-
-def rate_limit(calls_per_minute: int = 60):
-    """Decorador para implementar rate limiting."""
-    limiter = RateLimiter(calls_per_minute)
-    
+        """Calcula el tiempo de espera necesario sin consumir un turno."""
+        return self.store.peek(key, self.interval, self.burst, time.time())
+
+    def acquire(self, key: str) -> float:
+        """Espera (bloqueando) hasta poder realizar la llamada."""
+        wait = self.reserve(key)
+        if wait > 0:
+            logger.warning("Rate limit alcanzado para %s. Esperando %.2f segundos.", key, wait,
+                           extra={"sample_every": RATE_LIMIT_LOG_SAMPLE})
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, key: str) -> float:
+        """Espera sin bloquear el event loop hasta poder realizar la llamada."""
+        wait = self.reserve(key)
+        if wait > 0:
+            logger.warning("Rate limit alcanzado para %s. Esperando %.2f segundos.", key, wait,
+                           extra={"sample_every": RATE_LIMIT_LOG_SAMPLE})
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de llamadas limitadas y tiempo total de espera."""
+        return {
+            "calls_per_minute": self.calls_per_minute,
+            "burst": self.burst,
+            "throttled_calls": self.throttled_calls,
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+        }
+
+
+def host_key(url: str, *args, **kwargs) -> str:
+    """Función de clave por host, para límites de cortesía con cada sitio."""
+    try:
+        return (urlsplit(url).hostname or url).lower()
+    except (ValueError, AttributeError):
+        return str(url)
+
+
+def api_key(env_var: str) -> Callable[..., str]:
+    """Función de clave por API key (se usa una huella, nunca la clave)."""
+    def key_func(*args, **kwargs) -> str:
+        value = os.getenv(env_var, "")
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+    return key_func
+
+
+# Limitadores creados con ``rate_limit``, por namespace (para las métricas)
+limiters: Dict[str, List[RateLimiter]] = {}
+
+
+def limiter_stats() -> Dict[str, Dict[str, float]]:
+    """Llamadas limitadas y espera total de los limitadores de cada namespace."""
+    stats = {}
+    for name, group in limiters.items():
+        stats[name] = {
+            "throttled_calls": sum(limiter.throttled_calls for limiter in group),
+            "wait_seconds_total": sum(limiter.wait_seconds_total for limiter in group),
+        }
+    return stats
+
+
+def rate_limit(calls_per_minute: int = 60, burst: Optional[int] = None,
+               key_func: Optional[Callable[..., str]] = None,
+               store: Optional[BucketStore] = None,
+               namespace: Optional[str] = None):
+    """Decorador para implementar rate limiting.
+
+    Por defecto el límite es por herramienta (una sola clave para todas las
+    llamadas a la función). ``key_func`` recibe los argumentos de la llamada
+    y retorna una subclave, p. ej. ``host_key`` para limitar por host.
+    Funciones decoradas con el mismo ``namespace`` comparten presupuesto.
+    """
+    limiter = RateLimiter(calls_per_minute, burst=burst, store=store)
+
     def decorator(func):
+        prefix = namespace or f"{func.__module__}.{func.__qualname__}"
+        limiter.name = prefix
+        limiters.setdefault(prefix, []).append(limiter)
+
+        def build_key(args, kwargs) -> str:
+            if key_func is None:
+                return prefix
+            return f"{prefix}:{key_func(*args, **kwargs)}"
+
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                await limiter.aacquire(build_key(args, kwargs))
+                return await func(*args, **kwargs)
+            async_wrapper.limiter = limiter
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            key = f"{func.__name__}:{args}:{kwargs}"
-            
-            if limiter.is_rate_limited(key):
-                wait_time = limiter.get_wait_time(key)
-                logger.warning(f"Rate limit alcanzado para {func.__name__}. "
-                             f"Esperando {wait_time:.2f} segundos.")
-                time.sleep(wait_time)
-            
-            limiter.add_call(key)
+            limiter.acquire(build_key(args, kwargs))
             return func(*args, **kwargs)
+        wrapper.limiter = limiter
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
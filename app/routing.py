@@ -0,0 +1,95 @@
+import os
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field
+
+from .logger import logger
+
+content_marketing_team = ["online_researcher", "blog_manager", "social_media_manager"]
+
+options = ["FINISH"] + content_marketing_team
+
+# Un paso del plan es un worker o un grupo de workers independientes
+PlanStep = Union[str, List[str]]
+
+# Ruta del supervisor: un worker, varios en paralelo o FINISH
+RouteTarget = Union[str, List[str]]
+
+# Planes deterministas: el supervisor los sigue sin consultar al LLM.
+# En "parallel" el blog y el tweet solo dependen de la investigación y se
+# ejecutan a la vez en el mismo paso del grafo.
+PIPELINES: Dict[str, List[PlanStep]] = {
+    "standard": ["online_researcher", "blog_manager", "social_media_manager"],
+    "parallel": ["online_researcher", ["blog_manager", "social_media_manager"]],
+}
+
+# Decisiones máximas del supervisor antes de terminar la ejecución
+MAX_SUPERVISOR_STEPS = int(os.getenv("MAX_SUPERVISOR_STEPS", "12"))
+
+# Veces seguidas que se puede elegir al mismo worker antes de considerarlo un bucle
+MAX_ROUTE_REPEATS = int(os.getenv("MAX_ROUTE_REPEATS", "2"))
+
+
+class Route(BaseModel):
+    """Select the worker that should act next, or FINISH when all tasks are completed."""
+
+    next: Literal["FINISH", "online_researcher", "blog_manager", "social_media_manager"] = Field(
+        description="Next worker to act, or FINISH"
+    )
+
+
+def plan_route(state: Dict[str, Any]) -> Optional[RouteTarget]:
+    """Siguiente paso de un plan determinista, o None si no hay plan.
+
+    Cada paso del plan se da por hecho cuando su worker (o todos los de su
+    grupo) informa sin error. De un grupo solo se relanzan los pendientes.
+    """
+    plan = state.get("plan")
+    if not plan:
+        return None
+    completed = set(state.get("completed") or [])
+    for step in plan:
+        if isinstance(step, str):
+            step = [step]
+        pending = [worker for worker in step if worker not in completed]
+        if pending:
+            return pending[0] if len(pending) == 1 else pending
+    return "FINISH"
+
+
+def route_key(route: RouteTarget) -> str:
+    """Representación de una ruta en el historial (p. ej. "blog_manager+social_media_manager")."""
+    return route if isinstance(route, str) else "+".join(route)
+
+
+def fallback_route(state: Dict[str, Any]) -> str:
+    """Ruta por defecto si el LLM no da una respuesta válida: primer worker pendiente."""
+    completed = set(state.get("completed") or [])
+    for member in content_marketing_team:
+        if member not in completed:
+            return member
+    return "FINISH"
+
+
+def guard_route(state: Dict[str, Any], route: RouteTarget) -> RouteTarget:
+    """Termina la ejecución si la ruta elegida indica un bucle.
+
+    Se considera bucle superar ``MAX_SUPERVISOR_STEPS`` decisiones o elegir
+    al mismo worker más de ``MAX_ROUTE_REPEATS`` veces seguidas.
+    """
+    if route == "FINISH":
+        return route
+    history = list(state.get("route_history") or [])
+    if len(history) >= MAX_SUPERVISOR_STEPS:
+        logger.warning(f"Límite de {MAX_SUPERVISOR_STEPS} pasos del supervisor alcanzado")
+        return "FINISH"
+    key = route_key(route)
+    repeats = 0
+    for previous in reversed(history):
+        if previous != key:
+            break
+        repeats += 1
+    if repeats >= MAX_ROUTE_REPEATS:
+        logger.warning(f"Bucle detectado: {key} elegido {repeats + 1} veces seguidas")
+        return "FINISH"
+    return route
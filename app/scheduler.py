@@ -0,0 +1,234 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+from .logger import logger
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Se lanza cuando la cola del planificador no admite más trabajos."""
+    pass
+
+
+class Job:
+    """Trabajo encolado en el planificador junto con su estado y tiempos."""
+
+    def __init__(self, job_id: str, tenant: str, func: Callable,
+                 args: tuple, kwargs: dict):
+        self.id = job_id
+        self.tenant = tenant
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.is_async = asyncio.iscoroutinefunction(func)
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.result: Any = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Representación serializable del estado del trabajo."""
+        now = time.time()
+        queued_until = self.started_at or now
+        data = {
+            "job_id": self.id,
+            "tenant": self.tenant,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_seconds": round(queued_until - self.created_at, 3),
+            "run_seconds": None,
+        }
+        if self.started_at is not None:
+            data["run_seconds"] = round((self.finished_at or now) - self.started_at, 3)
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class JobScheduler:
+    """Planificador acotado de trabajos sobre un pool de hilos.
+
+    Los trabajos se encolan en orden de llegada; un trabajo solo se despacha
+    cuando hay un worker libre y su tenant no supera ``max_per_tenant``
+    ejecuciones simultáneas. Si la cola está llena, ``submit`` lanza
+    ``QueueFullError`` para que el llamador aplique backpressure.
+
+    Las funciones corrutina se ejecutan en el event loop asociado con
+    ``attach_loop`` y no ocupan hilos; su concurrencia la limita
+    ``max_async_jobs``.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue_size: int = 100,
+                 max_per_tenant: int = 2, max_finished_jobs: int = 1000,
+                 max_async_jobs: int = 200):
+        if (max_workers < 1 or max_queue_size < 1 or max_per_tenant < 1
+                or max_async_jobs < 1):
+            raise ValueError("Los límites del planificador deben ser positivos")
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.max_per_tenant = max_per_tenant
+        self.max_finished_jobs = max_finished_jobs
+        self.max_async_jobs = max_async_jobs
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self._lock = threading.Lock()
+        self._pending: Deque[Job] = deque()
+        self._jobs: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+        self._running_by_tenant: Dict[str, int] = {}
+        self._running = 0
+        self._running_async = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="multiagent-job"
+        )
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop):
+        """Asocia el event loop donde se ejecutarán los trabajos asíncronos."""
+        self._loop = loop
+
+    def submit(self, func: Callable, *args, tenant: str = "default",
+               job_id: Optional[str] = None, **kwargs) -> str:
+        """Encola un trabajo y retorna su id sin esperar a que se ejecute."""
+        job = Job(job_id or uuid.uuid4().hex, tenant, func, args, kwargs)
+        if job.is_async and self._loop is None:
+            raise RuntimeError("No hay un event loop asociado para trabajos asíncronos")
+        with self._lock:
+            if len(self._pending) >= self.max_queue_size:
+                raise QueueFullError("La cola de ejecuciones está llena")
+            # Un id reutilizado (p. ej. al reanudar) deja de contar como
+            # terminado para que la purga no elimine el trabajo nuevo
+            self._finished.pop(job.id, None)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._dispatch_locked()
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Obtiene un trabajo por id, si todavía se conserva."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Resumen de ocupación del planificador."""
+        with self._lock:
+            return {
+                "queued": len(self._pending),
+                "running": self._running,
+                "running_async": self._running_async,
+                "max_workers": self.max_workers,
+                "max_async_jobs": self.max_async_jobs,
+                "max_queue_size": self.max_queue_size,
+                "running_by_tenant": dict(self._running_by_tenant),
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Detiene el pool; los trabajos pendientes se descartan."""
+        with self._lock:
+            self._pending.clear()
+        self._executor.shutdown(wait=wait)
+
+    def _has_capacity_locked(self, is_async: bool) -> bool:
+        if is_async:
+            return self._running_async < self.max_async_jobs
+        return self._running < self.max_workers
+
+    def _dispatch_locked(self):
+        """Despacha trabajos pendientes respetando los límites (requiere el lock)."""
+        if not self._pending:
+            return
+        skipped: Deque[Job] = deque()
+        while self._pending and (self._has_capacity_locked(False)
+                                 or self._has_capacity_locked(True)):
+            job = self._pending.popleft()
+            if (not self._has_capacity_locked(job.is_async)
+                    or self._running_by_tenant.get(job.tenant, 0) >= self.max_per_tenant):
+                skipped.append(job)
+                continue
+            self._start_locked(job)
+        # Conservar el orden de llegada de los trabajos que no pudieron salir
+        skipped.extend(self._pending)
+        self._pending = skipped
+
+    def _start_locked(self, job: Job):
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._running_by_tenant[job.tenant] = self._running_by_tenant.get(job.tenant, 0) + 1
+        if job.is_async:
+            self._running_async += 1
+            asyncio.run_coroutine_threadsafe(self._arun(job), self._loop)
+        else:
+            self._running += 1
+            self._executor.submit(self._run, job)
+
+    def _run(self, job: Job):
+        try:
+            job.result = job.func(*job.args, **job.kwargs)
+            job.status = DONE
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            self._finish(job)
+
+    async def _arun(self, job: Job):
+        try:
+            job.result = await job.func(*job.args, **job.kwargs)
+            job.status = DONE
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            self._finish(job)
+
+    def _fail(self, job: Job, error: Exception):
+        logger.error(f"Error en el trabajo {job.id}: {str(error)}")
+        job.error = str(error)
+        job.status = FAILED
+
+    def _finish(self, job: Job):
+        job.finished_at = time.time()
+        with self._lock:
+            if job.is_async:
+                self._running_async -= 1
+            else:
+                self._running -= 1
+            remaining = self._running_by_tenant.get(job.tenant, 1) - 1
+            if remaining:
+                self._running_by_tenant[job.tenant] = remaining
+            else:
+                self._running_by_tenant.pop(job.tenant, None)
+            self._remember_finished_locked(job)
+            self._dispatch_locked()
+
+    def _remember_finished_locked(self, job: Job):
+        """Conserva solo los últimos ``max_finished_jobs`` trabajos terminados."""
+        job.func, job.args, job.kwargs = None, (), {}
+        if self._jobs.get(job.id) is not job:
+            return  # El id ya pertenece a un trabajo posterior
+        self._finished[job.id] = job
+        while len(self._finished) > self.max_finished_jobs:
+            old_id, old_job = self._finished.popitem(last=False)
+            if self._jobs.get(old_id) is old_job:
+                del self._jobs[old_id]
+
+
+def create_scheduler() -> JobScheduler:
+    """Crea el planificador con la configuración de las variables de entorno."""
+    return JobScheduler(
+        max_workers=int(os.getenv("MULTIAGENT_MAX_WORKERS", "4")),
+        max_queue_size=int(os.getenv("MULTIAGENT_MAX_QUEUE", "100")),
+        max_per_tenant=int(os.getenv("MULTIAGENT_MAX_PER_TENANT", "2")),
+        max_async_jobs=int(os.getenv("MULTIAGENT_MAX_ASYNC_JOBS", "200")),
+    )
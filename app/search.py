@@ -0,0 +1,141 @@
+import functools
+import os
+from typing import Any, Callable, Dict, List
+
+from langchain.tools import StructuredTool
+from langchain_community.utilities.tavily_search import TavilySearchAPIWrapper
+
+from .cache import cached
+from .extraction import truncate_to_tokens
+from .fetcher import fetcher
+from .logger import logger
+from .rate_limiter import rate_limit, api_key
+from .validators import canonicalize_url, normalize_text
+
+# Resultados que se piden al buscador en cada llamada
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "3"))
+
+# Vigencia de los resultados en caché
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+
+# Límite de llamadas a la API de búsqueda por API key
+SEARCH_CALLS_PER_MINUTE = int(os.getenv("SEARCH_CALLS_PER_MINUTE", "60"))
+
+# Páginas de los resultados que se descargan junto con la búsqueda (0 lo desactiva)
+SEARCH_PREFETCH_PAGES = int(os.getenv("SEARCH_PREFETCH_PAGES", "3"))
+
+# Presupuesto de tokens del texto de cada página incluida en la respuesta
+SEARCH_PAGE_MAX_TOKENS = int(os.getenv("SEARCH_PAGE_MAX_TOKENS", "800"))
+
+SEARCH_TOOL_NAME = "web_search"
+
+# Prefijo del fragmento de un resultado cuya página no se descargó
+SNIPPET_PREFIX = "Resumen: "
+
+
+def normalize_query(query: str) -> str:
+    """Forma canónica de una consulta: espacios, etiquetas y mayúsculas no cuentan."""
+    return normalize_text(query).casefold()
+
+
+def search_key(query: str, max_results: int = SEARCH_MAX_RESULTS) -> List[Any]:
+    return [normalize_query(query), max_results]
+
+
+@functools.lru_cache(maxsize=1)
+def get_search_client() -> TavilySearchAPIWrapper:
+    """Cliente de la API de Tavily, creado en el primer uso."""
+    return TavilySearchAPIWrapper()
+
+
+def clean_results(raw: Dict[str, Any], max_results: int) -> List[Dict[str, Any]]:
+    """Resultados de la respuesta de la API sin URLs repetidas."""
+    results, seen = [], set()
+    for item in raw.get("results", []):
+        url = canonicalize_url(item.get("url", ""))
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        results.append({"title": item.get("title", ""), "url": item["url"],
+                        "content": item.get("content", ""), "score": item.get("score")})
+    return results[:max_results]
+
+
+@cached(ttl_seconds=SEARCH_CACHE_TTL_SECONDS, key_func=search_key,
+        error_ttl_seconds=30, namespace="search")
+@rate_limit(calls_per_minute=SEARCH_CALLS_PER_MINUTE, key_func=api_key("TAVILY_API_KEY"),
+            namespace="search")
+def search_web(query: str, max_results: int = SEARCH_MAX_RESULTS) -> List[Dict[str, Any]]:
+    """Busca ``query`` en Tavily.
+
+    Las consultas equivalentes (ver ``normalize_query``) comparten la entrada
+    de caché, y las que llegan a la vez desde varias ejecuciones se agrupan
+    en una sola llamada a la API.
+    """
+    raw = get_search_client().raw_results(normalize_text(query), max_results)
+    return clean_results(raw, max_results)
+
+
+@cached(ttl_seconds=SEARCH_CACHE_TTL_SECONDS, key_func=search_key,
+        error_ttl_seconds=30, namespace="search")
+@rate_limit(calls_per_minute=SEARCH_CALLS_PER_MINUTE, key_func=api_key("TAVILY_API_KEY"),
+            namespace="search")
+async def asearch_web(query: str, max_results: int = SEARCH_MAX_RESULTS) -> List[Dict[str, Any]]:
+    """Versión asíncrona de ``search_web``."""
+    raw = await get_search_client().raw_results_async(normalize_text(query), max_results)
+    return clean_results(raw, max_results)
+
+
+def format_search_results(results: List[Dict[str, Any]], pages: List[Any],
+                          is_error: Callable[[str], bool]) -> str:
+    """Une cada resultado con el texto de su página o, si no lo hay, su fragmento."""
+    if not results:
+        return "No se encontraron resultados."
+    sections = []
+    for index, result in enumerate(results):
+        page = pages[index] if index < len(pages) else None
+        if isinstance(page, str) and page and not is_error(page):
+            body = truncate_to_tokens(page, SEARCH_PAGE_MAX_TOKENS)
+        else:
+            body = SNIPPET_PREFIX + result["content"]
+        sections.append(f"### {result['title']}\n{result['url']}\n\n{body}")
+    return "\n\n".join(sections)
+
+
+def make_search_tool(fetch: Callable[[str], str], afetch: Callable[..., Any],
+                     is_error: Callable[[str], bool],
+                     prefetch_pages: int = SEARCH_PREFETCH_PAGES) -> StructuredTool:
+    """Herramienta de búsqueda que descarga a la vez las primeras páginas.
+
+    ``fetch``/``afetch`` son las funciones con caché y rate limiting de la
+    herramienta de descarga, así que las páginas se comparten con ella y el
+    agente no necesita otra llamada para leerlas.
+    """
+    def search(query: str) -> str:
+        """Search the web and return the top results with the main text of each page"""
+        try:
+            results = search_web(query)
+        except Exception as e:
+            logger.error(f"Error en la búsqueda '{query}': {str(e)}")
+            return f"Error en la búsqueda: {str(e)}"
+        urls = [result["url"] for result in results[:prefetch_pages]]
+        return format_search_results(results, fetcher.fetch_many(urls, func=fetch), is_error)
+
+    async def asearch(query: str) -> str:
+        """Versión asíncrona de ``search``: busca y descarga las páginas sin bloquear el event loop"""
+        try:
+            results = await asearch_web(query)
+        except Exception as e:
+            logger.error(f"Error en la búsqueda '{query}': {str(e)}")
+            return f"Error en la búsqueda: {str(e)}"
+        urls = [result["url"] for result in results[:prefetch_pages]]
+        return format_search_results(results, await fetcher.afetch_many(urls, func=afetch), is_error)
+
+    return StructuredTool.from_function(
+        func=search,
+        coroutine=asearch,
+        name=SEARCH_TOOL_NAME,
+        description="Search the web for current information. Returns the top results "
+                    "with the main text of each page, so they don't need to be fetched again",
+        return_direct=False
+    )
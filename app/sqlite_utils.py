@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .logger import logger
+
+
+def connect_wal(path: str, isolation_level: Optional[str] = "") -> sqlite3.Connection:
+    """Abre ``path`` en modo WAL: los lectores no bloquean al escritor.
+
+    ``synchronous=NORMAL`` es seguro en WAL ante caídas del proceso y evita
+    un fsync por transacción.
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=isolation_level)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SQLiteConnectionMixin:
+    """Conexión propia de cada hilo a un fichero SQLite compartido por los workers del host.
+
+    sqlite3 no comparte conexiones entre hilos; cada hilo abre la suya la
+    primera vez que la pide. Las clases que la usan llaman a ``_init_sqlite``
+    en su constructor. ``isolation_level = None`` deja las transacciones en
+    manos del código (``BEGIN IMMEDIATE`` explícitos).
+    """
+
+    isolation_level: Optional[str] = ""
+
+    def _init_sqlite(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_wal(self.path, self.isolation_level)
+            self._local.conn = conn
+        return conn
+
+
+class CompactionMixin:
+    """Compactación periódica de los datos que superan ``retention_seconds``.
+
+    ``_maybe_compact`` se llama desde las escrituras y ejecuta ``compact`` como
+    mucho una vez cada ``compact_interval`` segundos; los errores se registran
+    sin interrumpir la escritura. ``compaction_target`` nombra el almacén en
+    los logs.
+    """
+
+    compaction_target = "almacén"
+
+    def _init_compaction(self, retention_seconds: float, compact_interval: float):
+        self.retention_seconds = retention_seconds
+        self.compact_interval = compact_interval
+        self._last_compact = time.time()
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Elimina los datos que superan la retención y retorna cuántas ejecuciones borró."""
+        raise NotImplementedError
+
+    def _maybe_compact(self):
+        now = time.time()
+        if now - self._last_compact < self.compact_interval:
+            return
+        self._last_compact = now
+        try:
+            removed = self.compact(now)
+            if removed:
+                logger.info("Compactación (%s): %d ejecuciones eliminadas",
+                            self.compaction_target, removed)
+        except Exception as e:
+            logger.error(f"Error en la compactación ({self.compaction_target}): {str(e)}")
@@ -0,0 +1,169 @@
+import functools
+import operator
+import os
+from typing import Annotated, Dict, Iterable, List, Optional, Sequence, TypedDict, Union
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from .extraction import count_tokens
+
+# Mensajes recientes que se conservan íntegros en el estado
+STATE_WINDOW = int(os.getenv("STATE_WINDOW", "8"))
+
+# Caracteres de cada mensaje expulsado que pasan al resumen acumulado
+SUMMARY_EXCERPT_CHARS = int(os.getenv("STATE_SUMMARY_EXCERPT_CHARS", "300"))
+
+# Tamaño máximo del resumen acumulado
+SUMMARY_MAX_CHARS = int(os.getenv("STATE_SUMMARY_MAX_CHARS", "3000"))
+
+# Caracteres del último informe de cada worker que ve el supervisor
+SUPERVISOR_EXCERPT_CHARS = int(os.getenv("SUPERVISOR_EXCERPT_CHARS", "500"))
+
+SUMMARY_NAME = "summary"
+SUMMARY_HEADER = "Resumen de los pasos anteriores:"
+
+# Prefijo del mensaje que deja un worker cuando falla, en lugar de su informe
+ERROR_PREFIX = "Error: "
+
+# Mensajes de cada worker que necesita cada worker (además de la petición)
+NODE_INPUTS = {
+    "online_researcher": ("online_researcher",),
+    "blog_manager": ("online_researcher", "blog_manager"),
+    "social_media_manager": ("online_researcher", "social_media_manager"),
+}
+
+
+def _excerpt(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+def is_summary(message: BaseMessage) -> bool:
+    return getattr(message, "name", None) == SUMMARY_NAME
+
+
+def compact_messages(left: Sequence[BaseMessage], right: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Reducer de ``messages``: concatena y compacta a una ventana deslizante.
+
+    Se conservan siempre la petición original y los ``STATE_WINDOW`` mensajes
+    más recientes; los intermedios se pliegan en un único mensaje de resumen
+    con un extracto de cada uno, de tamaño acotado.
+    """
+    messages = list(left) + list(right)
+    if len(messages) <= STATE_WINDOW + 2:
+        return messages
+
+    head, body = messages[:1], messages[1:]
+    summary = None
+    if body and is_summary(body[0]):
+        summary, body = body[0], body[1:]
+    if len(body) <= STATE_WINDOW:
+        return messages
+
+    evicted, window = body[:-STATE_WINDOW], body[-STATE_WINDOW:]
+    lines = summary.content.split("\n")[1:] if summary else []
+    lines += [
+        f"- {m.name or m.type}: {_excerpt(m.content, SUMMARY_EXCERPT_CHARS)}"
+        for m in evicted if not is_summary(m)
+    ]
+    # Descartar las líneas más antiguas si el resumen supera su límite
+    while len(lines) > 1 and sum(len(line) + 1 for line in lines) > SUMMARY_MAX_CHARS:
+        lines.pop(0)
+
+    summary = HumanMessage(content="\n".join([SUMMARY_HEADER] + lines), name=SUMMARY_NAME)
+    return head + [summary] + window
+
+
+def merge_reports(left: Optional[Dict[str, BaseMessage]],
+                  right: Optional[Dict[str, BaseMessage]]) -> Dict[str, BaseMessage]:
+    """Reducer de ``reports``: conserva el último informe de cada worker."""
+    return {**(left or {}), **(right or {})}
+
+
+def merge_token_counts(left: Optional[Dict[str, int]], right: Optional[Dict[str, int]]) -> Dict[str, int]:
+    """Reducer que acumula los tokens de prompt por nodo."""
+    merged = dict(left or {})
+    for node, tokens in (right or {}).items():
+        merged[node] = merged.get(node, 0) + tokens
+    return merged
+
+
+class AgentState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], compact_messages]
+    # Worker siguiente, lista de workers a ejecutar en paralelo o FINISH
+    next: Union[str, List[str]]
+    # Tokens de prompt enviados por cada nodo a lo largo de la ejecución
+    prompt_tokens: Annotated[Dict[str, int], merge_token_counts]
+    # Plan determinista opcional: el supervisor lo sigue sin consultar al LLM
+    plan: List[Union[str, List[str]]]
+    # Workers que han informado sin error
+    completed: Annotated[List[str], operator.add]
+    # Último informe correcto de cada worker; la ventana de ``messages`` no lo expulsa
+    reports: Annotated[Dict[str, BaseMessage], merge_reports]
+    # Decisiones del supervisor, para detectar bucles
+    route_history: Annotated[List[str], operator.add]
+
+
+def _latest_by_name(messages: Iterable[BaseMessage]) -> Dict[str, BaseMessage]:
+    latest: Dict[str, BaseMessage] = {}
+    for message in messages:
+        if message.name:
+            latest[message.name] = message
+    return latest
+
+
+def is_error_report(message: BaseMessage) -> bool:
+    return str(message.content).startswith(ERROR_PREFIX)
+
+
+def select_messages(messages: Sequence[BaseMessage], node: str,
+                    reports: Optional[Dict[str, BaseMessage]] = None) -> List[BaseMessage]:
+    """Mensajes que recibe un worker: la petición y los informes que necesita.
+
+    Por ejemplo, ``blog_manager`` recibe los hallazgos del investigador y su
+    propio borrador anterior, pero no los tweets. Los informes salen de
+    ``reports``, que la compactación no expulsa; sin él (checkpoints
+    anteriores) se buscan en ``messages``, sin contar los errores.
+    """
+    if not messages:
+        return []
+    if reports is None:
+        reports = _latest_by_name(m for m in messages[1:] if not is_error_report(m))
+    selected = [messages[0]]
+    selected += [reports[name] for name in NODE_INPUTS.get(node, ()) if name in reports]
+    return selected
+
+
+def supervisor_messages(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Vista compacta para el supervisor: petición, resumen y extracto por worker.
+
+    Para decidir el siguiente paso basta con saber qué worker ha informado y
+    un extracto de su informe, no el texto completo del artículo o tweet.
+    """
+    if not messages:
+        return []
+    selected = [messages[0]]
+    rest = messages[1:]
+    if rest and is_summary(rest[0]):
+        selected.append(rest[0])
+    for name, message in _latest_by_name(rest).items():
+        if name == SUMMARY_NAME:
+            continue
+        selected.append(HumanMessage(
+            content=_excerpt(message.content, SUPERVISOR_EXCERPT_CHARS), name=name
+        ))
+    return selected
+
+
+@functools.lru_cache(maxsize=64)
+def count_text_tokens(text: str) -> int:
+    """Cuenta tokens de textos repetidos (p. ej. system prompts) una sola vez."""
+    return count_tokens(text)
+
+
+def count_message_tokens(messages: Sequence[BaseMessage], system_prompt: str = "") -> int:
+    """Tokens aproximados de un prompt formado por un system prompt y mensajes."""
+    total = count_text_tokens(system_prompt) if system_prompt else 0
+    for message in messages:
+        total += count_tokens(str(message.content)) + 4
+    return total
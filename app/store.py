@@ -0,0 +1,411 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain_core.messages import BaseMessage
+
+from .logger import logger
+from .scheduler import QUEUED, RUNNING, DONE, FAILED
+from .sqlite_utils import CompactionMixin, SQLiteConnectionMixin
+
+FINISHED_STATUSES = (DONE, FAILED)
+
+# Cada cuántos segundos renueva un worker las ejecuciones que está corriendo
+EXECUTION_HEARTBEAT_SECONDS = float(os.getenv("EXECUTION_HEARTBEAT_SECONDS", "30"))
+
+# Una ejecución en curso sin renovar durante este tiempo se da por abandonada
+EXECUTION_LEASE_SECONDS = float(os.getenv("EXECUTION_LEASE_SECONDS", "120"))
+
+
+def serialize_value(value: Any) -> Any:
+    """Convierte un valor del grafo en JSON compacto.
+
+    De cada mensaje solo se guardan el tipo, el autor y el contenido; los
+    metadatos de la respuesta del modelo no interesan a los clientes.
+    """
+    if isinstance(value, BaseMessage):
+        data = {"type": value.type, "content": value.content}
+        if value.name:
+            data["name"] = value.name
+        return data
+    if isinstance(value, dict):
+        return {str(k): serialize_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [serialize_value(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def dump_step(step: Any) -> str:
+    """Serializa un paso del grafo a una cadena JSON sin espacios."""
+    return json.dumps(serialize_value(step), ensure_ascii=False, separators=(",", ":"))
+
+
+class ExecutionStore(CompactionMixin):
+    """Interfaz de almacenamiento de ejecuciones y de sus pasos.
+
+    Cada ejecución tiene un id único, un estado y una lista de pasos
+    numerados desde 0; los pasos se leen por páginas a partir de un cursor
+    (la posición del primer paso que falta). Las ejecuciones terminadas hace
+    más de ``retention_seconds`` se eliminan con ``compact``.
+    """
+
+    def __init__(self, retention_seconds: float = 7 * 24 * 3600,
+                 compact_interval: float = 300):
+        self._init_compaction(retention_seconds, compact_interval)
+
+    def create(self, execution_id: Optional[str] = None, **metadata) -> str:
+        """Registra una ejecución en cola y retorna su id."""
+        execution_id = execution_id or uuid.uuid4().hex
+        self._create(execution_id, metadata, time.time())
+        self._maybe_compact()
+        return execution_id
+
+    def _create(self, execution_id: str, metadata: Dict[str, Any], now: float):
+        raise NotImplementedError
+
+    def exists(self, execution_id: str) -> bool:
+        return self.get(execution_id) is not None
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """Estado, metadatos y número de pasos de una ejecución."""
+        raise NotImplementedError
+
+    def set_status(self, execution_id: str, status: str, error: Optional[str] = None):
+        raise NotImplementedError
+
+    def touch(self, execution_ids: List[str]):
+        """Renueva ``updated_at`` de ejecuciones que siguen en curso (latido)."""
+        raise NotImplementedError
+
+    def claim_resume(self, execution_id: str, stale_before: float) -> bool:
+        """Vuelve a encolar una ejecución si se puede reanudar.
+
+        Solo se reclaman las ejecuciones fallidas y las que siguen en curso
+        sin latido desde ``stale_before`` (su worker se cayó). La comprobación
+        y el cambio de estado son atómicos: de varias peticiones simultáneas
+        solo una obtiene ``True``.
+        """
+        raise NotImplementedError
+
+    def update_metadata(self, execution_id: str, **values):
+        """Añade o reemplaza valores en los metadatos de una ejecución."""
+        raise NotImplementedError
+
+    def append_step(self, execution_id: str, step: Any) -> int:
+        """Guarda un paso y retorna su posición."""
+        raise NotImplementedError
+
+    def get_steps(self, execution_id: str, cursor: int = 0,
+                  limit: int = 100) -> Tuple[List[Any], int]:
+        """Pasos desde ``cursor`` (como máximo ``limit``) y el cursor siguiente."""
+        raise NotImplementedError
+
+    def delete(self, execution_id: str):
+        raise NotImplementedError
+
+    compaction_target = "almacén de ejecuciones"
+
+    def compact(self, now: Optional[float] = None) -> int:
+        """Elimina las ejecuciones terminadas que superan la retención."""
+        raise NotImplementedError
+
+
+class MemoryExecutionStore(ExecutionStore):
+    """Almacén en memoria del proceso, útil para pruebas o un único worker."""
+
+    def __init__(self, retention_seconds: float = 7 * 24 * 3600,
+                 compact_interval: float = 300):
+        super().__init__(retention_seconds, compact_interval)
+        self._lock = threading.Lock()
+        self._executions: Dict[str, Dict[str, Any]] = {}
+        self._steps: Dict[str, List[str]] = {}
+
+    def _create(self, execution_id: str, metadata: Dict[str, Any], now: float):
+        with self._lock:
+            self._executions[execution_id] = {
+                "id": execution_id,
+                "status": QUEUED,
+                "error": None,
+                "created_at": now,
+                "updated_at": now,
+                "metadata": dict(metadata),
+            }
+            self._steps[execution_id] = []
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is None:
+                return None
+            return {**execution, "steps": len(self._steps[execution_id])}
+
+    def set_status(self, execution_id: str, status: str, error: Optional[str] = None):
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is not None:
+                execution.update(status=status, error=error, updated_at=time.time())
+
+    def touch(self, execution_ids: List[str]):
+        now = time.time()
+        with self._lock:
+            for execution_id in execution_ids:
+                execution = self._executions.get(execution_id)
+                if execution is not None and execution["status"] == RUNNING:
+                    execution["updated_at"] = now
+
+    def claim_resume(self, execution_id: str, stale_before: float) -> bool:
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is None or not (
+                execution["status"] == FAILED
+                or (execution["status"] == RUNNING and execution["updated_at"] < stale_before)
+            ):
+                return False
+            execution.update(status=QUEUED, error=None, updated_at=time.time())
+            return True
+
+    def update_metadata(self, execution_id: str, **values):
+        with self._lock:
+            execution = self._executions.get(execution_id)
+            if execution is not None:
+                execution["metadata"].update(serialize_value(values))
+
+    def append_step(self, execution_id: str, step: Any) -> int:
+        data = dump_step(step)
+        with self._lock:
+            steps = self._steps[execution_id]
+            steps.append(data)
+            self._executions[execution_id]["updated_at"] = time.time()
+            return len(steps) - 1
+
+    def get_steps(self, execution_id: str, cursor: int = 0,
+                  limit: int = 100) -> Tuple[List[Any], int]:
+        with self._lock:
+            page = self._steps.get(execution_id, [])[cursor:cursor + limit]
+        return [json.loads(data) for data in page], cursor + len(page)
+
+    def delete(self, execution_id: str):
+        with self._lock:
+            self._executions.pop(execution_id, None)
+            self._steps.pop(execution_id, None)
+
+    def compact(self, now: Optional[float] = None) -> int:
+        limit = (now or time.time()) - self.retention_seconds
+        with self._lock:
+            expired = [
+                eid for eid, execution in self._executions.items()
+                if execution["status"] in FINISHED_STATUSES and execution["updated_at"] < limit
+            ]
+            for eid in expired:
+                del self._executions[eid]
+                del self._steps[eid]
+        return len(expired)
+
+
+class SQLiteExecutionStore(SQLiteConnectionMixin, ExecutionStore):
+    """Almacén persistente en SQLite (modo WAL) compartido por los workers del host."""
+
+    def __init__(self, path: str, retention_seconds: float = 7 * 24 * 3600,
+                 compact_interval: float = 300):
+        super().__init__(retention_seconds, compact_interval)
+        self._init_sqlite(path)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS executions ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " steps INTEGER NOT NULL DEFAULT 0,"
+                " metadata TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS steps ("
+                " execution_id TEXT NOT NULL,"
+                " position INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (execution_id, position)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS executions_updated ON executions (status, updated_at)"
+            )
+
+    def _create(self, execution_id: str, metadata: Dict[str, Any], now: float):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO executions (id, status, created_at, updated_at, metadata)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (execution_id, QUEUED, now, now, json.dumps(metadata))
+            )
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT status, error, created_at, updated_at, steps, metadata"
+            " FROM executions WHERE id = ?", (execution_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": execution_id,
+            "status": row[0],
+            "error": row[1],
+            "created_at": row[2],
+            "updated_at": row[3],
+            "steps": row[4],
+            "metadata": json.loads(row[5]),
+        }
+
+    def set_status(self, execution_id: str, status: str, error: Optional[str] = None):
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE executions SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), execution_id)
+            )
+
+    def touch(self, execution_ids: List[str]):
+        now = time.time()
+        with self._connection() as conn:
+            conn.executemany(
+                "UPDATE executions SET updated_at = ? WHERE id = ? AND status = ?",
+                [(now, execution_id, RUNNING) for execution_id in execution_ids]
+            )
+
+    def claim_resume(self, execution_id: str, stale_before: float) -> bool:
+        with self._connection() as conn:
+            return conn.execute(
+                "UPDATE executions SET status = ?, error = NULL, updated_at = ? WHERE id = ?"
+                " AND (status = ? OR (status = ? AND updated_at < ?))",
+                (QUEUED, time.time(), execution_id, FAILED, RUNNING, stale_before)
+            ).rowcount == 1
+
+    def update_metadata(self, execution_id: str, **values):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT metadata FROM executions WHERE id = ?", (execution_id,)
+            ).fetchone()
+            if row is not None:
+                metadata = {**json.loads(row[0]), **serialize_value(values)}
+                conn.execute(
+                    "UPDATE executions SET metadata = ? WHERE id = ?",
+                    (json.dumps(metadata), execution_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def append_step(self, execution_id: str, step: Any) -> int:
+        data = dump_step(step)
+        conn = self._connection()
+        # BEGIN IMMEDIATE reserva la posición y guarda el paso de forma atómica
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            position = conn.execute(
+                "SELECT steps FROM executions WHERE id = ?", (execution_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO steps (execution_id, position, data) VALUES (?, ?, ?)",
+                (execution_id, position, data)
+            )
+            conn.execute(
+                "UPDATE executions SET steps = steps + 1, updated_at = ? WHERE id = ?",
+                (time.time(), execution_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return position
+
+    def get_steps(self, execution_id: str, cursor: int = 0,
+                  limit: int = 100) -> Tuple[List[Any], int]:
+        rows = self._connection().execute(
+            "SELECT data FROM steps WHERE execution_id = ? AND position >= ?"
+            " ORDER BY position LIMIT ?", (execution_id, cursor, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows], cursor + len(rows)
+
+    def delete(self, execution_id: str):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM steps WHERE execution_id = ?", (execution_id,))
+            conn.execute("DELETE FROM executions WHERE id = ?", (execution_id,))
+
+    def compact(self, now: Optional[float] = None) -> int:
+        limit = (now or time.time()) - self.retention_seconds
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+        expired = f"SELECT id FROM executions WHERE status IN ({placeholders}) AND updated_at < ?"
+        params = (*FINISHED_STATUSES, limit)
+        with self._connection() as conn:
+            conn.execute(f"DELETE FROM steps WHERE execution_id IN ({expired})", params)
+            return conn.execute(
+                f"DELETE FROM executions WHERE id IN ({expired})", params
+            ).rowcount
+
+
+class ExecutionHeartbeat:
+    """Latido de las ejecuciones que corren en este proceso.
+
+    Un único hilo renueva cada ``interval`` segundos el ``updated_at`` de las
+    ejecuciones registradas con ``track``. Así otro worker distingue una
+    ejecución viva de una abandonada, cuyo ``updated_at`` envejece más allá
+    de ``EXECUTION_LEASE_SECONDS``.
+    """
+
+    def __init__(self, store: ExecutionStore, interval: float = EXECUTION_HEARTBEAT_SECONDS):
+        self.store = store
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._running: Set[str] = set()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def track(self, execution_id: str):
+        """Mantiene vivo el latido de una ejecución mientras dura el bloque."""
+        with self._lock:
+            self._running.add(execution_id)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._beat, name="execution-heartbeat", daemon=True
+                )
+                self._thread.start()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running.discard(execution_id)
+
+    def stop(self):
+        self._stopped.set()
+
+    def _beat(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                self.store.touch(running)
+            except Exception as e:
+                logger.error(f"Error renovando el latido de las ejecuciones: {str(e)}")
+
+
+def create_store() -> ExecutionStore:
+    """Crea el almacén de ejecuciones con la configuración de las variables de entorno.
+
+    ``EXECUTION_STORE_PATH=:memory:`` usa un almacén en memoria del proceso.
+    """
+    path = os.getenv("EXECUTION_STORE_PATH", os.path.join("data", "executions.sqlite3"))
+    retention_seconds = float(os.getenv("EXECUTION_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    if path == ":memory:":
+        return MemoryExecutionStore(retention_seconds=retention_seconds)
+    return SQLiteExecutionStore(path, retention_seconds=retention_seconds)
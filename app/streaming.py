@@ -0,0 +1,67 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Tuple
+
+from .logger import logger
+
+
+class StepBroker:
+    """Difunde eventos de las ejecuciones a suscriptores asíncronos.
+
+    Los workers publican desde sus propios hilos y cada suscriptor recibe los
+    eventos en una ``asyncio.Queue`` de su event loop. Los pasos completos se
+    siguen leyendo de su almacenamiento; el broker solo avisa de que hay pasos
+    nuevos y reenvía los deltas de tokens, que no se conservan.
+    """
+
+    def __init__(self, max_queue_size: int = 1000):
+        self.max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def subscribe(self, execution_id: str) -> asyncio.Queue:
+        """Registra un suscriptor en el event loop actual."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue_size)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(execution_id, []).append((loop, queue))
+        return queue
+
+    def unsubscribe(self, execution_id: str, queue: asyncio.Queue):
+        """Elimina un suscriptor registrado con ``subscribe``."""
+        with self._lock:
+            subscribers = self._subscribers.get(execution_id, [])
+            self._subscribers[execution_id] = [s for s in subscribers if s[1] is not queue]
+            if not self._subscribers[execution_id]:
+                del self._subscribers[execution_id]
+
+    def publish(self, execution_id: str, event: Dict[str, Any]):
+        """Envía un evento a todos los suscriptores (seguro entre hilos)."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(execution_id, []))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # El event loop del suscriptor ya se cerró
+                self.unsubscribe(execution_id, queue)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: Dict[str, Any]):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Un cliente lento pierde deltas; los pasos se recuperan por cursor
+            logger.debug("Cola de suscriptor llena, evento descartado",
+                         extra={"sample_every": 100})
+
+
+def format_sse(data: str, event: str = "message", event_id: Any = None) -> str:
+    """Formatea un evento según el protocolo Server-Sent Events."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    for line in data.splitlines() or [""]:
+        lines.append(f"data: {line}")
+    return "\n".join(lines) + "\n\n"
@@ -1,8 +1,32 @@
+import functools
+import os
 import re
-from typing import Optional
-from urllib.parse import urlparse
+import unicodedata
+from typing import Iterable, Iterator, Optional
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
 from .logger import logger
 
+# Longitud máxima de un prompt tras normalizarlo
+MAX_PROMPT_LENGTH = int(os.getenv("MAX_PROMPT_LENGTH", "1000"))
+
+# Forma de normalización Unicode de las entradas de texto
+UNICODE_FORM = "NFC"
+
+# Longitud máxima de una etiqueta HTML; un "<" sin cerrar antes no es etiqueta
+MAX_TAG_CHARS = 1024
+
+# Tamaño de los trozos en que se procesa una entrada grande
+CHUNK_CHARS = 64 * 1024
+
+# Patrones precompilados de la normalización de texto. Los caracteres de
+# control que son espacios (\t, \n, \x1c-\x1f, \x85...) se colapsan como
+# espacios en lugar de eliminarse.
+TAG = re.compile(rf"<[^<>]{{1,{MAX_TAG_CHARS}}}>")
+CONTROL_CHARS = re.compile(r"[\x00-\x08\x0e-\x1b\x7f-\x84\x86-\x9f]")
+UNSAFE_PROMPT_CHARS = re.compile(r"[<>]")
+# Tramo de etiquetas, caracteres de control y espacios leído de derecha a izquierda
+REVERSED_SEPARATOR_RUN = re.compile(rf"(?:>[^<>]{{1,{MAX_TAG_CHARS}}}<|{CONTROL_CHARS.pattern}|\s)+")
+
 class ValidationError(Exception):
     """Excepción personalizada para errores de validación."""
     pass
@@ -11,12 +35,155 @@ def validate_url(url: str) -> bool:
     """Valida que una URL sea válida y segura."""
     try:
         result = urlparse(url)
-        return all([result.scheme, result.netloc])
+        return result.scheme in ('http', 'https') and bool(result.netloc)
     except Exception as e:
         logger.error(f"Error validando URL {url}: {str(e)}")
         return False
 
-def validate_prompt(prompt: str, max_length: int = 1000) -> bool:
+# Parámetros de seguimiento que no cambian el contenido de la página
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+def canonicalize_url(url: str) -> str:
+    """Forma canónica de una URL para usarla como clave de caché.
+
+    Normaliza esquema y host a minúsculas, elimina el puerto por defecto, el
+    fragmento y los parámetros de seguimiento, y ordena la query string.
+    """
+    if not isinstance(url, str):
+        return url
+    return _canonicalize_url(url)
+
+# Las mismas URLs se canonicalizan en cada consulta a los cachés de descargas
+@functools.lru_cache(maxsize=4096)
+def _canonicalize_url(url: str) -> str:
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https') or not parts.hostname:
+        return url
+
+    host = parts.hostname.lower()
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{userinfo}@{host}"
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+def _collapse(text: str) -> str:
+    """Elimina etiquetas y caracteres de control y colapsa los espacios.
+
+    Conserva un espacio inicial o final si el texto empieza o termina por un
+    tramo de separadores, para poder unir trozos consecutivos.
+    """
+    if "<" in text:
+        text = TAG.sub("", text)
+    text = CONTROL_CHARS.sub("", text)
+    collapsed = " ".join(text.split())
+    if not collapsed:
+        return " " if text else ""
+    if text[0].isspace():
+        collapsed = " " + collapsed
+    if text[-1].isspace():
+        collapsed += " "
+    return collapsed
+
+def _unicode_normalize(text: str, form: Optional[str]) -> str:
+    if form and not unicodedata.is_normalized(form, text):
+        text = unicodedata.normalize(form, text)
+    return text
+
+def _trailing_run_start(text: str, end: int) -> int:
+    """Inicio del tramo de separadores que termina en ``end`` (``end`` si no hay).
+
+    Se busca sobre el texto invertido: una regex anclada al final es
+    cuadrática cuando el tramo va seguido de otro carácter.
+    """
+    if not end:
+        return 0
+    match = REVERSED_SEPARATOR_RUN.match(text[end - 1::-1])
+    return end - match.end() if match else end
+
+def _safe_cut(buffer: str) -> int:
+    """Posición hasta la que un trozo se puede limpiar sin ver el siguiente.
+
+    Se retienen el tramo de separadores final, que puede continuar en el
+    siguiente trozo, y una posible etiqueta sin cerrar.
+    """
+    cut = _trailing_run_start(buffer, len(buffer))
+    tag_start = buffer.rfind("<", max(cut - MAX_TAG_CHARS - 2, 0), cut)
+    if tag_start != -1 and buffer.find(">", tag_start, cut) == -1:
+        cut = _trailing_run_start(buffer, tag_start)
+    return cut
+
+def _stable_cut(text: str, form: str) -> int:
+    """Posición hasta la que la normalización Unicode ya no depende de lo que siga.
+
+    Se corta antes del último carácter base que no se compone con el
+    anterior; lo que le sigue (marcas combinantes, jamos de Hangul) se
+    retiene hasta el siguiente trozo.
+    """
+    for index in range(len(text) - 1, 0, -1):
+        char = text[index]
+        if not unicodedata.combining(char):
+            previous = text[max(index - 3, 0):index]
+            if (unicodedata.normalize(form, previous + char)
+                    == unicodedata.normalize(form, previous) + unicodedata.normalize(form, char)):
+                return index
+    return 0
+
+def iter_normalized(chunks: Iterable[str], form: Optional[str] = UNICODE_FORM) -> Iterator[str]:
+    """Normaliza un texto que llega por trozos, sin cargarlo entero en memoria.
+
+    Elimina etiquetas HTML/XML y caracteres de control, colapsa los espacios
+    (incluidos saltos de línea) en uno solo, recorta los extremos y aplica la
+    normalización Unicode ``form``. Unir la salida da el mismo resultado que
+    ``normalize_text`` sobre el texto completo.
+    """
+    buffer = pending = ""
+    started = False
+    for chunk in chunks:
+        buffer += chunk
+        cut = _safe_cut(buffer)
+        if not cut:
+            # Un tramo de separadores muy largo se reduce a su sustituto
+            # para no volver a recorrerlo con cada trozo
+            if _trailing_run_start(buffer, len(buffer)) == 0:
+                buffer = _collapse(buffer)
+            continue
+        pending += _collapse(buffer[:cut])
+        buffer = buffer[cut:]
+        if form:
+            stable = _stable_cut(pending, form)
+            piece, pending = _unicode_normalize(pending[:stable], form), pending[stable:]
+        else:
+            piece, pending = pending, ""
+        if not started:
+            piece = piece.lstrip()
+            started = bool(piece)
+        if piece:
+            yield piece
+    piece = _unicode_normalize(pending + _collapse(buffer), form)
+    piece = piece.strip() if not started else piece.rstrip()
+    if piece:
+        yield piece
+
+def normalize_text(text: str, form: Optional[str] = UNICODE_FORM) -> str:
+    """Versión de ``iter_normalized`` para un texto completo."""
+    if "<" in text:
+        text = TAG.sub("", text)
+    return _unicode_normalize(" ".join(CONTROL_CHARS.sub("", text).split()), form)
+
+def validate_prompt(prompt: str, max_length: int = MAX_PROMPT_LENGTH) -> bool:
     """Valida que un prompt sea válido."""
     if not prompt or not isinstance(prompt, str):
         return False
@@ -25,26 +192,41 @@ def validate_prompt(prompt: str, max_length: int = 1000) -> bool:
         return False
     
     # Verificar caracteres no permitidos
-    if re.search(r'[<>]', prompt):
+    if UNSAFE_PROMPT_CHARS.search(prompt):
         return False
     
     return True
 
+def clean_prompt(prompt: str, max_length: int = MAX_PROMPT_LENGTH) -> str:
+    """Normaliza un prompt y lo valida; lanza ``ValidationError`` si no es válido.
+
+    Las entradas grandes se procesan por trozos y se rechazan en cuanto la
+    parte normalizada supera ``max_length``, sin recorrer el resto.
+    """
+    if not prompt or not isinstance(prompt, str):
+        raise ValidationError("El prompt está vacío")
+
+    pieces, length = [], 0
+    chunks = (prompt[i:i + CHUNK_CHARS] for i in range(0, len(prompt), CHUNK_CHARS))
+    for piece in iter_normalized(chunks):
+        length += len(piece)
+        if length > max_length:
+            raise ValidationError(f"El prompt supera los {max_length} caracteres")
+        pieces.append(piece)
+    prompt = "".join(pieces)
+
+    if not prompt:
+        raise ValidationError("El prompt está vacío")
+    if UNSAFE_PROMPT_CHARS.search(prompt):
+        raise ValidationError("El prompt contiene caracteres no permitidos (< o >)")
+    return prompt
+
 def sanitize_input(text: str) -> Optional[str]:
-    """Sanitiza la entrada de texto."""
+    """Sanitiza la entrada de texto (ver ``normalize_text``)."""
     if not text:
         return None
     
-    # Eliminar caracteres de control
-    text = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', text)
-    
-    # Eliminar espacios múltiples
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Eliminar HTML/XML tags
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    return text.strip()
+    return normalize_text(text)
 
 def validate_api_key(api_key: str) -> bool:
     """Valida que una API key tenga el formato correcto."""
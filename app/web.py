@@ -1,15 +1,34 @@
-from fastapi import FastAPI, Request, Form
+from fastapi import FastAPI, Request, Form, File, UploadFile, Depends
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, FileResponse, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
 import uvicorn
 from pathlib import Path
 import asyncio
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
+import os
+import re
+import time
+import uuid
 
-from .multiagent import multiagent
+from .multiagent import get_graph, build_input
+from .checkpoint import fork_checkpoint, get_checkpointer, thread_config
+from .extraction import load_encoding
+from .batch import (BATCH_CONCURRENCY, BATCH_CONCURRENCY_MAX, BATCH_DIR, arun_batch_file,
+                    load_checkpoint, read_prompts)
+from .cache import cache
+from .fetcher import fetcher
+from .llm_cache import llm_cache_backend
+from .metrics import registry, stats_collector, execution_context, metrics_callback
+from .rate_limiter import limiter_stats
+from .routing import PIPELINES
 from .logger import logger
+from .scheduler import create_scheduler, QueueFullError, RUNNING, DONE, FAILED
+from .store import create_store, ExecutionHeartbeat, EXECUTION_LEASE_SECONDS, FINISHED_STATUSES
+from .streaming import StepBroker, format_sse
+from .validators import ValidationError, clean_prompt
 
 app = FastAPI(title="Sistema Multi-Agente de Marketing")
 
@@ -18,8 +37,29 @@ BASE_DIR = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
 
-# Almacenar resultados de las ejecuciones
-execution_results: Dict[str, List[Dict]] = {}
+# Estado y pasos de las ejecuciones, compartidos entre workers
+store = create_store()
+
+# Latido de las ejecuciones en curso en este worker
+heartbeat = ExecutionHeartbeat(store)
+
+# Planificador que ejecuta el grafo fuera del event loop
+scheduler = create_scheduler()
+
+# Modo de ejecución: "async" (astream en el event loop) o "threads" (pool de hilos)
+EXECUTION_MODE = os.getenv("MULTIAGENT_EXECUTION_MODE", "async")
+
+# Difusión de pasos y tokens a los clientes conectados por SSE
+broker = StepBroker()
+
+# Segundos sin eventos tras los que se envía un keepalive SSE
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Intervalo de consulta al almacén, para pasos producidos por otros workers
+STREAM_POLL_SECONDS = 1.0
+
+# Tamaño máximo de página de /results
+RESULTS_PAGE_MAX = 500
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -29,43 +69,505 @@ async def home(request: Request):
         {"request": request}
     )
 
+def handle_chunk(execution_id: str, mode: str, chunk):
+    """Almacena un paso del grafo o reenvía un delta de tokens."""
+    if mode == "messages":
+        message, metadata = chunk
+        if message.content:
+            broker.publish(execution_id, {
+                "type": "token",
+                "node": metadata.get("langgraph_node"),
+                "content": message.content
+            })
+        return
+
+    if not "__end__" in chunk:
+        position = store.append_step(execution_id, chunk)
+        broker.publish(execution_id, {"type": "step", "position": position})
+        logger.info("Progreso de ejecución %s: paso %d (%s)", execution_id, position, ", ".join(chunk))
+
+def finish_execution(execution_id: str, timings, status: str, error: Optional[str] = None):
+    """Guarda el desglose de tiempos y el estado final de una ejecución."""
+    store.update_metadata(execution_id, timings=timings.to_dict())
+    store.set_status(execution_id, status, error)
+
+def graph_input(prompt: Optional[str], plan: Optional[List[str]] = None) -> Optional[Dict]:
+    """Estado inicial del grafo; sin prompt se reanuda desde el último checkpoint."""
+    return build_input(prompt, plan) if prompt is not None else None
+
+def execution_config(execution_id: str) -> Dict:
+    """Configuración de una ejecución: su id es el hilo de sus checkpoints."""
+    return {"recursion_limit": 150, "callbacks": [metrics_callback],
+            **thread_config(execution_id)}
+
+def run_execution(execution_id: str, prompt: Optional[str], stream_tokens: bool = False,
+                  plan: Optional[List[str]] = None):
+    """Ejecuta el sistema multi-agente para un prompt (corre en un worker).
+
+    Con ``prompt=None`` continúa la ejecución desde su último checkpoint.
+    """
+    stream_mode = ["updates", "messages"] if stream_tokens else ["updates"]
+    store.set_status(execution_id, RUNNING)
+    with execution_context(execution_id) as timings, heartbeat.track(execution_id):
+        try:
+            for mode, chunk in get_graph(checkpointed=True).stream(
+                graph_input(prompt, plan),
+                execution_config(execution_id),
+                stream_mode=stream_mode
+            ):
+                handle_chunk(execution_id, mode, chunk)
+        except Exception as e:
+            finish_execution(execution_id, timings, FAILED, str(e))
+            raise
+        else:
+            finish_execution(execution_id, timings, DONE)
+        finally:
+            broker.publish(execution_id, {"type": "end"})
+
+async def arun_execution(execution_id: str, prompt: Optional[str], stream_tokens: bool = False,
+                         plan: Optional[List[str]] = None):
+    """Ejecuta el grafo asíncrono en el event loop sin ocupar un hilo.
+
+    Las escrituras en SQLite pueden esperar el lock de otro worker: se hacen
+    en hilos para no bloquear el event loop ni al resto de ejecuciones.
+    """
+    stream_mode = ["updates", "messages"] if stream_tokens else ["updates"]
+    await asyncio.to_thread(store.set_status, execution_id, RUNNING)
+    with execution_context(execution_id) as timings, heartbeat.track(execution_id):
+        try:
+            async for mode, chunk in get_graph(use_async=True, checkpointed=True).astream(
+                graph_input(prompt, plan),
+                execution_config(execution_id),
+                stream_mode=stream_mode
+            ):
+                if mode == "messages":
+                    handle_chunk(execution_id, mode, chunk)
+                else:
+                    await asyncio.to_thread(handle_chunk, execution_id, mode, chunk)
+        except Exception as e:
+            await asyncio.to_thread(finish_execution, execution_id, timings, FAILED, str(e))
+            raise
+        else:
+            await asyncio.to_thread(finish_execution, execution_id, timings, DONE)
+        finally:
+            broker.publish(execution_id, {"type": "end"})
+
+EXECUTORS = {"async": arun_execution, "threads": run_execution}
+
+def get_tenant(request: Request) -> str:
+    """Identifica al tenant por cabecera o, en su defecto, por la IP del cliente."""
+    tenant = request.headers.get("X-Tenant-ID")
+    if tenant:
+        return tenant
+    return request.client.host if request.client else "anonymous"
+
+@app.exception_handler(ValidationError)
+async def validation_error_handler(request: Request, exc: ValidationError):
+    """Las entradas inválidas se responden con 400 y el formato de error de la API."""
+    logger.warning(f"Entrada rechazada en {request.url.path}: {str(exc)}")
+    return JSONResponse(
+        status_code=400,
+        content={"status": "error", "message": str(exc)}
+    )
+
+def prompt_form(prompt: str = Form(...)) -> str:
+    """Dependencia que normaliza y valida el prompt de un formulario."""
+    return clean_prompt(prompt)
+
 @app.post("/execute")
-async def execute_task(prompt: str = Form(...)):
-    """Ejecuta una tarea en el sistema multi-agente."""
+async def execute_task(request: Request, prompt: str = Depends(prompt_form),
+                       stream_tokens: bool = Form(False),
+                       pipeline: str = Form("auto")):
+    """Encola una tarea en el sistema multi-agente y retorna su id.
+
+    ``pipeline`` elige un plan fijo (p. ej. "standard") en lugar de dejar
+    que el supervisor decida cada paso con el LLM ("auto").
+    """
+    if pipeline != "auto" and pipeline not in PIPELINES:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": f"Pipeline desconocido: {pipeline}"}
+        )
     try:
         # Generar un ID único para esta ejecución
-        execution_id = str(len(execution_results))
-        execution_results[execution_id] = []
-        
-        # Ejecutar el sistema multi-agente
-        for s in multiagent.stream(
-            {
-                "messages": [
-                    HumanMessage(content=prompt)
-                ],
-            },
-            {"recursion_limit": 150}
-        ):
-            if not "__end__" in s:
-                execution_results[execution_id].append(s)
-                logger.info(f"Progreso de ejecución {execution_id}: {s}")
-        
+        execution_id = uuid.uuid4().hex
+        tenant = get_tenant(request)
+        await asyncio.to_thread(store.create, execution_id, tenant=tenant, pipeline=pipeline)
+        scheduler.submit(
+            EXECUTORS[EXECUTION_MODE], execution_id, prompt, stream_tokens,
+            PIPELINES.get(pipeline),
+            tenant=tenant, job_id=execution_id
+        )
         return {"status": "success", "execution_id": execution_id}
+    except QueueFullError as e:
+        await asyncio.to_thread(store.delete, execution_id)
+        logger.warning(f"Ejecución rechazada: {str(e)}")
+        return JSONResponse(
+            status_code=429,
+            content={"status": "error", "message": str(e)}
+        )
     except Exception as e:
         logger.error(f"Error en la ejecución: {str(e)}")
         return {"status": "error", "message": str(e)}
 
+def execution_error(status_code: int, message: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"status": "error", "message": message}
+    )
+
+def serialize_snapshot(snapshot) -> Dict:
+    """Resumen de un checkpoint: desde dónde se puede reanudar o bifurcar."""
+    return {
+        "checkpoint_id": snapshot.config["configurable"]["checkpoint_id"],
+        "step": snapshot.metadata.get("step"),
+        "source": snapshot.metadata.get("source"),
+        "next": list(snapshot.next),
+        "created_at": snapshot.created_at,
+    }
+
+def submit_from_checkpoint(request: Request, execution_id: str, stream_tokens: bool):
+    """Planifica la continuación de una ejecución en cola desde su último checkpoint."""
+    scheduler.submit(
+        EXECUTORS[EXECUTION_MODE], execution_id, None, stream_tokens,
+        tenant=get_tenant(request), job_id=execution_id
+    )
+
+@app.get("/executions/{execution_id}/checkpoints")
+async def list_checkpoints(execution_id: str):
+    """Checkpoints de una ejecución, del más reciente al más antiguo.
+
+    ``next`` son los nodos que se ejecutarían al continuar desde cada uno.
+    """
+    if not await asyncio.to_thread(store.exists, execution_id):
+        return execution_error(404, "Ejecución no encontrada")
+    if get_checkpointer() is None:
+        return execution_error(409, "El checkpointing está desactivado")
+    history = get_graph(checkpointed=True).aget_state_history(thread_config(execution_id))
+    return {
+        "status": "success",
+        "checkpoints": [serialize_snapshot(snapshot) async for snapshot in history]
+    }
+
+@app.post("/executions/{execution_id}/resume")
+async def resume_execution(request: Request, execution_id: str,
+                           stream_tokens: bool = Form(False)):
+    """Reanuda una ejecución interrumpida (fallo, timeout o reinicio) desde su último checkpoint.
+
+    Los nodos ya completados no se repiten: el grafo continúa con los que
+    quedaban pendientes. Solo se reanudan las ejecuciones fallidas y las que
+    siguen en curso sin latido desde hace ``EXECUTION_LEASE_SECONDS`` (su
+    worker se cayó); el resto responde 409.
+    """
+    execution = await asyncio.to_thread(store.get, execution_id)
+    if execution is None:
+        return execution_error(404, "Ejecución no encontrada")
+    if get_checkpointer() is None:
+        return execution_error(409, "El checkpointing está desactivado")
+    if execution["status"] not in (FAILED, RUNNING):
+        return execution_error(409, "La ejecución no está interrumpida")
+    state = await get_graph(checkpointed=True).aget_state(thread_config(execution_id))
+    if not state.next:
+        return execution_error(409, "La ejecución no tiene pasos pendientes que reanudar")
+    # Reclamo atómico: evita reanudar una ejecución viva o dos veces a la vez
+    stale_before = time.time() - EXECUTION_LEASE_SECONDS
+    if not await asyncio.to_thread(store.claim_resume, execution_id, stale_before):
+        return execution_error(409, "La ejecución sigue en curso o ya se está reanudando")
+    try:
+        submit_from_checkpoint(request, execution_id, stream_tokens)
+    except QueueFullError as e:
+        # Queda como fallida para poder reintentar la reanudación
+        await asyncio.to_thread(
+            store.set_status, execution_id, FAILED,
+            execution["error"] or "La ejecución se interrumpió sin terminar"
+        )
+        logger.warning(f"Reanudación rechazada: {str(e)}")
+        return execution_error(429, str(e))
+    logger.info("Ejecución %s reanudada en %s", execution_id, ", ".join(state.next))
+    return {"status": "success", "execution_id": execution_id, "next": list(state.next)}
+
+@app.post("/executions/{execution_id}/fork")
+async def fork_execution(request: Request, execution_id: str,
+                         checkpoint_id: Optional[str] = Form(None),
+                         node: Optional[str] = Form(None),
+                         stream_tokens: bool = Form(False)):
+    """Crea una ejecución nueva a partir de un paso intermedio de otra.
+
+    El paso se indica con ``checkpoint_id`` (ver ``/executions/{id}/checkpoints``)
+    o con ``node``: el checkpoint más reciente desde el que se ejecutaría ese
+    nodo. Por ejemplo, ``node=social_media_manager`` regenera el tweet sin
+    repetir la investigación ni el artículo.
+    """
+    execution = await asyncio.to_thread(store.get, execution_id)
+    if execution is None:
+        return execution_error(404, "Ejecución no encontrada")
+    saver = get_checkpointer()
+    if saver is None:
+        return execution_error(409, "El checkpointing está desactivado")
+    if not checkpoint_id and not node:
+        return execution_error(400, "Indica checkpoint_id o node")
+    if not checkpoint_id:
+        history = get_graph(checkpointed=True).aget_state_history(thread_config(execution_id))
+        snapshot = None
+        async for candidate in history:
+            if node in candidate.next:
+                snapshot = candidate
+                break
+        if snapshot is None:
+            return execution_error(404, f"Ningún checkpoint continúa en el nodo {node}")
+        checkpoint_id = snapshot.config["configurable"]["checkpoint_id"]
+
+    fork_id = uuid.uuid4().hex
+    tenant = get_tenant(request)
+    source = thread_config(execution_id, checkpoint_id)
+    if await asyncio.to_thread(fork_checkpoint, saver, source, fork_id) is None:
+        return execution_error(404, "Checkpoint no encontrado")
+    await asyncio.to_thread(
+        store.create, fork_id, tenant=tenant, pipeline=execution["metadata"].get("pipeline"),
+        forked_from={"execution_id": execution_id, "checkpoint_id": checkpoint_id}
+    )
+    try:
+        submit_from_checkpoint(request, fork_id, stream_tokens)
+    except QueueFullError as e:
+        await asyncio.to_thread(store.delete, fork_id)
+        await saver.adelete_thread(fork_id)
+        logger.warning(f"Bifurcación rechazada: {str(e)}")
+        return execution_error(429, str(e))
+    return {"status": "success", "execution_id": fork_id, "checkpoint_id": checkpoint_id}
+
+BATCH_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+def batch_paths(batch_id: str):
+    """Ficheros de entrada y de resultados de un lote."""
+    return (os.path.join(BATCH_DIR, f"{batch_id}.input.jsonl"),
+            os.path.join(BATCH_DIR, f"{batch_id}.jsonl"))
+
+def batch_not_found() -> JSONResponse:
+    return JSONResponse(
+        status_code=404,
+        content={"status": "error", "message": "Lote no encontrado"}
+    )
+
+@app.post("/batch")
+async def submit_batch(request: Request, file: UploadFile = File(...),
+                       pipeline: str = Form("auto"),
+                       concurrency: int = Form(BATCH_CONCURRENCY)):
+    """Encola un lote de prompts (texto, uno por línea, o JSONL) y retorna su id."""
+    if pipeline != "auto" and pipeline not in PIPELINES:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": f"Pipeline desconocido: {pipeline}"}
+        )
+    lines = (await file.read()).decode("utf-8", "replace").splitlines()
+    items = list(read_prompts(lines, None if pipeline == "auto" else pipeline))
+    if not items:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": "El lote no contiene prompts"}
+        )
+
+    batch_id = uuid.uuid4().hex
+    input_path, output_path = batch_paths(batch_id)
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    with open(input_path, "w", encoding="utf-8") as source:
+        for item in items:
+            source.write(json.dumps(item, ensure_ascii=False) + "\n")
+    try:
+        scheduler.submit(
+            arun_batch_file, input_path, output_path,
+            min(max(concurrency, 1), BATCH_CONCURRENCY_MAX),
+            tenant=get_tenant(request), job_id=batch_id
+        )
+    except QueueFullError as e:
+        os.remove(input_path)
+        logger.warning(f"Lote rechazado: {str(e)}")
+        return JSONResponse(
+            status_code=429,
+            content={"status": "error", "message": str(e)}
+        )
+    return {"status": "success", "batch_id": batch_id, "total": len(items)}
+
+@app.get("/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    """Progreso de un lote: prompts totales y completados."""
+    if not BATCH_ID_PATTERN.fullmatch(batch_id):
+        return batch_not_found()
+    input_path, output_path = batch_paths(batch_id)
+    if not os.path.exists(input_path):
+        return batch_not_found()
+
+    with open(input_path, encoding="utf-8") as source:
+        total = sum(1 for _ in source)
+    job = scheduler.get(batch_id)
+    return {
+        "status": "success",
+        "total": total,
+        "completed": len(load_checkpoint(output_path)),
+        "job": job.to_dict() if job else None
+    }
+
+@app.get("/batch/{batch_id}/results")
+async def get_batch_results(batch_id: str):
+    """Resultados JSONL del lote (una línea por prompt terminado)."""
+    if not BATCH_ID_PATTERN.fullmatch(batch_id):
+        return batch_not_found()
+    _, output_path = batch_paths(batch_id)
+    if not os.path.exists(output_path):
+        return batch_not_found()
+    return FileResponse(output_path, media_type="application/x-ndjson")
+
+@app.get("/jobs/{execution_id}")
+async def get_job(execution_id: str):
+    """Obtiene el estado y los tiempos de una ejecución encolada."""
+    job = scheduler.get(execution_id)
+    if job is None:
+        return {"status": "error", "message": "Ejecución no encontrada"}
+    return {"status": "success", "job": job.to_dict()}
+
 @app.get("/results/{execution_id}")
-async def get_results(execution_id: str):
-    """Obtiene los resultados de una ejecución específica."""
-    if execution_id not in execution_results:
+async def get_results(execution_id: str, cursor: int = 0, limit: int = 100):
+    """Obtiene una página de los pasos de una ejecución.
+
+    ``next_cursor`` es el ``cursor`` de la página siguiente; ``has_more``
+    indica si ya hay más pasos guardados.
+    """
+    execution = await asyncio.to_thread(store.get, execution_id)
+    if execution is None:
         return {"status": "error", "message": "Ejecución no encontrada"}
-    
+
+    limit = min(max(limit, 1), RESULTS_PAGE_MAX)
+    steps, next_cursor = await asyncio.to_thread(
+        store.get_steps, execution_id, max(cursor, 0), limit
+    )
+    # El trabajo solo existe en el worker que lo planificó
+    job = scheduler.get(execution_id)
     return {
         "status": "success",
-        "results": execution_results[execution_id]
+        "execution": execution,
+        "job": job.to_dict() if job else None,
+        "timings": execution["metadata"].get("timings"),
+        "results": steps,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor < execution["steps"]
     }
 
+def is_finished(execution_id: str) -> bool:
+    """Indica si una ejecución ya no producirá más pasos."""
+    job = scheduler.get(execution_id)
+    if job is not None and job.status in (DONE, FAILED):
+        return True
+    execution = store.get(execution_id)
+    return execution is None or execution["status"] in FINISHED_STATUSES
+
+def parse_cursor(request: Request, cursor: Optional[int]) -> int:
+    """Obtiene el primer paso pendiente a partir del cursor o de Last-Event-ID."""
+    if cursor is not None:
+        return max(cursor, 0)
+    last_event_id = request.headers.get("Last-Event-ID")
+    if last_event_id and last_event_id.isdigit():
+        return int(last_event_id) + 1
+    return 0
+
+@app.get("/stream/{execution_id}")
+async def stream_results(request: Request, execution_id: str,
+                         cursor: Optional[int] = None):
+    """Transmite por SSE los pasos de una ejecución a medida que se producen.
+
+    Cada paso lleva como id su posición, de modo que un cliente que se
+    reconecta (cabecera ``Last-Event-ID`` o parámetro ``cursor``) recibe
+    solo los pasos que se perdió.
+    """
+    if not await asyncio.to_thread(store.exists, execution_id):
+        return JSONResponse(
+            status_code=404,
+            content={"status": "error", "message": "Ejecución no encontrada"}
+        )
+
+    async def event_stream():
+        position = parse_cursor(request, cursor)
+        queue = broker.subscribe(execution_id)
+        idle = 0.0
+        try:
+            while True:
+                # El estado se consulta antes que los pasos para no perder
+                # los últimos si la ejecución termina entre ambas lecturas
+                finished = await asyncio.to_thread(is_finished, execution_id)
+                while True:
+                    steps, _ = await asyncio.to_thread(store.get_steps, execution_id, position)
+                    if not steps:
+                        break
+                    for step in steps:
+                        yield format_sse(json.dumps(step), event="step", event_id=position)
+                        position += 1
+                    idle = 0.0
+
+                if finished:
+                    execution = await asyncio.to_thread(store.get, execution_id) or {}
+                    job = scheduler.get(execution_id)
+                    if job is not None:
+                        execution["job"] = job.to_dict()
+                    yield format_sse(json.dumps(jsonable_encoder(execution)), event="end")
+                    return
+
+                # Los pasos de ejecuciones de otros workers se detectan consultando
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=STREAM_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    idle += STREAM_POLL_SECONDS
+                    if idle >= STREAM_KEEPALIVE_SECONDS:
+                        idle = 0.0
+                        yield ": keepalive\n\n"
+                    continue
+
+                if event["type"] == "token":
+                    idle = 0.0
+                    yield format_sse(json.dumps(event), event="token")
+        finally:
+            broker.unsubscribe(execution_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Estadísticas de cachés, rate limiters y planificador como gauges de /metrics
+registry.register_collector(stats_collector(
+    "multiagent_cache", "cache",
+    lambda: {"fetch": cache.stats(), "llm": llm_cache_backend.stats()},
+    "Estadísticas de los cachés"
+))
+registry.register_collector(stats_collector(
+    "multiagent_rate_limiter", "limiter", limiter_stats,
+    "Estadísticas de los rate limiters"
+))
+registry.register_collector(stats_collector(
+    "multiagent_scheduler", "scheduler", lambda: {"default": scheduler.stats()},
+    "Ocupación del planificador"
+))
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas del proceso en el formato de texto de Prometheus."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def attach_scheduler_loop():
+    """Permite al planificador ejecutar trabajos asíncronos en este event loop."""
+    scheduler.attach_loop(asyncio.get_running_loop())
+
+@app.on_event("startup")
+async def load_tokenizer():
+    """Carga el tokenizador antes de atender ejecuciones (puede requerir red)."""
+    await asyncio.to_thread(load_encoding)
+
+@app.on_event("shutdown")
+async def shutdown_scheduler():
+    """Libera el pool de workers, el latido y el cliente HTTP al detener el servidor."""
+    scheduler.shutdown(wait=False)
+    heartbeat.stop()
+    await fetcher.aclose()
+
 def start():
     """Inicia el servidor web."""
     uvicorn.run(
@@ -0,0 +1,7 @@
+"""Benchmarks offline del sistema multi-agente.
+
+Sustituyen OpenAI y Tavily por dobles deterministas y sirven las páginas
+desde un servidor HTTP local, así que se pueden ejecutar sin claves ni red:
+
+    python -m benchmarks.run -o informe.json
+"""
@@ -0,0 +1,175 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import app.multiagent as multiagent
+import app.search as search
+from app.routing import content_marketing_team
+from app.search import SEARCH_TOOL_NAME, SNIPPET_PREFIX
+
+# Nodos cuyo agente busca y descarga páginas antes de responder
+RESEARCH_NODES = {"online_researcher"}
+
+FETCH_TOOL_NAME = "process_search_tool"
+
+URL_PATTERN = re.compile(r"https?://[^\s\"'\\]+")
+
+
+def tool_name(tool: Any) -> str:
+    """Nombre de una herramienta enlazada al modelo (dict de OpenAI o clase)."""
+    if isinstance(tool, dict):
+        return tool.get("function", {}).get("name") or tool.get("name", "")
+    return getattr(tool, "name", None) or getattr(tool, "__name__", "")
+
+
+def estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+class FakeChatModel(BaseChatModel):
+    """Modelo de chat determinista que imita a los agentes y al supervisor.
+
+    - Con la herramienta ``Route`` enlazada (supervisor) elige el primer
+      worker que aún no ha informado o ``FINISH``.
+    - En los nodos de ``RESEARCH_NODES`` busca y responde; solo descarga la
+      primera URL si la búsqueda no incluyó el texto de las páginas.
+    - El resto de agentes responden directamente.
+
+    Cada llamada espera ``latency`` segundos (sin bloquear el event loop
+    en la versión asíncrona) para simular la latencia de la API.
+    """
+
+    model_name: str = "fake-model"
+    latency: float = 0.0
+    answer_words: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "answer_words": self.answer_words}
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs):
+        return self.bind(tools=tools, **kwargs)
+
+    def with_structured_output(self, schema, *, method: Optional[str] = None, **kwargs):
+        # Solo se soporta la salida estructurada mediante llamadas a funciones
+        return super().with_structured_output(schema, **kwargs)
+
+    def _respond(self, messages: List[BaseMessage], tools: List[Any], node: Optional[str]) -> AIMessage:
+        names = {tool_name(tool) for tool in tools or []}
+        if "Route" in names:
+            reported = {message.name for message in messages if getattr(message, "name", None)}
+            route = next((name for name in content_marketing_team if name not in reported), "FINISH")
+            return AIMessage(content="", tool_calls=[
+                {"name": "Route", "args": {"next": route}, "id": "route"}])
+
+        tool_results = [message for message in messages if isinstance(message, ToolMessage)]
+        if node in RESEARCH_NODES and SEARCH_TOOL_NAME in names and not tool_results:
+            query = str(messages[-1].content)[:200]
+            return AIMessage(content="", tool_calls=[
+                {"name": SEARCH_TOOL_NAME, "args": {"query": query}, "id": "search"}])
+        if (node in RESEARCH_NODES and FETCH_TOOL_NAME in names and len(tool_results) == 1
+                and SNIPPET_PREFIX in str(tool_results[0].content)):
+            urls = URL_PATTERN.findall(str(tool_results[0].content))
+            if urls:
+                return AIMessage(content="", tool_calls=[
+                    {"name": FETCH_TOOL_NAME, "args": {"url": urls[0]}, "id": "fetch"}])
+
+        return AIMessage(content=f"Informe de {node or 'agente'}: " + "contenido " * self.answer_words)
+
+    def _result(self, messages: List[BaseMessage], run_manager, **kwargs) -> ChatResult:
+        node = (getattr(run_manager, "metadata", None) or {}).get("langgraph_node")
+        message = self._respond(messages, kwargs.get("tools"), node)
+        input_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = estimate_tokens(str(message.content) or json.dumps(message.tool_calls))
+        message.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                                  "total_tokens": input_tokens + output_tokens}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(messages, run_manager, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(messages, run_manager, **kwargs)
+
+
+class FakeSearchClient:
+    """Doble del cliente de Tavily que retorna páginas del servidor local.
+
+    La misma consulta lleva siempre a las mismas páginas, así que los cachés
+    de búsquedas y descargas se comportan como con búsquedas reales repetidas.
+    """
+
+    def __init__(self, base_url: str, pages: int = 20, latency: float = 0.0):
+        self.base_url = base_url
+        self.pages = pages
+        self.latency = latency
+        self.calls = 0
+
+    def _results(self, query: str, max_results: int) -> Dict[str, Any]:
+        self.calls += 1
+        first = int(hashlib.sha256(query.encode("utf-8")).hexdigest(), 16) % self.pages
+        return {"results": [{"title": f"Página {(first + i) % self.pages}",
+                             "url": f"{self.base_url}/page/{(first + i) % self.pages}",
+                             "content": f"Resultado {i + 1} para {query[:50]}",
+                             "score": 1.0 - i / 10}
+                            for i in range(min(max_results, self.pages))]}
+
+    def raw_results(self, query: str, max_results: int = 5, *args, **kwargs) -> Dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._results(query, max_results)
+
+    async def raw_results_async(self, query: str, max_results: int = 5, *args, **kwargs) -> Dict[str, Any]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._results(query, max_results)
+
+
+def clear_factories():
+    """Descarta el modelo, las herramientas, los agentes y los grafos ya creados."""
+    for factory in (multiagent.get_llm, multiagent.get_tools, multiagent.get_supervisor_chain,
+                    multiagent.get_agents, multiagent.get_graph):
+        factory.cache_clear()
+
+
+@contextlib.contextmanager
+def fake_services(base_url: str, llm_latency: float = 0.0, search_latency: float = 0.0,
+                  pages: int = 20, answer_words: int = 200):
+    """Sustituye ``ChatOpenAI`` y el cliente de Tavily por dobles.
+
+    Los grafos creados dentro del bloque usan los dobles; al salir se
+    restauran los originales y se descartan los objetos creados.
+    """
+    original_llm = multiagent.ChatOpenAI
+    original_client = search.get_search_client
+    client = FakeSearchClient(base_url, pages, search_latency)
+
+    def chat_model(model: str, cache=None, **kwargs):
+        return FakeChatModel(model_name=model, cache=cache, latency=llm_latency,
+                             answer_words=answer_words)
+
+    multiagent.ChatOpenAI = chat_model
+    search.get_search_client = lambda: client
+    clear_factories()
+    try:
+        yield client
+    finally:
+        multiagent.ChatOpenAI = original_llm
+        search.get_search_client = original_client
+        clear_factories()
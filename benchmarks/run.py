@@ -0,0 +1,422 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+# Los benchmarks no necesitan claves reales ni deben escribir cada paso en
+# disco; el límite por host se relaja porque todas las páginas salen de
+# 127.0.0.1 (el limitador se mide aparte en su microbenchmark).
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark-0000000000000000")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+os.environ.setdefault("FETCH_HOST_CALLS_PER_MINUTE", "1000000")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app.cache import MemoryLRUCache
+from app.extraction import extract_main_text, load_encoding
+from app.fetcher import Fetcher
+from app.multiagent import build_input, extract_page_text, get_graph
+from app.rate_limiter import MemoryBucketStore, RateLimiter, SQLiteBucketStore
+from app.routing import PIPELINES
+from app.validators import iter_normalized, normalize_text
+
+from .fakes import fake_services
+from .server import render_page, serve_pages
+
+SUITES = ("graph", "cache", "limiter", "fetch", "validators", "extraction")
+
+# Métricas que se comparan entre informes y si más es mejor
+COMPARED_METRICS = {
+    "runs_per_sec": True,
+    "ops_per_sec": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "rss_growth_mb": False,
+    "mb_per_sec": True,
+}
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentil ``q`` (0-100) por rango más cercano."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def latency_summary(latencies: Sequence[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+    }
+
+
+def rss_bytes() -> int:
+    """Memoria residente del proceso (el pico si no hay /proc)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_graph_level(concurrency: int, runs: int, pipeline: Optional[str],
+                          offset: int = 0) -> Dict[str, Any]:
+    """Ejecuta ``runs`` veces el grafo asíncrono con ``concurrency`` a la vez."""
+    graph = get_graph(use_async=True)
+    plan = PIPELINES.get(pipeline)
+    latencies: List[float] = []
+    errors = 0
+    pending = iter(range(offset, offset + runs))
+
+    async def worker():
+        nonlocal errors
+        for number in pending:
+            # Prompts distintos para no medir el caché de respuestas del LLM
+            prompt = f"Tendencias de marketing de contenidos, informe {number}"
+            started = time.perf_counter()
+            try:
+                await graph.ainvoke(build_input(prompt, plan), {"recursion_limit": 150})
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    gc.collect()
+    rss_before = rss_bytes()
+    objects_before = len(gc.get_objects())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    gc.collect()
+
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "runs_per_sec": round(runs / elapsed, 3),
+        **latency_summary(latencies),
+        "rss_growth_mb": round((rss_bytes() - rss_before) / 2**20, 3),
+        "gc_objects_growth": len(gc.get_objects()) - objects_before,
+    }
+
+
+def bench_graph(levels: Sequence[int], runs: int, pipeline: Optional[str] = None,
+                llm_latency: float = 0.05, search_latency: float = 0.02,
+                page_latency: float = 0.0, pages: int = 20) -> List[Dict[str, Any]]:
+    """Ejecuciones completas del grafo con el LLM y la búsqueda simulados.
+
+    Una ronda de calentamiento llena el caché de descargas antes de medir.
+    """
+    results = []
+    with serve_pages(latency=page_latency) as base_url:
+        with fake_services(base_url, llm_latency, search_latency, pages):
+            async def run_levels():
+                await run_graph_level(1, min(pages, runs), pipeline, offset=-pages)
+                for index, concurrency in enumerate(levels):
+                    results.append(await run_graph_level(concurrency, runs, pipeline,
+                                                         offset=index * runs))
+            asyncio.run(run_levels())
+    return results
+
+
+def run_threads(concurrency: int, ops: int, operation: Callable[[int], None]) -> Dict[str, Any]:
+    """Reparte ``ops`` llamadas a ``operation`` entre ``concurrency`` hilos."""
+    per_thread = max(ops // concurrency, 1)
+
+    def work(thread: int):
+        base = thread * per_thread
+        for i in range(base, base + per_thread):
+            operation(i)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(work, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    total = per_thread * concurrency
+    return {"concurrency": concurrency, "ops": total, "seconds": round(elapsed, 3),
+            "ops_per_sec": round(total / elapsed, 1)}
+
+
+def bench_cache(levels: Sequence[int], ops: int, keys: int = 2048) -> List[Dict[str, Any]]:
+    """Lecturas y escrituras sobre la LRU en memoria, con expulsiones.
+
+    Las claves siguen una distribución sesgada (unas pocas muy frecuentes),
+    como las URLs y prompts repetidos en producción.
+    """
+    results = []
+    value = "x" * 1024
+    rng = random.Random(0)
+    sequence = [f"key-{int(keys * rng.random() ** 3)}" for _ in range(4096)]
+    for concurrency in levels:
+        cache = MemoryLRUCache(ttl_seconds=3600, max_entries=keys // 4)
+
+        def operation(i: int):
+            key = sequence[i % len(sequence)]
+            if i % 10 == 0 or cache.get(key) is None:
+                cache.set(key, value)
+
+        result = run_threads(concurrency, ops, operation)
+        result.update(hit_rate=round(cache.hits / max(cache.hits + cache.misses, 1), 3))
+        results.append(result)
+    return results
+
+
+def bench_limiter(levels: Sequence[int], ops: int, keys: int = 256) -> List[Dict[str, Any]]:
+    """Reservas de turno del limitador con los almacenes en memoria y SQLite."""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            "memory": MemoryBucketStore(),
+            "sqlite": SQLiteBucketStore(os.path.join(directory, "buckets.sqlite3")),
+        }
+        for store_name, store in stores.items():
+            limiter = RateLimiter(calls_per_minute=10**9, store=store, name="benchmark")
+            for concurrency in levels:
+                result = run_threads(concurrency, ops if store_name == "memory" else ops // 10,
+                                     lambda i: limiter.reserve(f"key-{i % keys}"))
+                results.append({"store": store_name, **result})
+    return results
+
+
+def bench_fetch(levels: Sequence[int], requests: int, pages: int = 20,
+                page_latency: float = 0.0) -> List[Dict[str, Any]]:
+    """Descargas asíncronas con extracción de texto contra el servidor local.
+
+    Cada página se descarga completa la primera vez y después se revalida
+    con ETag (respuesta 304 sin volver a extraer el texto).
+    """
+    results = []
+    with serve_pages(latency=page_latency) as base_url:
+        for concurrency in levels:
+            fetcher = Fetcher(cache=MemoryLRUCache(), max_per_host=concurrency)
+            latencies: List[float] = []
+            revalidated = 0
+
+            async def run_level():
+                nonlocal revalidated
+                semaphore = asyncio.Semaphore(concurrency)
+
+                async def fetch(i: int):
+                    nonlocal revalidated
+                    async with semaphore:
+                        started = time.perf_counter()
+                        result = await fetcher.afetch(f"{base_url}/page/{i % pages}",
+                                                      transform=extract_page_text)
+                        latencies.append(time.perf_counter() - started)
+                        revalidated += result.revalidated
+
+                await asyncio.gather(*(fetch(i) for i in range(requests)))
+                await fetcher.aclose()
+
+            started = time.perf_counter()
+            asyncio.run(run_level())
+            elapsed = time.perf_counter() - started
+            fetcher.close()
+            results.append({"concurrency": concurrency, "ops": requests,
+                            "seconds": round(elapsed, 3),
+                            "ops_per_sec": round(requests / elapsed, 1),
+                            "revalidated": revalidated, **latency_summary(latencies)})
+    return results
+
+
+def legacy_sanitize_input(text: str) -> Optional[str]:
+    """``sanitize_input`` anterior (tres pasadas de regex sin precompilar), como referencia."""
+    if not text:
+        return None
+    text = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'<[^>]+>', '', text)
+    return text.strip()
+
+
+def sample_inputs(size: int) -> Dict[str, str]:
+    """Entradas de ``size`` caracteres: prosa, HTML y texto con mucho espacio."""
+    prose = "Tendencias de la IA en el marketing de contenidos para 2025. "
+    html = "<div class='post'><p>Contenido <b>destacado</b> del artículo</p>\n</div>\t"
+    spaced = "palabra \t\n\x00   \r\n "
+    return {name: (piece * (size // len(piece) + 1))[:size]
+            for name, piece in (("prose", prose), ("html", html), ("spaced", spaced))}
+
+
+def bench_validators(sizes: Sequence[int] = (10_000, 1_000_000), repeat: int = 5) -> List[Dict[str, Any]]:
+    """Normalización de entradas grandes: implementación anterior frente a la actual."""
+    implementations = {
+        "legacy": legacy_sanitize_input,
+        "normalize_text": normalize_text,
+        "iter_normalized": lambda text: "".join(iter_normalized(
+            text[i:i + 64 * 1024] for i in range(0, len(text), 64 * 1024))),
+    }
+    results = []
+    for size in sizes:
+        for input_name, text in sample_inputs(size).items():
+            for name, func in implementations.items():
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    func(text)
+                elapsed = (time.perf_counter() - started) / repeat
+                results.append({"input": f"{input_name}-{size}", "implementation": name,
+                                "seconds": round(elapsed, 6),
+                                "mb_per_sec": round(size / elapsed / 2**20, 2)})
+    return results
+
+
+def bench_extraction(paragraphs: Sequence[int] = (500, 4000), repeat: int = 3) -> List[Dict[str, Any]]:
+    """Extracción del texto principal de páginas grandes (de ~250 KB a ~2 MB)."""
+    results = []
+    for count in paragraphs:
+        page = render_page(0, count)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            extract_main_text(page)
+        elapsed = (time.perf_counter() - started) / repeat
+        results.append({"input": f"page-{len(page) // 1024}kb", "seconds": round(elapsed, 6),
+                        "mb_per_sec": round(len(page) / elapsed / 2**20, 2)})
+    return results
+
+
+def run_benchmarks(suites: Sequence[str], levels: Sequence[int], runs: int = 20,
+                   ops: int = 20000, pipeline: Optional[str] = None,
+                   llm_latency: float = 0.05, search_latency: float = 0.02,
+                   page_latency: float = 0.0, pages: int = 20) -> Dict[str, Any]:
+    """Ejecuta los benchmarks elegidos y retorna el informe."""
+    results: Dict[str, Any] = {}
+    if "graph" in suites:
+        results["graph"] = bench_graph(levels, runs, pipeline, llm_latency,
+                                       search_latency, page_latency, pages)
+    if "cache" in suites:
+        results["cache"] = bench_cache(levels, ops)
+    if "limiter" in suites:
+        results["limiter"] = bench_limiter(levels, ops)
+    if "fetch" in suites:
+        results["fetch"] = bench_fetch(levels, max(runs * 10, pages), pages, page_latency)
+    if "validators" in suites:
+        results["validators"] = bench_validators()
+    if "extraction" in suites:
+        results["extraction"] = bench_extraction()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {"suites": list(suites), "concurrency": list(levels), "runs": runs,
+                       "ops": ops, "pipeline": pipeline or "auto", "llm_latency": llm_latency,
+                       "search_latency": search_latency, "page_latency": page_latency,
+                       "pages": pages},
+        },
+        "results": results,
+    }
+
+
+def result_label(suite: str, result: Dict[str, Any]) -> str:
+    label = suite
+    if "concurrency" in result:
+        label += f" c={result['concurrency']}"
+    for key in ("store", "input", "implementation"):
+        if key in result:
+            label += f" {result[key]}"
+    return label
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Cambio relativo de cada métrica comparable respecto al informe base.
+
+    ``better`` indica si el cambio es una mejora (más rendimiento o menos
+    latencia y memoria).
+    """
+    rows = []
+    for suite, results in current["results"].items():
+        previous = {result_label(suite, r): r for r in baseline.get("results", {}).get(suite, [])}
+        for result in results:
+            label = result_label(suite, result)
+            if label not in previous:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                before, after = previous[label].get(metric), result.get(metric)
+                if before is None or after is None:
+                    continue
+                change = (after - before) / before if before else 0.0
+                rows.append({"benchmark": label, "metric": metric, "baseline": before,
+                             "current": after, "change": round(change, 4),
+                             "better": change > 0 if higher_is_better else change < 0})
+    return rows
+
+
+def main(argv=None):
+    """python -m benchmarks.run -o informe.json [--compare base.json]"""
+    parser = argparse.ArgumentParser(description="Benchmarks offline del sistema multi-agente.")
+    parser.add_argument("--suites", default=",".join(SUITES),
+                        help=f"Benchmarks separados por comas ({', '.join(SUITES)})")
+    parser.add_argument("-c", "--concurrency", default="1,4,16",
+                        help="Niveles de concurrencia separados por comas")
+    parser.add_argument("--runs", type=int, default=20,
+                        help="Ejecuciones del grafo por nivel de concurrencia")
+    parser.add_argument("--ops", type=int, default=20000,
+                        help="Operaciones por nivel en los microbenchmarks")
+    parser.add_argument("--pipeline", choices=["auto"] + sorted(PIPELINES), default="auto")
+    parser.add_argument("--llm-latency", type=float, default=0.05,
+                        help="Segundos de cada llamada simulada al LLM")
+    parser.add_argument("--search-latency", type=float, default=0.02,
+                        help="Segundos de cada búsqueda simulada")
+    parser.add_argument("--page-latency", type=float, default=0.0,
+                        help="Segundos que tarda el servidor local en responder")
+    parser.add_argument("--pages", type=int, default=20, help="Páginas distintas del servidor local")
+    parser.add_argument("-o", "--output", help="Fichero JSON donde guardar el informe")
+    parser.add_argument("--compare", help="Informe JSON anterior con el que comparar")
+    args = parser.parse_args(argv)
+
+    suites = [suite.strip() for suite in args.suites.split(",") if suite.strip()]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Benchmarks desconocidos: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    load_encoding()
+    report = run_benchmarks(suites, levels, args.runs, args.ops,
+                            None if args.pipeline == "auto" else args.pipeline,
+                            args.llm_latency, args.search_latency, args.page_latency, args.pages)
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+    print(json.dumps(report["results"], indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            rows = compare_reports(json.load(baseline), report)
+        for row in rows:
+            mark = "+" if row["better"] else "-"
+            print(f"{mark} {row['benchmark']:<28} {row['metric']:<14} "
+                  f"{row['baseline']:>12} -> {row['current']:>12} ({row['change']:+.1%})")
+
+if __name__ == "__main__":
+    main()
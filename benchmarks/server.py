@@ -0,0 +1,67 @@
+import contextlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+PARAGRAPH = ("La inteligencia artificial generativa sigue transformando el marketing de contenidos: "
+             "las empresas automatizan la investigación, la redacción y la difusión en redes sociales. ")
+
+
+def render_page(number: int, paragraphs: int = 30) -> bytes:
+    """HTML de una página de prueba con navegación y un artículo principal."""
+    body = "".join(f"<p>{number}-{i}: {PARAGRAPH * 3}</p>" for i in range(paragraphs))
+    return (f"<html><head><title>Página {number}</title></head><body>"
+            f"<nav><a href='/'>Inicio</a><a href='/blog'>Blog</a></nav>"
+            f"<article><h1>Tendencias {number}</h1>{body}</article>"
+            f"<footer>Pie de página</footer></body></html>").encode("utf-8")
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Sirve ``/page/<n>`` con ETag; responde 304 si el cliente ya la tiene."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] != "page" or not parts[1].isdigit():
+            self.send_error(404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        etag = f'"page-{parts[1]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        content = render_page(int(parts[1]), self.server.paragraphs)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # Sin una línea por petición en la consola
+        pass
+
+
+@contextlib.contextmanager
+def serve_pages(latency: float = 0.0, paragraphs: int = 30) -> Iterator[str]:
+    """Arranca el servidor de páginas en un puerto libre y retorna su URL base."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.paragraphs = paragraphs
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
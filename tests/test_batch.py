@@ -0,0 +1,73 @@
+import asyncio
+import json
+import time
+
+import app.batch as batch
+from app.batch import arun_batch, load_checkpoint, prompt_id, read_prompts
+
+
+def test_read_prompts_accepts_text_and_jsonl():
+    lines = ["Tema   uno", "", "# comentario", '{"prompt": "Tema <b>dos</b>", "id": "b"}', "{roto",
+             '{"id": "c"}', "a < b"]
+    items = list(read_prompts(lines, pipeline="standard"))
+
+    assert [item["prompt"] for item in items] == ["Tema uno", "Tema dos"]
+    assert items[0]["id"] == prompt_id("Tema uno", "standard")
+    assert items[1]["id"] == "b"
+    assert items[1]["pipeline"] == "standard"
+
+
+def test_arun_batch_resumes_from_output(tmp_path, monkeypatch):
+    calls = []
+
+    async def fake_item(item):
+        calls.append(item["id"])
+        await asyncio.sleep(0)
+        status = "failed" if item["prompt"] == "falla" else "done"
+        return {"id": item["id"], "prompt": item["prompt"], "status": status}
+
+    monkeypatch.setattr(batch, "arun_item", fake_item)
+    output = str(tmp_path / "out" / "results.jsonl")
+    items = list(read_prompts(["uno", "dos", "falla", "uno"]))
+
+    counts = asyncio.run(arun_batch(items, output, concurrency=2))
+    assert counts == {"done": 2, "failed": 1, "skipped": 1}
+    assert load_checkpoint(output) == {prompt_id("uno"), prompt_id("dos")}
+
+    # Al reanudar solo se reintenta el prompt fallido
+    calls.clear()
+    counts = asyncio.run(arun_batch(items, output, concurrency=2))
+    assert calls == [prompt_id("falla")]
+    assert counts == {"done": 0, "failed": 1, "skipped": 3}
+    with open(output, encoding="utf-8") as f:
+        assert len([json.loads(line) for line in f]) == 4
+
+
+def test_arun_batch_reads_input_off_the_event_loop(tmp_path, monkeypatch):
+    async def fake_item(item):
+        return {"id": item["id"], "prompt": item["prompt"], "status": "done"}
+
+    def slow_lines():
+        for prompt in ("uno", "dos", "tres"):
+            time.sleep(0.1)
+            yield prompt
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        counts = await arun_batch(read_prompts(slow_lines()), str(tmp_path / "out.jsonl"), 2)
+        task.cancel()
+        return counts, ticks
+
+    monkeypatch.setattr(batch, "arun_item", fake_item)
+    counts, ticks = asyncio.run(run())
+    assert counts == {"done": 3, "failed": 0, "skipped": 0}
+    # Una entrada lenta no bloquea el event loop mientras se espera cada línea
+    assert ticks >= 10
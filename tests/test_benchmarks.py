@@ -0,0 +1,28 @@
+from benchmarks.run import bench_graph, compare_reports, percentile
+
+
+def test_graph_benchmark_runs_offline(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-00000000000000000000")
+    results = bench_graph([2], runs=2, llm_latency=0, search_latency=0, pages=2)
+
+    assert len(results) == 1
+    assert results[0]["concurrency"] == 2
+    assert results[0]["runs"] == 2
+    assert results[0]["errors"] == 0
+    assert results[0]["runs_per_sec"] > 0
+    assert results[0]["p99_ms"] >= results[0]["p50_ms"]
+
+
+def test_compare_reports_marks_improvements():
+    baseline = {"results": {"cache": [{"concurrency": 4, "ops_per_sec": 100.0}],
+                            "graph": [{"concurrency": 1, "runs_per_sec": 2.0, "p50_ms": 500.0}]}}
+    current = {"results": {"cache": [{"concurrency": 4, "ops_per_sec": 150.0}],
+                           "graph": [{"concurrency": 1, "runs_per_sec": 2.0, "p50_ms": 600.0},
+                                     {"concurrency": 8, "runs_per_sec": 9.0}]}}
+
+    rows = {(row["benchmark"], row["metric"]): row for row in compare_reports(baseline, current)}
+    assert rows[("cache c=4", "ops_per_sec")]["change"] == 0.5
+    assert rows[("cache c=4", "ops_per_sec")]["better"]
+    assert not rows[("graph c=1", "p50_ms")]["better"]
+    assert ("graph c=8", "runs_per_sec") not in rows
+    assert percentile([3, 1, 2, 4], 50) == 2
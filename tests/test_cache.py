@@ -0,0 +1,249 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from app.cache import MemoryLRUCache, SQLiteCache, SingleFlight, TieredCache, cached
+
+
+def test_lru_evicts_least_recently_used():
+    cache = MemoryLRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1   # "a" pasa a ser el más reciente
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_respects_max_bytes():
+    cache = MemoryLRUCache(max_entries=100, max_bytes=300)
+    cache.set("a", "x" * 100)
+    cache.set("b", "y" * 100)
+    cache.set("c", "z" * 100)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 300
+    assert cache.get("a") is None
+    assert cache.get("c") == "z" * 100
+
+    # Un valor mayor que el límite no se almacena
+    cache.set("big", "w" * 1000)
+    assert cache.get("big") is None
+
+
+def test_ttl_expiration_and_sweep():
+    cache = MemoryLRUCache(ttl_seconds=60)
+    cache.set("short", "v", ttl_seconds=0.01)
+    cache.set("long", "v")
+    time.sleep(0.02)
+
+    assert cache.sweep() == 1
+    assert cache.get("short") is None
+    assert cache.get("long") == "v"
+
+
+def test_stats_counts_hits_and_misses():
+    cache = MemoryLRUCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_sqlite_cache_persists_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path).set("url", {"text": "contenido"})
+
+    assert SQLiteCache(path).get("url") == {"text": "contenido"}
+
+
+def test_sqlite_cache_enforces_max_entries_on_set(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"), max_entries=2)
+    cache.set("pronto", 1, ttl_seconds=10)
+    cache.set("tarde", 2, ttl_seconds=100)
+    cache.set("nuevo", 3, ttl_seconds=50)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.get("pronto") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_sweeper_starts_on_first_use():
+    cache = MemoryLRUCache()
+    cache.schedule_sweeper(60)
+    assert cache._sweeper is None
+
+    cache.get("a")
+    try:
+        assert cache._sweeper.is_alive()
+    finally:
+        cache.stop_sweeper()
+    cache.get("a")
+    assert cache._sweeper is None
+
+
+def test_stats_counters_are_thread_safe(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    cache.set("a", 1)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: cache.get("a"), range(2000)))
+
+    assert cache.stats()["hits"] == 2000
+
+
+def test_tiered_cache_promotes_from_persistent_tier(tmp_path):
+    persistent = SQLiteCache(str(tmp_path / "cache.db"))
+    persistent.set("url", "contenido")
+    memory = MemoryLRUCache()
+    tiered = TieredCache(memory, persistent)
+
+    assert tiered.get("url") == "contenido"
+    assert memory.get("url") == "contenido"
+
+
+def test_cached_uses_namespaced_hashed_keys():
+    backend = MemoryLRUCache()
+
+    @cached(backend=backend)
+    def double(x):
+        return x * 2
+
+    assert double(2) == 4
+    key = next(iter(backend.cache))
+    assert key.startswith("tests.test_cache.")
+    assert len(key.split(":")[-1]) == 64
+
+
+def test_cached_stores_none_and_normalizes_keys():
+    backend = MemoryLRUCache()
+    calls = []
+
+    @cached(backend=backend, key_func=lambda text: text.lower())
+    def lookup(text):
+        calls.append(text)
+        return None
+
+    assert lookup("Hola") is None
+    assert lookup("HOLA") is None
+    assert calls == ["Hola"]
+
+
+def test_cached_negative_caching_of_errors():
+    backend = MemoryLRUCache()
+    calls = []
+
+    @cached(backend=backend, error_ttl_seconds=60)
+    def failing():
+        calls.append(1)
+        raise ValueError("fallo")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            failing()
+    assert len(calls) == 1
+
+    @cached(backend=backend, is_error=lambda r: r.startswith("Error"), error_ttl_seconds=0.01)
+    def fetch():
+        calls.append(2)
+        return "Error al acceder"
+
+    fetch()
+    time.sleep(0.02)
+    fetch()
+    assert calls.count(2) == 2
+
+
+def test_cached_does_not_cache_errors_by_default():
+    calls = []
+
+    @cached(backend=MemoryLRUCache())
+    def failing():
+        calls.append(1)
+        raise ValueError("fallo")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            failing()
+    assert len(calls) == 2
+
+
+def test_cached_coalesces_concurrent_calls():
+    backend = MemoryLRUCache()
+    calls = []
+
+    @cached(backend=backend)
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return x
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(slow, [1] * 8))
+
+    assert results == [1] * 8
+    assert calls == [1]
+
+
+def test_cached_shares_flights_within_a_namespace():
+    backend = MemoryLRUCache()
+    calls = []
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.1)
+        return x
+
+    first = cached(backend=backend, namespace="pruebas_vuelo")(slow)
+    second = cached(backend=backend, namespace="pruebas_vuelo")(slow)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: (first if i % 2 else second)(1), range(8)))
+
+    assert results == [1] * 8
+    assert calls == [1]
+
+
+def test_cached_coalesces_concurrent_coroutines():
+    backend = MemoryLRUCache()
+    calls = []
+
+    @cached(backend=backend)
+    async def slow(x):
+        calls.append(x)
+        await asyncio.sleep(0.05)
+        return x
+
+    async def run():
+        return await asyncio.gather(*(slow(1) for _ in range(8)))
+
+    assert asyncio.run(run()) == [1] * 8
+    assert calls == [1]
+
+
+def test_singleflight_leader_cancellation_hands_over_to_a_follower():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        leader = asyncio.create_task(flight.ado("k", slow))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.ado("k", slow)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(run()) == ["ok"] * 3
+    assert len(calls) == 2  # El cancelado y el seguidor que tomó el relevo
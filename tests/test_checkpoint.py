@@ -0,0 +1,89 @@
+import asyncio
+import operator
+import threading
+from typing import Annotated, List, TypedDict
+
+import pytest
+from langgraph.graph import StateGraph, END
+
+from app.checkpoint import SQLiteCheckpointSaver, fork_checkpoint, thread_config
+
+
+class State(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+
+def build_graph(saver, calls, fail_on=None):
+    def node(name):
+        def run(state):
+            calls.append(name)
+            if name == fail_on and calls.count(name) == 1:
+                raise RuntimeError("worker caído")
+            return {"steps": [name]}
+        return run
+
+    workflow = StateGraph(State)
+    for name in ("research", "blog", "tweet"):
+        workflow.add_node(name, node(name))
+    workflow.set_entry_point("research")
+    workflow.add_edge("research", "blog")
+    workflow.add_edge("blog", "tweet")
+    workflow.add_edge("tweet", END)
+    return workflow.compile(checkpointer=saver)
+
+
+def test_resume_skips_completed_nodes(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite3")
+    calls = []
+    graph = build_graph(SQLiteCheckpointSaver(path), calls, fail_on="tweet")
+    with pytest.raises(RuntimeError):
+        graph.invoke({"steps": []}, thread_config("run-1"))
+
+    # Otro proceso reanuda la ejecución con el mismo fichero
+    graph = build_graph(SQLiteCheckpointSaver(path), calls, fail_on="tweet")
+    assert graph.get_state(thread_config("run-1")).next == ("tweet",)
+    result = graph.invoke(None, thread_config("run-1"))
+
+    assert result["steps"] == ["research", "blog", "tweet"]
+    assert calls == ["research", "blog", "tweet", "tweet"]
+
+
+def test_fork_reruns_only_following_nodes(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.sqlite3"))
+    calls = []
+    graph = build_graph(saver, calls)
+    asyncio.run(graph.ainvoke({"steps": []}, thread_config("run-1")))
+
+    history = list(graph.get_state_history(thread_config("run-1")))
+    before_tweet = next(s for s in history if s.next == ("tweet",))
+    assert fork_checkpoint(saver, before_tweet.config, "run-2") is not None
+    calls.clear()
+    result = graph.invoke(None, thread_config("run-2"))
+
+    assert calls == ["tweet"]
+    assert result["steps"] == ["research", "blog", "tweet"]
+    # La ejecución original no cambia
+    assert len(list(graph.get_state_history(thread_config("run-1")))) == len(history)
+
+
+def test_compact_removes_expired_threads(tmp_path):
+    saver = SQLiteCheckpointSaver(str(tmp_path / "checkpoints.sqlite3"), retention_seconds=60)
+    build_graph(saver, []).invoke({"steps": []}, thread_config("run-1"))
+
+    assert saver.compact() == 0
+    assert saver.compact(now=10 ** 12) == 1
+    assert saver.get_tuple(thread_config("run-1")) is None
+
+
+def test_async_methods_run_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingSaver(SQLiteCheckpointSaver):
+        def put(self, *args, **kwargs):
+            threads.append(threading.get_ident())
+            return super().put(*args, **kwargs)
+
+    saver = RecordingSaver(str(tmp_path / "checkpoints.sqlite3"))
+    asyncio.run(build_graph(saver, []).ainvoke({"steps": []}, thread_config("run-1")))
+
+    assert threads and threading.get_ident() not in threads
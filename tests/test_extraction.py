@@ -0,0 +1,114 @@
+from bs4 import BeautifulSoup
+
+import app.extraction as extraction
+from app.extraction import (
+    HTML_PARSER,
+    _join_text,
+    extract_main_text,
+    truncate_to_tokens,
+    chunk_text,
+    count_tokens,
+    TRUNCATION_MARK
+)
+
+PAGE = """
+<html>
+<head><title>Título</title><script>var tracking = 1;</script><style>p { color: red; }</style></head>
+<body>
+  <nav><a href="/">Inicio</a> <a href="/blog">Blog</a></nav>
+  <div class="cookie-banner">Aceptar cookies</div>
+  <main>
+    <h1>Comportamiento agéntico</h1>
+    <p>Primer&nbsp;párrafo con <b>negrita</b>.</p>
+    <p>Segundo párrafo.</p>
+  </main>
+  <footer>Todos los derechos reservados</footer>
+</body>
+</html>
+"""
+
+
+def test_extract_main_text_drops_boilerplate():
+    text = extract_main_text(PAGE)
+
+    assert text == "Comportamiento agéntico\nPrimer párrafo con negrita.\nSegundo párrafo."
+    assert "tracking" not in text
+    assert "cookies" not in text
+    assert "Inicio" not in text
+
+
+def test_extract_main_text_keeps_article_header():
+    text = extract_main_text("""
+    <body>
+      <header><a href="/">Mi sitio</a></header>
+      <article>
+        <header><h1>Título del artículo</h1><p>Por Ana</p></header>
+        <p>Cuerpo del artículo.</p>
+      </article>
+    </body>
+    """)
+
+    assert text == "Título del artículo\nPor Ana\nCuerpo del artículo."
+
+
+def test_boilerplate_classes_match_whole_tokens():
+    text = extract_main_text("""
+    <main>
+      <div class="shared-content">Contenido compartido.</div>
+      <div class="post-comments-count">3 comentarios</div>
+      <div class="entry comments">Comentario de un lector</div>
+      <ul id="related-posts"><li>Otro artículo</li></ul>
+      <section class="site-footer">Pie</section>
+    </main>
+    """)
+
+    assert text == "Contenido compartido.\n3 comentarios"
+
+
+def test_extract_main_text_separates_blocks():
+    text = extract_main_text("<body><div>uno</div><div>dos</div><p>tres</p></body>")
+    assert text.split("\n") == ["uno", "dos", "tres"]
+
+
+def test_join_text_leaves_large_trees_unchanged():
+    # Insertar separadores en el árbol hacía la extracción cuadrática en páginas grandes
+    body = "".join(f"<p>Párrafo {i} con <b>texto</b>.</p><div>bloque {i}</div>" for i in range(5000))
+    soup = BeautifulSoup(f"<body>{body}</body>", HTML_PARSER)
+    nodes = sum(1 for _ in soup.descendants)
+
+    text = _join_text(soup)
+
+    assert sum(1 for _ in soup.descendants) == nodes
+    assert text.count("\n") == 9999
+    assert text.startswith("Párrafo 0 con texto.\nbloque 0\n")
+
+
+def test_truncate_to_tokens():
+    text = "palabra " * 1000
+    truncated = truncate_to_tokens(text, 50)
+
+    assert truncated.endswith(TRUNCATION_MARK)
+    assert count_tokens(truncated[:-len(TRUNCATION_MARK)]) <= 50
+    assert truncate_to_tokens("corto", 50) == "corto"
+
+
+def test_chunk_text_respects_budget():
+    text = "\n".join(f"línea número {i}" for i in range(100))
+    chunks = chunk_text(text, 40)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 40 for chunk in chunks)
+    assert "\n".join(chunks) == text
+
+
+def test_tokens_are_estimated_when_the_encoding_cannot_load(monkeypatch):
+    def offline(name):
+        raise OSError("sin red")
+
+    monkeypatch.setattr(extraction, "_ENCODING", None)
+    if extraction.tiktoken is not None:
+        monkeypatch.setattr(extraction.tiktoken, "get_encoding", offline)
+
+    assert not extraction.load_encoding()
+    assert count_tokens("a" * 40) == 40 // extraction.CHARS_PER_TOKEN
+    assert truncate_to_tokens("palabra " * 100, 10).endswith(TRUNCATION_MARK)
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from app.cache import MemoryLRUCache
+from app.fetcher import Fetcher, FetchError, declared_charset
+from app.multiagent import extract_page_text
+
+PAGES = {
+    "/page": ("text/html", b"<html><body>hola</body></html>"),
+    "/big": ("text/plain", b"a" * 5000),
+    "/image": ("image/png", b"\x89PNG"),
+    "/plain": ("text/plain", "Café con ñandú".encode("utf-8")),
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        content_type, body = PAGES[self.path.split("?")[0]]
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def upper(result):
+    return result.content.decode().upper()
+
+
+def test_fetch_truncates_large_bodies(server):
+    fetcher = Fetcher(max_bytes=1000, cache=MemoryLRUCache())
+    result = fetcher.fetch(f"{server}/big")
+
+    assert result.truncated
+    assert len(result.content) == 1000
+
+
+def test_fetch_rejects_non_text_content(server):
+    fetcher = Fetcher(cache=MemoryLRUCache())
+    with pytest.raises(FetchError):
+        fetcher.fetch(f"{server}/image")
+
+
+def test_fetch_revalidates_with_etag(server):
+    fetcher = Fetcher(cache=MemoryLRUCache())
+    first = fetcher.fetch(f"{server}/page", transform=upper)
+    second = fetcher.fetch(f"{server}/page", transform=upper)
+
+    assert not first.revalidated
+    assert second.revalidated
+    assert second.status == 304
+    assert second.data == first.data == "<HTML><BODY>HOLA</BODY></HTML>"
+
+
+def test_afetch_many_keeps_order_and_errors(server):
+    fetcher = Fetcher(max_bytes=1000, cache=MemoryLRUCache())
+
+    async def run():
+        try:
+            return await fetcher.afetch_many([f"{server}/big", f"{server}/image"])
+        finally:
+            await fetcher.aclose()
+
+    big, image = asyncio.run(run())
+    assert big.truncated
+    assert isinstance(image, FetchError)
+
+
+def test_afetch_transforms_off_the_event_loop(server):
+    fetcher = Fetcher(cache=MemoryLRUCache())
+    threads = []
+
+    def transform(result):
+        threads.append(threading.get_ident())
+        return upper(result)
+
+    async def run():
+        try:
+            return await fetcher.afetch(f"{server}/big", transform=transform)
+        finally:
+            await fetcher.aclose()
+
+    result = asyncio.run(run())
+    assert result.data == "A" * 5000
+    assert threads and threads[0] != threading.get_ident()
+
+
+def test_plain_text_without_charset_decodes_the_same_in_both_modes(server):
+    fetcher = Fetcher(cache=MemoryLRUCache())
+    sync = fetcher.fetch(f"{server}/plain", transform=extract_page_text)
+
+    async def run():
+        try:
+            return await fetcher.afetch(f"{server}/plain?async", transform=extract_page_text)
+        finally:
+            await fetcher.aclose()
+
+    assert sync.encoding is None
+    assert sync.data == asyncio.run(run()).data == "Café con ñandú"
+    assert declared_charset('text/plain; Charset="ISO-8859-1"') == "iso-8859-1"
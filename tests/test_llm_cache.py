@@ -0,0 +1,40 @@
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.cache import MemoryLRUCache
+from app.llm_cache import EXACT, NEAR, LLMResponseCache, near_duplicate_messages, normalize_messages
+
+
+def test_exact_cache_reuses_identical_prompts():
+    cache = LLMResponseCache(MemoryLRUCache(), EXACT)
+    llm = FakeListChatModel(responses=["primera", "segunda"], cache=cache)
+
+    assert llm.invoke("hola").content == "primera"
+    assert llm.invoke("hola").content == "primera"
+    assert llm.invoke("adiós").content == "segunda"
+    assert cache.backend.stats()["hits"] == 1
+
+
+def test_normalize_messages_ignores_run_ids():
+    first = dumps([AIMessage(content="", id="run-1",
+                             tool_calls=[{"name": "search", "args": {"q": "ia"}, "id": "call_1"}])])
+    second = dumps([AIMessage(content="", id="run-2",
+                              tool_calls=[{"name": "search", "args": {"q": "ia"}, "id": "call_2"}])])
+
+    assert normalize_messages(first) == normalize_messages(second)
+
+
+def test_near_duplicates_ignore_report_text_and_formatting():
+    first = dumps([HumanMessage(content="Escribe sobre IA."),
+                   HumanMessage(content="Informe largo...", name="online_researcher")])
+    second = dumps([HumanMessage(content="escribe  sobre IA"),
+                    HumanMessage(content="Otro informe", name="online_researcher")])
+    failed = dumps([HumanMessage(content="Escribe sobre IA"),
+                    HumanMessage(content="Error: timeout", name="online_researcher")])
+
+    assert near_duplicate_messages(first) == near_duplicate_messages(second)
+    assert near_duplicate_messages(first) != near_duplicate_messages(failed)
+
+    cache = LLMResponseCache(MemoryLRUCache(), NEAR)
+    assert cache._key(first, "gpt") == cache._key(second, "gpt")
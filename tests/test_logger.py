@@ -0,0 +1,71 @@
+import json
+import logging
+import queue
+
+from app.logger import (ContextFilter, ContextQueueHandler, JsonFormatter, SamplingFilter,
+                        log_context, setup_logger)
+
+
+def make_handler(max_chars=2000):
+    log_queue = queue.SimpleQueue()
+    handler = ContextQueueHandler(log_queue, max_chars=max_chars)
+    handler.addFilter(SamplingFilter())
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger("test_logger_queue")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger, log_queue
+
+
+def drain(log_queue):
+    records = []
+    while not log_queue.empty():
+        records.append(log_queue.get_nowait())
+    return records
+
+
+def test_queue_handler_adds_context_truncates_and_samples():
+    logger, log_queue = make_handler(max_chars=10)
+
+    with log_context(execution_id="exec-1"):
+        with log_context(node="blog_writer"):
+            logger.info("Mensaje %s", "x" * 50)
+    for _ in range(5):
+        logger.info("Evento %d", 1, extra={"sample_every": 2})
+
+    records = drain(log_queue)
+    assert len(records) == 4
+    first = records[0]
+    assert first.execution_id == "exec-1"
+    assert first.node == "blog_writer"
+    assert first.getMessage().startswith("Mensaje xx...")
+    assert "caracteres omitidos" in first.getMessage()
+    assert first.args is None
+    assert records[1].execution_id is None
+
+    data = json.loads(JsonFormatter().format(first))
+    assert data["execution_id"] == "exec-1"
+    assert data["node"] == "blog_writer"
+    assert data["level"] == "INFO"
+
+
+def test_exception_is_formatted_before_queueing():
+    logger, log_queue = make_handler()
+    try:
+        raise ValueError("fallo")
+    except ValueError:
+        logger.exception("Error")
+
+    record = drain(log_queue)[0]
+    assert record.exc_info is None
+    assert "ValueError: fallo" in json.loads(JsonFormatter().format(record))["exception"]
+
+
+def test_setup_logger_is_idempotent(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOG_DIR", str(tmp_path))
+    logger = setup_logger("test_logger_setup", log_file="test.log")
+    again = setup_logger("test_logger_setup", log_file="test.log")
+
+    assert again is logger
+    assert len(logger.handlers) == 1
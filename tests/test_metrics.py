@@ -0,0 +1,57 @@
+import asyncio
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.tools import StructuredTool
+
+from app.metrics import (MetricsRegistry, MetricsCallbackHandler, NODE_SECONDS, TOOL_CALLS,
+                         execution_context, record_rate_limit_wait, stats_collector, timed_node)
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Peticiones", ["path"])
+    latency = registry.histogram("latency_seconds", "Latencia", buckets=[0.1, 1])
+    registry.register_collector(stats_collector(
+        "cache", "cache", lambda: {"fetch": {"hits": 3, "enabled": True}}, "Caché"))
+
+    requests.inc(path='/a"b')
+    latency.observe(0.5)
+    text = registry.render()
+
+    assert 'requests_total{path="/a\\"b"} 1' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0' in text
+    assert 'latency_seconds_bucket{le="1.0"} 1' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1' in text
+    assert "latency_seconds_count 1" in text
+    assert 'cache_hits{cache="fetch"} 3' in text
+    assert "cache_enabled" not in text
+
+
+def test_execution_context_collects_nodes_llm_and_tools():
+    handler = MetricsCallbackHandler()
+    llm = FakeListChatModel(responses=["hola"])
+    tool = StructuredTool.from_function(func=lambda url: url.upper(), name="upper_tool",
+                                        description="Pasa a mayúsculas")
+    calls_before = TOOL_CALLS.value(tool="upper_tool", status="ok")
+
+    def node(state):
+        llm.invoke("hola", {"callbacks": [handler], "metadata": {"langgraph_node": "writer"}})
+        tool.invoke({"url": "x"}, {"callbacks": [handler]})
+        return state
+
+    async def anode(state):
+        return state
+
+    with execution_context("exec-1") as timings:
+        timed_node("writer", node)({})
+        asyncio.run(timed_node("reviewer", anode)({}))
+        record_rate_limit_wait("test", 0.25)
+
+    data = timings.to_dict()
+    assert data["nodes"]["writer"]["calls"] == 1
+    assert data["nodes"]["writer"]["llm_calls"] == 1
+    assert data["nodes"]["reviewer"]["calls"] == 1
+    assert data["tools"]["upper_tool"]["calls"] == 1
+    assert data["rate_limit_wait_seconds"] == 0.25
+    assert NODE_SECONDS.count(node="writer") >= 1
+    assert TOOL_CALLS.value(tool="upper_tool", status="ok") == calls_before + 1
@@ -0,0 +1,27 @@
+import pytest
+
+import app.multiagent as multiagent
+from app.llm_cache import EXACT, NEAR
+
+
+def test_import_does_not_build_the_graph(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    multiagent.get_llm.cache_clear()
+
+    assert multiagent.get_graph.cache_info().currsize == 0
+    with pytest.raises(ValueError):
+        multiagent.get_llm("test-model")
+
+
+def test_unknown_attributes_raise_attribute_error():
+    with pytest.raises(AttributeError):
+        multiagent.missing_attribute
+
+
+def test_supervisor_near_cache_is_opt_in(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_SUPERVISOR_MODE", raising=False)
+    assert multiagent.llm_cache_mode("content_marketing_manager") == EXACT
+
+    monkeypatch.setenv("LLM_CACHE_SUPERVISOR_MODE", NEAR)
+    assert multiagent.llm_cache_mode("content_marketing_manager") == NEAR
+    assert multiagent.llm_cache_mode("blog_manager") == EXACT
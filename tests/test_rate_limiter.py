@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+from app.rate_limiter import (
+    RateLimiter,
+    MemoryBucketStore,
+    SQLiteBucketStore,
+    host_key,
+    rate_limit,
+)
+
+
+def test_burst_is_allowed_then_calls_are_spaced():
+    limiter = RateLimiter(calls_per_minute=60, burst=3, store=MemoryBucketStore())
+
+    assert [limiter.reserve("k") for _ in range(3)] == [0, 0, 0]
+    assert abs(limiter.reserve("k") - 1.0) < 0.05
+    # Las reservas siguientes quedan escalonadas
+    assert abs(limiter.reserve("k") - 2.0) < 0.05
+    assert limiter.stats()["throttled_calls"] == 2
+
+
+def test_keys_are_independent():
+    limiter = RateLimiter(calls_per_minute=60, burst=1, store=MemoryBucketStore())
+
+    assert limiter.reserve("a") == 0
+    assert limiter.reserve("b") == 0
+    assert limiter.is_rate_limited("a")
+
+
+def test_memory_store_drops_idle_keys():
+    store = MemoryBucketStore(cleanup_every=2)
+    limiter = RateLimiter(calls_per_minute=6000, burst=1, store=store)
+
+    limiter.reserve("old")
+    time.sleep(0.02)
+    limiter.reserve("new")
+    assert len(store) == 1
+
+
+def test_sqlite_store_is_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "limits.db")
+    first = RateLimiter(calls_per_minute=60, burst=1, store=SQLiteBucketStore(path))
+    second = RateLimiter(calls_per_minute=60, burst=1, store=SQLiteBucketStore(path))
+
+    assert first.reserve("k") == 0
+    assert second.reserve("k") > 0.9
+
+
+def test_host_key():
+    assert host_key("https://Example.com/a?b=1") == "example.com"
+
+
+def test_rate_limit_decorator_per_host_and_async():
+    store = MemoryBucketStore()
+
+    @rate_limit(calls_per_minute=600, burst=1, key_func=host_key, store=store)
+    async def fetch(url):
+        return url
+
+    async def run():
+        start = time.monotonic()
+        await fetch("http://a.com/1")
+        await fetch("http://b.com/1")
+        first_hosts = time.monotonic() - start
+        await fetch("http://a.com/2")
+        return first_hosts, time.monotonic() - start
+
+    first_hosts, total = asyncio.run(run())
+    assert first_hosts < 0.05
+    assert total >= 0.09
+    assert fetch.limiter.stats()["throttled_calls"] == 1
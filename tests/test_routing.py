@@ -0,0 +1,51 @@
+import pytest
+from pydantic import ValidationError
+
+from app.routing import (PIPELINES, MAX_ROUTE_REPEATS, MAX_SUPERVISOR_STEPS, Route,
+                         fallback_route, guard_route, plan_route, route_key)
+
+
+def test_route_rejects_unknown_workers():
+    assert Route(next="blog_manager").next == "blog_manager"
+    with pytest.raises(ValidationError):
+        Route(next="blog_manager and then FINISH")
+
+
+def test_plan_route_follows_pipeline():
+    state = {"plan": PIPELINES["standard"], "completed": ["online_researcher"]}
+    assert plan_route(state) == "blog_manager"
+
+    state["completed"] += ["blog_manager", "social_media_manager"]
+    assert plan_route(state) == "FINISH"
+    assert plan_route({"completed": []}) is None
+
+
+def test_fallback_route_picks_first_pending_worker():
+    assert fallback_route({}) == "online_researcher"
+    assert fallback_route({"completed": ["online_researcher"]}) == "blog_manager"
+
+
+def test_guard_route_stops_repeated_routes():
+    history = ["blog_manager"] * MAX_ROUTE_REPEATS
+    assert guard_route({"route_history": history}, "blog_manager") == "FINISH"
+    assert guard_route({"route_history": history}, "social_media_manager") == "social_media_manager"
+
+
+def test_guard_route_limits_total_steps():
+    history = ["online_researcher", "blog_manager"] * MAX_SUPERVISOR_STEPS
+    assert guard_route({"route_history": history}, "social_media_manager") == "FINISH"
+
+
+def test_plan_route_fans_out_groups():
+    state = {"plan": PIPELINES["parallel"], "completed": ["online_researcher"]}
+    assert plan_route(state) == ["blog_manager", "social_media_manager"]
+
+    # Solo se relanza el worker del grupo que no ha terminado
+    state["completed"].append("blog_manager")
+    assert plan_route(state) == "social_media_manager"
+
+
+def test_guard_route_detects_repeated_groups():
+    group = ["blog_manager", "social_media_manager"]
+    history = [route_key(group)] * MAX_ROUTE_REPEATS
+    assert guard_route({"route_history": history}, group) == "FINISH"
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+from app.scheduler import JobScheduler, QueueFullError, DONE, FAILED, QUEUED, RUNNING
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_submit_runs_job_and_records_status():
+    scheduler = JobScheduler(max_workers=2)
+    job_id = scheduler.submit(lambda x: x * 2, 21)
+
+    assert wait_for(lambda: scheduler.get(job_id).status == DONE)
+    job = scheduler.get(job_id).to_dict()
+    assert job["run_seconds"] is not None
+    assert scheduler.get(job_id).result == 42
+    scheduler.shutdown()
+
+
+def test_failed_job_keeps_error():
+    scheduler = JobScheduler(max_workers=1)
+
+    def boom():
+        raise RuntimeError("fallo")
+
+    job_id = scheduler.submit(boom)
+    assert wait_for(lambda: scheduler.get(job_id).status == FAILED)
+    assert scheduler.get(job_id).to_dict()["error"] == "fallo"
+    scheduler.shutdown()
+
+
+def test_queue_full_raises():
+    release = threading.Event()
+    scheduler = JobScheduler(max_workers=1, max_queue_size=1)
+
+    scheduler.submit(release.wait)   # Ocupa el único worker
+    scheduler.submit(release.wait)   # Ocupa la cola
+    with pytest.raises(QueueFullError):
+        scheduler.submit(release.wait)
+
+    release.set()
+    scheduler.shutdown()
+
+
+def test_per_tenant_cap_lets_other_tenants_through():
+    release = threading.Event()
+    scheduler = JobScheduler(max_workers=3, max_per_tenant=1)
+
+    first = scheduler.submit(release.wait, tenant="a")
+    second = scheduler.submit(release.wait, tenant="a")
+    other = scheduler.submit(release.wait, tenant="b")
+
+    assert wait_for(lambda: scheduler.stats()["running"] == 2)
+    assert scheduler.get(second).status == QUEUED
+    assert scheduler.get(other).status == RUNNING
+
+    release.set()
+    assert wait_for(lambda: all(
+        scheduler.get(j).status == DONE for j in (first, second, other)
+    ))
+    scheduler.shutdown()
+
+
+def test_resubmitted_job_id_survives_finished_eviction():
+    release = threading.Event()
+    scheduler = JobScheduler(max_workers=2, max_finished_jobs=1)
+
+    scheduler.submit(lambda: None, job_id="run-1")
+    assert wait_for(lambda: scheduler.get("run-1").status == DONE)
+
+    # Se reanuda con el mismo id y otro trabajo termina mientras tanto
+    scheduler.submit(release.wait, job_id="run-1")
+    try:
+        other = scheduler.submit(lambda: None)
+        assert wait_for(lambda: scheduler.get(other).status == DONE)
+        assert wait_for(lambda: scheduler.stats()["running"] == 1)
+        assert scheduler.get("run-1").status == RUNNING
+    finally:
+        release.set()
+    assert wait_for(lambda: scheduler.get("run-1").status == DONE)
+    scheduler.shutdown()
@@ -0,0 +1,61 @@
+import asyncio
+import uuid
+
+import app.search as search
+from app.search import SNIPPET_PREFIX, asearch_web, make_search_tool, normalize_query
+
+
+class CountingClient:
+    def __init__(self):
+        self.queries = []
+
+    def raw_results(self, query, max_results=5, *args, **kwargs):
+        self.queries.append(query)
+        return {"results": [
+            {"title": "Uno", "url": "https://example.com/uno?utm_source=x", "content": "fragmento uno", "score": 0.9},
+            {"title": "Uno bis", "url": "https://EXAMPLE.com/uno", "content": "repetido", "score": 0.8},
+            {"title": "Dos", "url": "https://example.com/dos", "content": "fragmento dos", "score": 0.7},
+        ]}
+
+    async def raw_results_async(self, query, max_results=5, *args, **kwargs):
+        await asyncio.sleep(0.01)
+        return self.raw_results(query, max_results)
+
+
+def test_normalize_query():
+    assert normalize_query("  IA en\n<b>Marketing</b> ") == "ia en marketing"
+
+
+def test_equivalent_queries_share_one_api_call(monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(search, "get_search_client", lambda: client)
+    topic = uuid.uuid4().hex
+
+    async def run():
+        return await asyncio.gather(asearch_web(f"Tendencias {topic}"),
+                                    asearch_web(f"  tendencias   {topic.upper()}"))
+
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(client.queries) == 1
+    # Las URLs repetidas (misma forma canónica) se descartan
+    assert [result["title"] for result in first] == ["Uno", "Dos"]
+
+
+def test_search_tool_includes_prefetched_pages(monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(search, "get_search_client", lambda: client)
+    pages = {"https://example.com/uno?utm_source=x": "Texto completo de la página uno"}
+
+    def fetch(url):
+        return pages.get(url, "Error al acceder a la URL: 404")
+
+    async def afetch(url):
+        return fetch(url)
+
+    tool = make_search_tool(fetch, afetch, lambda text: text.startswith("Error"))
+    output = asyncio.run(tool.ainvoke({"query": f"consulta {uuid.uuid4().hex}"}))
+
+    assert "Texto completo de la página uno" in output
+    assert f"{SNIPPET_PREFIX}fragmento dos" in output
+    assert tool.invoke({"query": f"otra {uuid.uuid4().hex}"}).count("### ") == 2
@@ -0,0 +1,45 @@
+import threading
+
+from app.sqlite_utils import CompactionMixin, SQLiteConnectionMixin
+
+
+class Store(SQLiteConnectionMixin):
+    def __init__(self, path):
+        self._init_sqlite(path)
+
+
+class Compacting(CompactionMixin):
+    def __init__(self, compact_interval, fail=False):
+        self._init_compaction(60, compact_interval)
+        self.fail = fail
+        self.calls = 0
+
+    def compact(self, now=None):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("disco lleno")
+        return 1
+
+
+def test_connection_creates_directory_and_is_per_thread(tmp_path):
+    store = Store(str(tmp_path / "nested" / "dir" / "data.sqlite3"))
+    conn = store._connection()
+    others = []
+    thread = threading.Thread(target=lambda: others.append(store._connection()))
+    thread.start()
+    thread.join()
+
+    assert (tmp_path / "nested" / "dir").is_dir()
+    assert store._connection() is conn
+    assert others[0] is not conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_maybe_compact_respects_interval_and_swallows_errors():
+    store = Compacting(compact_interval=3600)
+    store._maybe_compact()
+    assert store.calls == 0
+
+    store = Compacting(compact_interval=0, fail=True)
+    store._maybe_compact()  # El error se registra sin propagarse
+    assert store.calls == 1
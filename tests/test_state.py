@@ -0,0 +1,84 @@
+from langchain_core.messages import HumanMessage
+
+from app import state
+from app.state import (
+    ERROR_PREFIX,
+    compact_messages,
+    merge_reports,
+    merge_token_counts,
+    select_messages,
+    supervisor_messages,
+    SUMMARY_NAME
+)
+
+
+def report(name, content="informe"):
+    return HumanMessage(content=content, name=name)
+
+
+def test_compact_messages_keeps_request_window_and_summary(monkeypatch):
+    monkeypatch.setattr(state, "STATE_WINDOW", 2)
+    request = HumanMessage(content="Escribe sobre IA")
+    messages = [request]
+    for i in range(6):
+        messages = compact_messages(messages, [report("online_researcher", f"paso {i}")])
+
+    assert messages[0] is request
+    assert messages[1].name == SUMMARY_NAME
+    assert [m.content for m in messages[2:]] == ["paso 4", "paso 5"]
+    assert "paso 0" in messages[1].content
+    assert "paso 3" in messages[1].content
+
+
+def test_select_messages_only_passes_needed_reports():
+    messages = [
+        HumanMessage(content="Escribe sobre IA"),
+        report("online_researcher", "hallazgos v1"),
+        report("online_researcher", "hallazgos v2"),
+        report("social_media_manager", "tweet"),
+    ]
+
+    selected = select_messages(messages, "blog_manager")
+    assert [m.content for m in selected] == ["Escribe sobre IA", "hallazgos v2"]
+
+
+def test_select_messages_keeps_reports_older_than_the_window(monkeypatch):
+    monkeypatch.setattr(state, "STATE_WINDOW", 2)
+    request = HumanMessage(content="Escribe sobre IA")
+    messages, reports = [request], {}
+    for update in [report("online_researcher", "hallazgos"),
+                   report("blog_manager", "borrador"),
+                   report("blog_manager", "borrador v2"),
+                   report("social_media_manager", ERROR_PREFIX + "worker caído")]:
+        messages = compact_messages(messages, [update])
+        if not update.content.startswith(ERROR_PREFIX):
+            reports = merge_reports(reports, {update.name: update})
+
+    assert "hallazgos" not in [m.content for m in messages]
+    selected = select_messages(messages, "blog_manager", reports)
+    assert [m.content for m in selected] == ["Escribe sobre IA", "hallazgos", "borrador v2"]
+
+
+def test_select_messages_skips_error_placeholders():
+    messages = [
+        HumanMessage(content="Escribe sobre IA"),
+        report("online_researcher", "hallazgos"),
+        report("online_researcher", ERROR_PREFIX + "timeout"),
+    ]
+
+    selected = select_messages(messages, "social_media_manager")
+    assert [m.content for m in selected] == ["Escribe sobre IA", "hallazgos"]
+
+
+def test_supervisor_messages_are_excerpts(monkeypatch):
+    monkeypatch.setattr(state, "SUPERVISOR_EXCERPT_CHARS", 10)
+    messages = [HumanMessage(content="Escribe sobre IA"), report("blog_manager", "x" * 100)]
+
+    view = supervisor_messages(messages)
+    assert view[1].name == "blog_manager"
+    assert view[1].content == "x" * 10 + "..."
+
+
+def test_merge_token_counts():
+    assert merge_token_counts({"a": 1}, {"a": 2, "b": 3}) == {"a": 3, "b": 3}
+    assert merge_token_counts(None, {"a": 1}) == {"a": 1}
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.store import ExecutionHeartbeat, MemoryExecutionStore, SQLiteExecutionStore, dump_step
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryExecutionStore(retention_seconds=60)
+    return SQLiteExecutionStore(str(tmp_path / "executions.sqlite3"), retention_seconds=60)
+
+
+def test_steps_are_paginated_with_cursor(store):
+    execution_id = store.create(tenant="acme")
+    for i in range(5):
+        assert store.append_step(execution_id, {"step": i}) == i
+
+    page, cursor = store.get_steps(execution_id, 0, limit=2)
+    assert page == [{"step": 0}, {"step": 1}]
+    page, cursor = store.get_steps(execution_id, cursor, limit=10)
+    assert [s["step"] for s in page] == [2, 3, 4]
+    assert cursor == 5
+    assert store.get(execution_id)["steps"] == 5
+    assert store.get(execution_id)["metadata"] == {"tenant": "acme"}
+
+
+def test_concurrent_appends_get_unique_positions(store):
+    execution_id = store.create()
+    positions = []
+
+    def worker():
+        for i in range(20):
+            positions.append(store.append_step(execution_id, {"i": i}))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(positions) == list(range(80))
+
+
+def test_compact_removes_only_expired_finished_executions(store):
+    finished = store.create()
+    running = store.create()
+    store.set_status(finished, "done")
+    store.set_status(running, "running")
+    store.append_step(finished, {"step": 0})
+
+    assert store.compact(now=time.time() + 120) == 1
+    assert store.get(finished) is None
+    assert store.get_steps(finished) == ([], 0)
+    assert store.get(running)["status"] == "running"
+
+
+def test_dump_step_keeps_only_message_essentials():
+    message = AIMessage(content="hola", name="blog_manager",
+                        response_metadata={"token_usage": {"total_tokens": 10}})
+    data = dump_step({"blog_manager": {"messages": [message], "next": ["a", "b"]},
+                      "prompt": HumanMessage(content="x")})
+
+    assert data == ('{"blog_manager":{"messages":[{"type":"ai","content":"hola",'
+                    '"name":"blog_manager"}],"next":["a","b"]},'
+                    '"prompt":{"type":"human","content":"x"}}')
+
+
+def test_claim_resume_only_failed_or_stale_running(store):
+    failed = store.create()
+    running = store.create()
+    done = store.create()
+    store.set_status(failed, "failed", "worker caído")
+    store.set_status(running, "running")
+    store.set_status(done, "done")
+
+    now = time.time()
+    assert store.claim_resume(failed, stale_before=now - 60)
+    assert not store.claim_resume(failed, stale_before=now - 60)  # Ya reclamada
+    assert store.get(failed)["status"] == "queued"
+    assert store.get(failed)["error"] is None
+
+    assert not store.claim_resume(running, stale_before=now - 60)
+    assert not store.claim_resume(done, stale_before=now + 60)
+    assert store.claim_resume(running, stale_before=now + 60)
+
+
+def test_heartbeat_keeps_running_execution_fresh(store):
+    execution_id = store.create()
+    store.set_status(execution_id, "running")
+    started = store.get(execution_id)["updated_at"]
+    heartbeat = ExecutionHeartbeat(store, interval=0.01)
+
+    with heartbeat.track(execution_id):
+        time.sleep(0.1)
+    heartbeat.stop()
+
+    assert store.get(execution_id)["updated_at"] > started
+    assert not store.claim_resume(execution_id, stale_before=started + 0.01)
@@ -4,6 +4,10 @@ from app.validators import (
     validate_prompt,
     sanitize_input,
     validate_api_key,
+    canonicalize_url,
+    clean_prompt,
+    iter_normalized,
+    normalize_text,
     ValidationError
 )
 
@@ -50,4 +54,35 @@ def test_validate_api_key():
     assert not validate_api_key("")
     assert not validate_api_key(None)
     assert not validate_api_key("invalid-key")
-    assert not validate_api_key("sk-")  # Muy corta 
\ No newline at end of file
+    assert not validate_api_key("sk-")  # Muy corta
+
+def test_canonicalize_url():
+    assert canonicalize_url("HTTPS://Example.com:443/a?b=2&a=1#frag") == "https://example.com/a?a=1&b=2"
+    assert canonicalize_url("http://example.com") == "http://example.com/"
+    assert canonicalize_url("http://example.com:8080/x?utm_source=t&id=3") == "http://example.com:8080/x?id=3"
+    assert canonicalize_url("not-a-url") == "not-a-url"
+
+def test_normalize_text():
+    assert normalize_text("Hola <b> mundo</b>") == "Hola mundo"
+    assert normalize_text("pala<b>bra</b>") == "palabra"
+    assert normalize_text("línea\n\tsiguiente\x00") == "línea siguiente"
+    assert normalize_text("<a href='x y'>enlace</a>") == "enlace"
+    assert normalize_text("cafe\u0301") == "caf\u00e9"
+
+def test_iter_normalized_matches_normalize_text():
+    text = "  Título <p>primer\n\npárrafo</p>\x00 con <b>negrita</b>cafe\u0301  "
+    expected = normalize_text(text)
+    for size in range(1, 12):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert "".join(iter_normalized(chunks)) == expected
+
+def test_clean_prompt():
+    assert clean_prompt("  Escribe   sobre <b>IA</b>\n") == "Escribe sobre IA"
+    
+    with pytest.raises(ValidationError):
+        clean_prompt("   ")
+    with pytest.raises(ValidationError):
+        clean_prompt("precio < 10")
+    # Se rechaza sin normalizar toda la entrada
+    with pytest.raises(ValidationError):
+        clean_prompt("A" * 10_000_000, max_length=100)
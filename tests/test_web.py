@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+# El almacén y los checkpoints del módulo web se crean al importarlo
+os.environ["EXECUTION_STORE_PATH"] = ":memory:"
+os.environ["CHECKPOINT_PATH"] = ":memory:"
+
+import app.multiagent as multiagent
+import app.web as web
+from app import rate_limiter
+from app.checkpoint import get_checkpointer
+from app.scheduler import JobScheduler, DONE, FAILED, QUEUED, RUNNING
+from app.store import ExecutionHeartbeat, MemoryExecutionStore
+from benchmarks.fakes import fake_services
+from benchmarks.server import serve_pages
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryExecutionStore()
+    monkeypatch.setattr(web, "store", store)
+    monkeypatch.setattr(web, "heartbeat", ExecutionHeartbeat(store))
+    return store
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = JobScheduler(max_workers=1, max_queue_size=1)
+    monkeypatch.setattr(web, "scheduler", scheduler)
+    yield scheduler
+    scheduler.shutdown(wait=False)
+
+
+@pytest.fixture
+def client(store, scheduler):
+    return TestClient(web.app)
+
+
+@pytest.fixture
+def release(monkeypatch, store):
+    """Sustituye el ejecutor por uno que espera a que el test lo libere."""
+    release = threading.Event()
+
+    def fake_execution(execution_id, prompt, stream_tokens=False, plan=None):
+        store.set_status(execution_id, RUNNING)
+        release.wait(5)
+        store.append_step(execution_id, {"writer": {"prompt": prompt}})
+        store.set_status(execution_id, DONE)
+
+    monkeypatch.setitem(web.EXECUTORS, web.EXECUTION_MODE, fake_execution)
+    yield release
+    release.set()
+
+
+def test_execute_rejects_with_429_when_the_queue_is_full(client, store, release):
+    running = client.post("/execute", data={"prompt": "primero"}).json()["execution_id"]
+    queued = client.post("/execute", data={"prompt": "segundo"}).json()["execution_id"]
+    assert wait_for(lambda: store.get(running)["status"] == RUNNING)
+
+    response = client.post("/execute", data={"prompt": "tercero"})
+
+    assert response.status_code == 429
+    assert response.json()["status"] == "error"
+    # La ejecución rechazada no queda en el almacén
+    assert {store.get(running)["status"], store.get(queued)["status"]} == {RUNNING, QUEUED}
+    assert len(store._executions) == 2
+
+
+def test_jobs_reports_scheduler_status(client, release):
+    execution_id = client.post("/execute", data={"prompt": "hola"}).json()["execution_id"]
+    assert wait_for(lambda: client.get(f"/jobs/{execution_id}").json()["job"]["status"] == RUNNING)
+
+    release.set()
+    assert wait_for(lambda: client.get(f"/jobs/{execution_id}").json()["job"]["status"] == DONE)
+    job = client.get(f"/jobs/{execution_id}").json()["job"]
+    assert job["job_id"] == execution_id
+    assert job["run_seconds"] is not None
+    assert client.get("/jobs/desconocido").json()["status"] == "error"
+
+
+def test_execute_rejects_unknown_pipeline_and_invalid_prompt(client):
+    assert client.post("/execute", data={"prompt": "hola", "pipeline": "otro"}).status_code == 400
+    assert client.post("/execute", data={"prompt": "<script>"}).status_code == 400
+
+
+def read_events(response):
+    """Eventos SSE de una respuesta como tuplas (evento, id, datos)."""
+    events = []
+    for block in response.text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields.get("event"), fields.get("id"), fields.get("data")))
+    return events
+
+
+def test_stream_resumes_after_last_event_id_without_replaying(client, store):
+    execution_id = store.create()
+    for i in range(4):
+        store.append_step(execution_id, {"writer": {"step": i}})
+    store.set_status(execution_id, DONE)
+
+    events = read_events(client.get(f"/stream/{execution_id}", headers={"Last-Event-ID": "1"}))
+
+    assert [(event, event_id) for event, event_id, _ in events] == [
+        ("step", "2"), ("step", "3"), ("end", None)]
+    assert json.loads(events[0][2]) == {"writer": {"step": 2}}
+    assert [e[1] for e in read_events(client.get(f"/stream/{execution_id}?cursor=3"))] == ["3", None]
+
+
+def test_stream_ends_when_the_job_finishes(client, release, monkeypatch):
+    monkeypatch.setattr(web, "STREAM_POLL_SECONDS", 0.02)
+    execution_id = client.post("/execute", data={"prompt": "hola"}).json()["execution_id"]
+    threading.Timer(0.1, release.set).start()
+
+    events = read_events(client.get(f"/stream/{execution_id}"))
+
+    assert [event for event, _, _ in events] == ["step", "end"]
+    assert json.loads(events[-1][2])["status"] == DONE
+    assert client.get("/stream/desconocido").status_code == 404
+
+
+def test_results_are_paginated_and_capped(client, store, monkeypatch):
+    monkeypatch.setattr(web, "RESULTS_PAGE_MAX", 3)
+    execution_id = store.create(tenant="acme")
+    for i in range(7):
+        store.append_step(execution_id, {"writer": {"step": i}})
+
+    page = client.get(f"/results/{execution_id}?limit=100").json()
+    assert [s["writer"]["step"] for s in page["results"]] == [0, 1, 2]
+    assert page["next_cursor"] == 3 and page["has_more"]
+    assert page["execution"]["metadata"] == {"tenant": "acme"}
+
+    page = client.get(f"/results/{execution_id}?cursor=5&limit=2").json()
+    assert [s["writer"]["step"] for s in page["results"]] == [5, 6]
+    assert page["next_cursor"] == 7 and not page["has_more"]
+    assert page["job"] is None  # Planificada en otro worker
+
+    assert client.get(f"/results/{execution_id}?cursor=-4&limit=0").json()["results"] == [
+        {"writer": {"step": 0}}]
+    assert client.get("/results/desconocido").json()["status"] == "error"
+
+
+@pytest.fixture
+def agent_calls(monkeypatch):
+    """Grafo real con el LLM y la búsqueda simulados, en modo hilos.
+
+    El primer ``social_media_manager`` falla como si se cayera el worker;
+    retorna la lista de nodos ejecutados.
+    """
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-00000000000000000000")
+    monkeypatch.setattr(web, "EXECUTION_MODE", "threads")
+    calls, failed = [], []
+    agent_node = multiagent.agent_node
+
+    def flaky_agent_node(state, agent, name):
+        calls.append(name)
+        if name == "social_media_manager" and not failed:
+            failed.append(name)
+            raise RuntimeError("worker caído")
+        return agent_node(state, agent, name)
+
+    monkeypatch.setattr(multiagent, "agent_node", flaky_agent_node)
+    # Las pruebas anteriores ya gastaron el presupuesto por host de 127.0.0.1
+    for limiter in rate_limiter.limiters.get("fetch_page_host", []):
+        monkeypatch.setattr(limiter, "store", rate_limiter.MemoryBucketStore())
+    get_checkpointer.cache_clear()
+    with serve_pages() as base_url, fake_services(base_url, pages=2):
+        yield calls
+    get_checkpointer.cache_clear()
+
+
+# Un mismo prompt lleva a las mismas páginas, que salen del caché de descargas
+PROMPT = "Tendencias de marketing de contenidos"
+
+
+def run_until(client, store, execution_id, status):
+    assert wait_for(lambda: store.get(execution_id)["status"] == status, timeout=10)
+    return client.get(f"/results/{execution_id}?limit=500").json()["results"]
+
+
+def test_resume_continues_a_failed_execution(client, store, agent_calls):
+    execution_id = client.post("/execute", data={"prompt": PROMPT}).json()["execution_id"]
+    run_until(client, store, execution_id, FAILED)
+
+    checkpoints = client.get(f"/executions/{execution_id}/checkpoints").json()["checkpoints"]
+    assert checkpoints[0]["next"] == ["social_media_manager"]
+
+    response = client.post(f"/executions/{execution_id}/resume")
+    assert response.json() == {"status": "success", "execution_id": execution_id,
+                               "next": ["social_media_manager"]}
+    steps = run_until(client, store, execution_id, DONE)
+
+    assert agent_calls == ["online_researcher", "blog_manager",
+                           "social_media_manager", "social_media_manager"]
+    assert any("social_media_manager" in step for step in steps)
+    assert client.post(f"/executions/{execution_id}/resume").status_code == 409
+
+
+def test_resume_rejects_a_running_execution(client, store, agent_calls):
+    execution_id = client.post("/execute", data={"prompt": PROMPT}).json()["execution_id"]
+    run_until(client, store, execution_id, FAILED)
+    # Otro worker la sigue ejecutando y renueva su latido
+    store.set_status(execution_id, RUNNING)
+
+    response = client.post(f"/executions/{execution_id}/resume")
+
+    assert response.status_code == 409
+    assert store.get(execution_id)["status"] == RUNNING
+    assert client.post("/executions/desconocido/resume").status_code == 404
+
+
+def test_fork_at_node_reruns_only_following_nodes(client, store, agent_calls):
+    execution_id = client.post("/execute", data={"prompt": PROMPT}).json()["execution_id"]
+    run_until(client, store, execution_id, FAILED)
+    agent_calls.clear()
+
+    response = client.post(f"/executions/{execution_id}/fork", data={"node": "blog_manager"}).json()
+    fork_id = response["execution_id"]
+    run_until(client, store, fork_id, DONE)
+
+    assert fork_id != execution_id
+    assert agent_calls == ["blog_manager", "social_media_manager"]
+    assert store.get(fork_id)["metadata"]["forked_from"] == {
+        "execution_id": execution_id, "checkpoint_id": response["checkpoint_id"]}
+    assert store.get(execution_id)["status"] == FAILED
+    assert client.post(f"/executions/{execution_id}/fork", data={}).status_code == 400